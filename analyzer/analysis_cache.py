@@ -0,0 +1,173 @@
+"""
+Analysis cache for the Code Analysis and Debugging Visualizer
+Shares parsed trees, analysis results and execution-step skeletons between
+ASTAnalyzer and DebuggingEngine, optionally backed by a persistent store
+"""
+
+import ast
+import hashlib
+import os
+import sys
+import threading
+from collections import OrderedDict
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.records import results_as_dicts, results_from_dicts
+
+# Versions of the cached payloads. Bump a version whenever the code producing
+# that payload changes its output, so stale persistent entries are ignored.
+PAYLOAD_VERSIONS = {
+    'results': 1,  # ASTAnalyzer.get_results()
+    'steps': 2,    # DebuggingEngine execution-step skeleton
+}
+
+def source_key(source_code):
+    """Build the cache key for a piece of source code.
+
+    The key combines a hash of the source text with the running Python
+    version, since the AST layout differs between interpreter releases.
+    """
+    digest = hashlib.sha256(source_code.encode('utf-8', 'surrogatepass')).hexdigest()
+    return f"{digest}:{sys.version_info[0]}.{sys.version_info[1]}"
+
+class AnalysisCache:
+    """Size-bounded LRU cache of parsed trees and analysis results"""
+
+    def __init__(self, max_entries=64, store=None):
+        self.max_entries = max_entries
+        self.store = store  # Optional persistent store (see db.analysis_cache_db)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _entry(self, key, create=False):
+        """Return the entry for a key, marking it as most recently used"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        elif create:
+            entry = {'tree': None, 'results': None, 'steps': None, 'segments': None}
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def get_tree(self, source_code):
+        """Return the cached AST for the source, or None"""
+        with self._lock:
+            entry = self._entry(source_key(source_code))
+            tree = entry['tree'] if entry else None
+            if tree is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return tree
+
+    def parse(self, source_code):
+        """Return the AST for the source, parsing it only on a cache miss.
+
+        Raises SyntaxError exactly like ast.parse; failed parses are not cached.
+        """
+        tree = self.get_tree(source_code)
+        if tree is None:
+            tree = ast.parse(source_code)
+            self.put_tree(source_code, tree)
+        return tree
+
+    def put_tree(self, source_code, tree):
+        """Store the AST for the source"""
+        with self._lock:
+            self._entry(source_key(source_code), create=True)['tree'] = tree
+
+    def get_segments(self, source_code):
+        """Return the per-statement segments of an incremental analysis of the source, or None"""
+        with self._lock:
+            entry = self._entry(source_key(source_code))
+            return entry['segments'] if entry else None
+
+    def put_segments(self, source_code, segments):
+        """Store the per-statement segments of an incremental analysis; like trees, they stay in memory"""
+        with self._lock:
+            self._entry(source_key(source_code), create=True)['segments'] = segments
+
+    def attach_store(self, store):
+        """Back the in-memory cache with a persistent store"""
+        self.store = store
+
+    def _get_payload(self, source_code, kind, decode=None):
+        """Look a payload up in memory, then in the persistent store"""
+        key = source_key(source_code)
+        with self._lock:
+            entry = self._entry(key)
+            payload = entry[kind] if entry else None
+            if payload is not None:
+                self.hits += 1
+                return payload
+            store = self.store
+
+        if store is not None:
+            try:
+                payload = store.get(f"{key}:{kind}:v{PAYLOAD_VERSIONS[kind]}")
+            except Exception as e:
+                print(f"Error reading analysis cache: {e}")
+                payload = None
+            if payload is not None:
+                if decode is not None:
+                    payload = decode(payload)
+                with self._lock:
+                    self._entry(key, create=True)[kind] = payload
+                    self.hits += 1
+                return payload
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _put_payload(self, source_code, kind, payload, encode=None):
+        """Store a payload in memory and write it through to the persistent store"""
+        key = source_key(source_code)
+        with self._lock:
+            self._entry(key, create=True)[kind] = payload
+            store = self.store
+
+        if store is not None:
+            try:
+                store.put(f"{key}:{kind}:v{PAYLOAD_VERSIONS[kind]}", encode(payload) if encode else payload)
+            except Exception as e:
+                print(f"Error writing analysis cache: {e}")
+
+    def get_results(self, source_code):
+        """Return the cached analysis results for the source, or None"""
+        results = self._get_payload(source_code, 'results', decode=results_from_dicts)
+        if results is None:
+            return None
+        # Hand out fresh lists so callers cannot grow the cached ones
+        return {kind: list(items) for kind, items in results.items()}
+
+    def put_results(self, source_code, results):
+        """Store the analysis results for the source"""
+        self._put_payload(source_code, 'results', {kind: list(items) for kind, items in results.items()},
+                          encode=results_as_dicts)
+
+    def get_steps(self, source_code):
+        """Return the cached execution-step skeleton as (line, node type) pairs, or None"""
+        steps = self._get_payload(source_code, 'steps')
+        return [tuple(step) for step in steps] if steps is not None else None
+
+    def put_steps(self, source_code, steps):
+        """Store the execution-step skeleton for the source"""
+        self._put_payload(source_code, 'steps', [list(step) for step in steps])
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+# Cache shared by every analyzer and debugging engine in the process
+shared_cache = AnalysisCache()
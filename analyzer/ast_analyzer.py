@@ -1,196 +1,460 @@
-"""
-AST Analyzer for Python code
-This module parses Python code and extracts structural information
-"""
-
-import ast
-
-class ASTAnalyzer:
-    def __init__(self, source_code):
-        self.source_code = source_code
-        self.tree = None
-        self.variables = []
-        self.functions = []
-        self.classes = []
-        self.conditionals = []
-        self.loops = []
-        
-    def parse(self):
-        """Parse the source code into an AST"""
-        try:
-            self.tree = ast.parse(self.source_code)
-            return True
-        except SyntaxError as e:
-            print(f"Syntax error in code: {e}")
-            return False
-            
-    def extract_variables(self):
-        """Extract variable assignments from the AST"""
-        if not self.tree:
-            return
-            
-        for node in ast.walk(self.tree):
-            if isinstance(node, ast.Assign):
-                for target in node.targets:
-                    if isinstance(target, ast.Name):
-                        # Convert the assigned value to string representation
-                        try:
-                            value_str = ast.dump(node.value)[:50] + "..." if len(ast.dump(node.value)) > 50 else ast.dump(node.value)
-                        except:
-                            value_str = "Unknown"
-                            
-                        self.variables.append({
-                            'name': target.id,
-                            'line': getattr(node, 'lineno', 0),
-                            'value': value_str
-                        })
-                        
-    def extract_functions(self):
-        """Extract function definitions from the AST"""
-        if not self.tree:
-            return
-            
-        for node in ast.walk(self.tree):
-            if isinstance(node, ast.FunctionDef):
-                params = [arg.arg for arg in node.args.args]
-                self.functions.append({
-                    'name': node.name,
-                    'line': getattr(node, 'lineno', 0),
-                    'params': params,
-                    'returns': None  # Would need to parse return statements separately
-                })
-                
-    def extract_classes(self):
-        """Extract class definitions from the AST"""
-        if not self.tree:
-            return
-            
-        for node in ast.walk(self.tree):
-            if isinstance(node, ast.ClassDef):
-                methods = []
-                attributes = []
-                
-                for item in node.body:
-                    if isinstance(item, ast.FunctionDef):
-                        methods.append(item.name)
-                    elif isinstance(item, ast.Assign):
-                        for target in item.targets:
-                            if isinstance(target, ast.Name):
-                                attributes.append(target.id)
-                                
-                self.classes.append({
-                    'name': node.name,
-                    'line': getattr(node, 'lineno', 0),
-                    'methods': methods,
-                    'attributes': attributes
-                })
-                
-    def extract_conditionals(self):
-        """Extract conditional statements from the AST"""
-        if not self.tree:
-            return
-            
-        for node in ast.walk(self.tree):
-            if isinstance(node, ast.If):
-                # Convert the test condition to string representation
-                try:
-                    test_str = ast.dump(node.test)[:50] + "..." if len(ast.dump(node.test)) > 50 else ast.dump(node.test)
-                except:
-                    test_str = "Unknown"
-                    
-                self.conditionals.append({
-                    'line': getattr(node, 'lineno', 0),
-                    'type': 'if',
-                    'test': test_str
-                })
-                
-    def extract_loops(self):
-        """Extract loop statements from the AST"""
-        if not self.tree:
-            return
-            
-        for node in ast.walk(self.tree):
-            if isinstance(node, (ast.For, ast.While)):
-                loop_type = 'for' if isinstance(node, ast.For) else 'while'
-                
-                if isinstance(node, ast.For):
-                    try:
-                        target_str = ast.dump(node.target)[:30] + "..." if len(ast.dump(node.target)) > 30 else ast.dump(node.target)
-                    except:
-                        target_str = "Unknown"
-                    self.loops.append({
-                        'line': getattr(node, 'lineno', 0),
-                        'type': loop_type,
-                        'target': target_str,
-                        'test': None
-                    })
-                else:  # While loop
-                    try:
-                        test_str = ast.dump(node.test)[:50] + "..." if len(ast.dump(node.test)) > 50 else ast.dump(node.test)
-                    except:
-                        test_str = "Unknown"
-                    self.loops.append({
-                        'line': getattr(node, 'lineno', 0),
-                        'type': loop_type,
-                        'target': None,
-                        'test': test_str
-                    })
-                
-    def analyze(self):
-        """Perform complete analysis of the source code"""
-        if not self.parse():
-            return False
-            
-        self.extract_variables()
-        self.extract_functions()
-        self.extract_classes()
-        self.extract_conditionals()
-        self.extract_loops()
-        
-        return True
-        
-    def get_results(self):
-        """Return all analysis results"""
-        return {
-            'variables': self.variables,
-            'functions': self.functions,
-            'classes': self.classes,
-            'conditionals': self.conditionals,
-            'loops': self.loops
-        }
-
-# Example usage
-if __name__ == "__main__":
-    sample_code = """
-def fibonacci(n):
-    if n <= 1:
-        return n
-    else:
-        return fibonacci(n-1) + fibonacci(n-2)
-
-def main():
-    x = 10
-    y = 20
-    result = fibonacci(x)
-    print(result)
-    
-class Calculator:
-    def __init__(self):
-        self.result = 0
-        
-    def add(self, a, b):
-        self.result = a + b
-        return self.result
-
-for i in range(5):
-    print(i)
-"""
-    
-    analyzer = ASTAnalyzer(sample_code)
-    if analyzer.analyze():
-        results = analyzer.get_results()
-        print("Variables:", results['variables'])
-        print("Functions:", results['functions'])
-        print("Classes:", results['classes'])
-        print("Conditionals:", results['conditionals'])
+"""
+AST Analyzer for Python code
+This module parses Python code and extracts structural information
+"""
+
+import ast
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.analysis_cache import shared_cache
+from analyzer.value_render import LazyValue
+from analyzer.records import (
+    VariableRecord, FunctionRecord, ClassRecord, ConditionalRecord, LoopRecord, results_as_dicts
+)
+
+RESULT_KINDS = ('variables', 'functions', 'classes', 'conditionals', 'loops')
+
+class ASTAnalyzer:
+    def __init__(self, source_code, cache=shared_cache, incremental=False):
+        self.source_code = source_code
+        self.cache = cache  # Pass None to always reparse and re-analyze
+        self.incremental = incremental  # Keep per-statement results so update() can reuse them
+        self.tree = None
+        self.segments = None  # Per top-level statement results of the last incremental analysis
+        self.last_update = {}
+        self.variables = []
+        self.functions = []
+        self.classes = []
+        self.conditionals = []
+        self.loops = []
+        
+    def parse(self):
+        """Parse the source code into an AST"""
+        try:
+            if self.cache is not None:
+                self.tree = self.cache.parse(self.source_code)
+            else:
+                self.tree = ast.parse(self.source_code)
+            return True
+        except SyntaxError as e:
+            print(f"Syntax error in code: {e}")
+            return False
+            
+    def extract_variables(self):
+        """Extract variable assignments from the AST"""
+        self._run_visitor(('variables',))
+                        
+    def extract_functions(self):
+        """Extract function definitions from the AST"""
+        self._run_visitor(('functions',))
+                
+    def extract_classes(self):
+        """Extract class definitions from the AST"""
+        self._run_visitor(('classes',))
+                
+    def extract_conditionals(self):
+        """Extract conditional statements from the AST"""
+        self._run_visitor(('conditionals',))
+                
+    def extract_loops(self):
+        """Extract loop statements from the AST"""
+        self._run_visitor(('loops',))
+        
+    def _run_visitor(self, kinds=None):
+        """Run a single dispatching traversal that fills the requested result lists"""
+        if not self.tree:
+            return
+            
+        _AnalysisVisitor(self, kinds).run(self.tree)
+                
+    def analyze(self):
+        """Perform complete analysis of the source code.
+        
+        Cached results are reused with the cached tree, which is parsed again
+        if only the results were cached (as by the persistent store or the
+        project analyzer). Incremental analyzers also need the segments for
+        later updates, so without cached segments they analyze again.
+        """
+        if self.cache is not None:
+            cached = self.cache.get_results(self.source_code)
+            segments = self.cache.get_segments(self.source_code) if self.incremental else None
+            if cached is not None and (segments is not None or not self.incremental):
+                self.tree = self.cache.parse(self.source_code)
+                self.segments = segments
+                self._load_results(cached)
+                return True
+                
+        if not self.parse():
+            return False
+            
+        if self.incremental:
+            for _ in self._iter_segments({}):
+                pass
+        else:
+            # One traversal fills variables, functions, classes, conditionals and loops
+            self._run_visitor()
+        
+        if self.cache is not None:
+            self.cache.put_results(self.source_code, self.get_results())
+        
+        return True
+        
+    def update(self, source_code):
+        """Re-analyze changed source, re-extracting only the top-level statements whose text changed.
+        
+        Unchanged functions, classes and other top-level statements reuse the
+        results of the previous analysis, shifted to their new line numbers.
+        """
+        previous = {segment.key: segment for segment in self.segments or ()}
+        self.source_code = source_code
+        self.incremental = True
+        
+        if not self.parse():
+            return False
+            
+        for _ in self._iter_segments(previous):
+            pass
+        
+        if self.cache is not None:
+            self.cache.put_results(self.source_code, self.get_results())
+            
+        return True
+        
+    def iter_results(self, collect=True):
+        """Analyze the source code, yielding each finding as soon as it is discovered.
+        
+        Findings are the typed result records (their ``kind`` attribute names
+        the result list they belong to). With collect=True the result lists
+        are filled as well, so get_results() is complete once the generator is
+        exhausted; with collect=False nothing is kept in memory. Yields nothing
+        if the code does not parse.
+        
+        Incremental analyzers yield findings one top-level statement at a
+        time, reusing the statements unchanged since the last analysis.
+        """
+        if not self.parse():
+            return
+            
+        if self.incremental:
+            # Segments are needed for later updates, so findings are always kept
+            previous = {segment.key: segment for segment in self.segments or ()}
+            yield from self._iter_segments(previous)
+        elif collect:
+            for kind in RESULT_KINDS:
+                setattr(self, kind, [])
+            yield from _AnalysisVisitor(self).iter_findings(self.tree, keep=True)
+        else:
+            yield from _AnalysisVisitor(_FindingBuffer()).iter_findings(self.tree, keep=False)
+            return
+            
+        if self.cache is not None:
+            self.cache.put_results(self.source_code, self.get_results())
+        
+    def _iter_segments(self, previous):
+        """Analyze the tree one top-level statement at a time, reusing unchanged statements.
+        
+        Yields the findings of each statement once it is done, then splices
+        all segments into the result lists.
+        """
+        lines = self.source_code.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+        segments = []
+        reused = 0
+        
+        for node in self.tree.body:
+            key, start_line = _segment_key(lines, node)
+            segment = previous.get(key)
+            if segment is not None:
+                segment = segment.moved_to(start_line)
+                reused += 1
+            else:
+                segment = _Segment(key, start_line)
+                _AnalysisVisitor(segment).run_levels(node)
+            segments.append(segment)
+            for kind in RESULT_KINDS:
+                yield from getattr(segment, kind)
+            
+        self.segments = segments
+        if self.cache is not None:
+            self.cache.put_segments(self.source_code, segments)
+        self._splice_segments(segments)
+        self.last_update = {
+            'segments': len(segments),
+            'reused': reused,
+            'reanalyzed': len(segments) - reused
+        }
+        
+    def _splice_segments(self, segments):
+        """Rebuild the result lists from per-statement segments in ast.walk order.
+        
+        ast.walk is breadth-first, so a result lists every depth in turn and,
+        within one depth, the top-level statements in source order.
+        """
+        for kind in RESULT_KINDS:
+            by_depth = {}
+            for segment in segments:
+                items = getattr(segment, kind)
+                for depth, start, end in segment.depths[kind]:
+                    by_depth.setdefault(depth, []).append(items[start:end])
+                    
+            merged = []
+            for depth in sorted(by_depth):
+                for chunk in by_depth[depth]:
+                    merged.extend(chunk)
+            setattr(self, kind, merged)
+        
+    def _load_results(self, results):
+        """Populate the result lists from previously computed results"""
+        self.variables = results['variables']
+        self.functions = results['functions']
+        self.classes = results['classes']
+        self.conditionals = results['conditionals']
+        self.loops = results['loops']
+        
+    def get_results(self, as_dicts=False):
+        """Return all analysis results.
+        
+        Findings are compact records with dict-style access; pass as_dicts=True
+        for plain dicts (e.g. for JSON export).
+        """
+        if as_dicts:
+            return results_as_dicts(self.get_results())
+        return {
+            'variables': self.variables,
+            'functions': self.functions,
+            'classes': self.classes,
+            'conditionals': self.conditionals,
+            'loops': self.loops
+        }
+
+
+def _segment_key(lines, node):
+    """Identify a top-level statement by its exact source text and columns"""
+    start_line, start_col = node.lineno, node.col_offset
+    for decorator in getattr(node, 'decorator_list', ()):
+        if decorator.lineno < start_line:
+            # Decorators start one column before their expression, at the '@'
+            start_line, start_col = decorator.lineno, decorator.col_offset - 1
+    text = '\n'.join(lines[start_line - 1:node.end_lineno])
+    return (start_col, node.end_col_offset, text), start_line
+
+class _FindingBuffer:
+    """Short-lived result lists for findings that are streamed rather than kept"""
+    
+    def __init__(self):
+        self.variables = []
+        self.functions = []
+        self.classes = []
+        self.conditionals = []
+        self.loops = []
+
+class _Segment:
+    """Analysis results of one top-level statement"""
+    
+    def __init__(self, key, start_line):
+        self.key = key
+        self.start_line = start_line
+        self.variables = []
+        self.functions = []
+        self.classes = []
+        self.conditionals = []
+        self.loops = []
+        # (depth, start, end) slices of each result list, in traversal order
+        self.depths = {kind: [] for kind in RESULT_KINDS}
+        
+    def moved_to(self, start_line):
+        """Return this segment with its line numbers shifted to a new start line"""
+        if start_line == self.start_line:
+            return self
+        offset = start_line - self.start_line
+        moved = _Segment(self.key, start_line)
+        for kind in RESULT_KINDS:
+            setattr(moved, kind, [item._replace(line=item.line + offset) for item in getattr(self, kind)])
+        moved.depths = self.depths
+        return moved
+
+class _AnalysisVisitor:
+    """Dispatching visitor that extracts every result kind in one pass over the AST.
+
+    Nodes are visited in ``ast.walk`` (breadth-first) order so each result list
+    keeps exactly the ordering the per-kind extractors used to produce.
+    """
+    
+    # Result kind produced by each visit method
+    KINDS = {
+        'visit_Assign': 'variables',
+        'visit_FunctionDef': 'functions',
+        'visit_ClassDef': 'classes',
+        'visit_If': 'conditionals',
+        'visit_For': 'loops',
+        'visit_While': 'loops',
+    }
+    
+    def __init__(self, analyzer, kinds=None):
+        self.analyzer = analyzer  # Receives the results: an ASTAnalyzer or a _Segment
+        self.kinds = set(kinds) if kinds else set(self.KINDS.values())
+        self._dispatch = {}
+        
+    def _handler_for(self, node_type):
+        """Look up (and memoize) the visit method for a node type"""
+        try:
+            return self._dispatch[node_type]
+        except KeyError:
+            name = 'visit_' + node_type.__name__
+            handler = None
+            if self.KINDS.get(name) in self.kinds:
+                handler = getattr(self, name)
+            self._dispatch[node_type] = handler
+            return handler
+            
+    def run(self, tree):
+        """Traverse the tree once, dispatching each node to its visit method"""
+        dispatch = self._dispatch
+        handler_for = self._handler_for
+        for node in ast.walk(tree):
+            node_type = type(node)
+            handler = dispatch[node_type] if node_type in dispatch else handler_for(node_type)
+            if handler is not None:
+                handler(node)
+                
+    def iter_findings(self, tree, keep=True):
+        """Traverse the tree once, yielding the findings of each node as it is visited.
+        
+        With keep=False the result lists are emptied after every yield.
+        """
+        dispatch = self._dispatch
+        handler_for = self._handler_for
+        sink = self.analyzer
+        for node in ast.walk(tree):
+            node_type = type(node)
+            handler = dispatch[node_type] if node_type in dispatch else handler_for(node_type)
+            if handler is None:
+                continue
+            findings = getattr(sink, self.KINDS[handler.__name__])
+            start = len(findings)
+            handler(node)
+            if len(findings) > start:
+                yield from findings[start:]
+                if not keep:
+                    findings.clear()
+                    
+    def run_levels(self, root):
+        """Traverse a subtree level by level, recording which results each depth produced"""
+        dispatch = self._dispatch
+        handler_for = self._handler_for
+        sink = self.analyzer
+        level = [root]
+        depth = 1  # Top-level statements sit one level below the module
+        while level:
+            before = {kind: len(getattr(sink, kind)) for kind in RESULT_KINDS}
+            next_level = []
+            for node in level:
+                node_type = type(node)
+                handler = dispatch[node_type] if node_type in dispatch else handler_for(node_type)
+                if handler is not None:
+                    handler(node)
+                next_level.extend(ast.iter_child_nodes(node))
+            for kind in RESULT_KINDS:
+                after = len(getattr(sink, kind))
+                if after > before[kind]:
+                    sink.depths[kind].append((depth, before[kind], after))
+            level = next_level
+            depth += 1
+            
+    def visit_Assign(self, node):
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                # String representation of the value, rendered when first displayed
+                self.analyzer.variables.append(VariableRecord(
+                    name=target.id,
+                    line=getattr(node, 'lineno', 0),
+                    value=LazyValue(node.value, 50)
+                ))
+                
+    def visit_FunctionDef(self, node):
+        params = [arg.arg for arg in node.args.args]
+        self.analyzer.functions.append(FunctionRecord(
+            name=node.name,
+            line=getattr(node, 'lineno', 0),
+            params=params,
+            returns=None  # Would need to parse return statements separately
+        ))
+        
+    def visit_ClassDef(self, node):
+        methods = []
+        attributes = []
+        
+        for item in node.body:
+            if isinstance(item, ast.FunctionDef):
+                methods.append(item.name)
+            elif isinstance(item, ast.Assign):
+                for target in item.targets:
+                    if isinstance(target, ast.Name):
+                        attributes.append(target.id)
+                        
+        self.analyzer.classes.append(ClassRecord(
+            name=node.name,
+            line=getattr(node, 'lineno', 0),
+            methods=methods,
+            attributes=attributes
+        ))
+        
+    def visit_If(self, node):
+        self.analyzer.conditionals.append(ConditionalRecord(
+            line=getattr(node, 'lineno', 0),
+            type='if',
+            test=LazyValue(node.test, 50)
+        ))
+        
+    def visit_For(self, node):
+        self.analyzer.loops.append(LoopRecord(
+            line=getattr(node, 'lineno', 0),
+            type='for',
+            target=LazyValue(node.target, 30),
+            test=None
+        ))
+        
+    def visit_While(self, node):
+        self.analyzer.loops.append(LoopRecord(
+            line=getattr(node, 'lineno', 0),
+            type='while',
+            target=None,
+            test=LazyValue(node.test, 50)
+        ))
+
+# Example usage
+if __name__ == "__main__":
+    sample_code = """
+def fibonacci(n):
+    if n <= 1:
+        return n
+    else:
+        return fibonacci(n-1) + fibonacci(n-2)
+
+def main():
+    x = 10
+    y = 20
+    result = fibonacci(x)
+    print(result)
+    
+class Calculator:
+    def __init__(self):
+        self.result = 0
+        
+    def add(self, a, b):
+        self.result = a + b
+        return self.result
+
+for i in range(5):
+    print(i)
+"""
+    
+    analyzer = ASTAnalyzer(sample_code)
+    if analyzer.analyze():
+        results = analyzer.get_results()
+        print("Variables:", results['variables'])
+        print("Functions:", results['functions'])
+        print("Classes:", results['classes'])
+        print("Conditionals:", results['conditionals'])
         print("Loops:", results['loops'])
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Execution checkpoints for the Code Analysis and Debugging Visualizer
+Periodic snapshots of the debugger state used to step backwards through a run
+"""
+
+import bisect
+import sys
+
+class CheckpointStore:
+    """Snapshots taken every ``interval`` steps, thinned to stay within a memory budget.
+
+    Any step is rebuilt by restoring the nearest earlier snapshot and replaying
+    at most ``interval`` steps from it.
+    """
+
+    def __init__(self, interval=1000, memory_budget=64 * 1024 * 1024):
+        self.interval = interval
+        self.memory_budget = memory_budget  # Approximate bytes kept in snapshots
+        self.memory_used = 0
+        self._steps = []  # Sorted steps that have a snapshot
+        self._snapshots = {}  # Step -> (snapshot, size)
+
+    def wants(self, step):
+        """Check whether a snapshot should be taken at this step"""
+        return step % self.interval == 0 and step not in self._snapshots
+
+    def add(self, step, snapshot, size):
+        """Store a snapshot, dropping every other one if the budget is exceeded"""
+        if step in self._snapshots:
+            return
+        bisect.insort(self._steps, step)
+        self._snapshots[step] = (snapshot, size)
+        self.memory_used += size
+        while self.memory_used > self.memory_budget and len(self._steps) > 1:
+            self._thin()
+
+    def _thin(self):
+        """Double the interval and keep only the snapshots on the new grid"""
+        self.interval *= 2
+        kept = []
+        for step in self._steps:
+            if step % self.interval == 0:
+                kept.append(step)
+            else:
+                self.memory_used -= self._snapshots.pop(step)[1]
+        self._steps = kept
+
+    def nearest(self, step):
+        """Get (checkpoint step, snapshot) for the latest snapshot at or before step"""
+        position = bisect.bisect_right(self._steps, step)
+        if position == 0:
+            return None, None
+        checkpoint = self._steps[position - 1]
+        return checkpoint, self._snapshots[checkpoint][0]
+
+    def clear(self):
+        self.memory_used = 0
+        self._steps = []
+        self._snapshots = {}
+
+    def __len__(self):
+        return len(self._steps)
+
+def estimate_size(*containers):
+    """Approximate the bytes a snapshot adds; values are shared with the live state"""
+    return sum(sys.getsizeof(container) for container in containers)
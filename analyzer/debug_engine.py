@@ -4,40 +4,123 @@ Handles execution simulation and variable tracking
 """
 
 import ast
-import copy
+import bisect
 import traceback
 import sys
 import subprocess
 import os
+import threading
 from io import StringIO
+from types import MappingProxyType
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from analyzer.analysis_cache import shared_cache
+from analyzer.tracer import ExecutionTracer, EVENT_EXCEPTION, repr_is_truncated
+from analyzer.sampler import ExecutionSampler
+from analyzer.trace_worker import TraceWorker
+from analyzer.trace_file import save_trace, open_trace, remove_trace, index_path
+from analyzer.checkpoints import CheckpointStore, estimate_size
+from analyzer.step_store import StepStore
+from analyzer.line_index import LineIndex
+from analyzer.statement_steps import build_statement_steps
+from analyzer.watchpoints import parse_watch_expression
+from analyzer.native_runner import NativeRunner, BuildError, NATIVE_LANGUAGES
+
+EXECUTION_FLOW_WINDOW = 100_000  # Most recent flow entries kept; older ones are only counted
+
+class BreakpointNamespace(dict):
+    """Variables for breakpoint conditions, turning recorded reprs back into values when possible.
+    
+    lookup(name) returns the recorded text of a variable or raises KeyError;
+    only the names a condition uses are looked up. Raises ValueError for a
+    variable only recorded as a shortened repr, which the condition cannot
+    be checked against.
+    """
+    
+    def __init__(self, lookup):
+        super().__init__()
+        self.lookup = lookup
+        
+    def __missing__(self, name):
+        text = self.lookup(name)
+        try:
+            value = int(text)  # Most conditions compare counters, so skip the parser for them
+        except ValueError:
+            try:
+                value = ast.literal_eval(text)
+            except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+                value = None
+            if repr_is_truncated(text, value):
+                raise ValueError(f"{name} is only recorded in shortened form: {text}")
+            if value is None:
+                value = text  # Objects without a literal repr compare as their repr
+        self[name] = value
+        return value
+        
 class DebuggingEngine:
-    def __init__(self, source_code, filename="main.py", language="python"):
+    def __init__(self, source_code, filename="main.py", language="python", cache=shared_cache,
+                 execution_mode="trace", isolated=True, script_dir=None):
         self.source_code = source_code
         self.filename = filename
+        self.script_dir = script_dir  # Directory the traced program imports from and runs in
         self.language = language
         self.tree = None
         self.variables = {}
-        self.execution_steps = []
+        self.execution_steps = StepStore()
         self.current_step = 0
         self.breakpoints = set()
+        self.breakpoint_conditions = {}  # Line -> (condition source, compiled condition)
+        self.stopped_at_breakpoint = None  # Line of the breakpoint the last run stopped at
+        self.breakpoint_error = None  # Why the condition of that breakpoint could not be evaluated
+        self.watchpoints = []  # Watched expressions such as "self.result"
+        self.stopped_at_watchpoint = None  # [[expression, old, new], ...] of the change the last run stopped at
         self.error_state = False
         self.error_line = None
         self.error_message = ""
         self.line_states = {}  # Track execution state for each line
         self.execution_flow = []  # Track execution flow for visualization
+        self.flow_dropped = 0  # Flow entries dropped from the front of execution_flow
         self.call_stack = []  # Track function calls
         self.compiler_path = None  # Path to compiler for non-Python languages
+        self.build_cache_dir = None  # Where compiled programs are cached, None for the default
+        self.build_cached = False  # True when the last compiled run reused a cached build
+        self.native_runner = None  # NativeRunner building and running the program in the background
+        self._native_thread = None
+        self._native_result = None  # Trace or exception left by the background build
+        self.cache = cache  # Shared parse cache, None to always reparse
+        self.execution_mode = execution_mode  # "trace" runs the program, "sample" runs it taking stack samples, "simulate" walks the AST
+        self.isolated = isolated  # Trace in a worker process instead of in this process
+        self.trace_timeout = 10.0  # Seconds before a traced program is stopped
+        self.sample_timeout = 600.0  # Seconds before a sampled program is stopped
+        self.sample_interval_ms = 5  # Milliseconds between stack samples in sample mode
+        self.sample_every_events = None  # Sample every N call/return events instead of by time
+        self.trace_memory_limit_mb = 512  # Memory limit of the worker process
+        self.trace_max_steps = 5_000_000  # Steps recorded before a trace kept in memory is cut short
+        self.trace_file_max_steps = 1_000_000_000  # Steps recorded before a trace written to trace_path is cut short
+        self.trace = None  # ExecutionTrace recorded in trace mode
+        self.trace_worker = None  # Running TraceWorker while a trace is in progress
+        self.trace_path = None  # Trace file to record to; None keeps the trace in memory
+        self.checkpoints = CheckpointStore()  # State snapshots for stepping backwards
+        self.line_index = LineIndex()  # Steps that execute each line
+        self.output = ""  # Program output captured in trace mode
         
     def set_compiler_path(self, path):
         """Set the compiler path for non-Python languages"""
         self.compiler_path = path
         
+    def configure_checkpoints(self, interval=1000, memory_budget=64 * 1024 * 1024):
+        """Set how often state is snapshotted and how much memory the snapshots may use"""
+        self.checkpoints = CheckpointStore(interval, memory_budget)
+        self.record_checkpoint()
+        
     def parse(self):
         """Parse the source code based on language"""
         if self.language.lower() == "python":
             try:
-                self.tree = ast.parse(self.source_code)
+                if self.cache is not None:
+                    self.tree = self.cache.parse(self.source_code)
+                else:
+                    self.tree = ast.parse(self.source_code)
                 return True
             except SyntaxError as e:
                 self.error_state = True
@@ -52,10 +135,15 @@ class DebuggingEngine:
             
     def execute_step(self, step_index):
         """Execute a single step of the program"""
-        if self.language.lower() != "python":
-            # For non-Python languages, we simulate execution
+        if self.uses_simulated_steps():
+            # For non-Python languages without a compiled run, we simulate execution
             return self.simulate_execution(step_index)
             
+        if self.trace is not None:
+            if step_index >= len(self.execution_steps):
+                return False
+            return self.replay_step(step_index)
+            
         if not self.tree or step_index >= len(self.execution_steps):
             return False
             
@@ -68,28 +156,132 @@ class DebuggingEngine:
         line_num = step['line']
         
         # Track execution flow
-        if len(self.execution_flow) == 0 or self.execution_flow[-1] != line_num:
-            self.execution_flow.append(line_num)
+        self.track_flow(line_num)
+        self.update_call_stack(step_index)
         
-        # Randomly simulate some steps as successful and some as errors for demonstration
-        import random
-        if random.random() < 0.15:  # 15% chance of error
-            self.line_states[line_num] = {
-                'status': 'error',
-                'message': f"Runtime error at line {line_num}: Division by zero",
-                'filename': self.filename
-            }
+        # Simulated steps do not run the code, so they cannot fail; errors come from tracing
+        self.line_states[line_num] = {
+            'status': 'success',
+            'message': f"Executed successfully at line {line_num}",
+            'filename': self.filename
+        }
+            
+        return True
+        
+    def replay_step(self, step_index):
+        """Apply a step recorded by the tracer"""
+        self.current_step = step_index
+        steps = self.execution_steps
+        line_num = steps.lines[step_index]
+        
+        # Track execution flow
+        self.track_flow(line_num)
+            
+        self.line_states[line_num] = self.trace_line_state(step_index, line_num)
+            
+        self.replay_variables(step_index)
+            
+        self.update_call_stack(step_index)
+        return True
+        
+    def replay_variables(self, step_index):
+        """Show the variables recorded at a step; steps past the recorded ones show none"""
+        variables = self.trace.variables.state_at(step_index)
+        self.variables = variables if variables is not None else {}
+        
+    def get_variables_note(self):
+        """Explain why the current step has no variables, or None if they were recorded"""
+        if self.trace is None:
+            return None
+        limit = self.trace.variables.limit
+        if limit is not None and self.current_step >= limit:
+            if limit == 0:
+                return "Variables are not recorded in this mode"
+            return f"Variables not recorded beyond step {limit}"
+        return None
+        
+    def update_call_stack(self, step_index):
+        """Keep one frame per call level of a step, the innermost frame last"""
+        steps = self.execution_steps
+        depth = steps.depths[step_index]
+        if depth < 1:
+            return
+        frame = {'function': steps.function_names[steps.functions[step_index]], 'line': steps.lines[step_index]}
+        del self.call_stack[depth:]
+        while len(self.call_stack) < depth:
+            self.call_stack.append(frame)
+        self.call_stack[depth - 1] = frame
+        
+    def trace_line_state(self, step_index, line_num):
+        """Build the state a recorded step leaves on its line, entering the error state if it raised"""
+        error = self.trace.error
+        if error is not None and error['step'] == step_index:
             self.error_state = True
             self.error_line = line_num
-            self.error_message = f"Runtime error at line {line_num}: Division by zero"
-        else:
-            self.line_states[line_num] = {
-                'status': 'success',
-                'message': f"Executed successfully at line {line_num}",
+            self.error_message = error['message']
+            return {
+                'status': 'error',
+                'message': f"Runtime error at line {line_num}: {error['message']}",
                 'filename': self.filename
             }
-            
-        return True
+        message = self.trace.messages.get(step_index)
+        return {
+            'status': 'success',
+            'message': f"Handled {message} at line {line_num}" if message else f"Executed successfully at line {line_num}",
+            'filename': self.filename
+        }
+        
+    def replay_until(self, last_step, breakpoint_lines=None):
+        """Replay recorded steps up to last_step in bulk, stopping early at a breakpoint.
+        
+        Steps are applied in segments that end on the checkpoint interval, and
+        line states, variables and frames are materialized once per segment
+        rather than once per step. Returns the breakpoint line that stopped the
+        run, or None.
+        """
+        steps = self.execution_steps
+        lines, depths, functions = steps.lines, steps.depths, steps.functions
+        flow = self.execution_flow
+        last_flow = flow[-1] if flow else None
+        stack = [(steps.function_names.index(frame['function']), frame['line']) for frame in self.call_stack]
+        bitmap_size = len(breakpoint_lines) if breakpoint_lines is not None else 0
+        stopped = None
+        step = self.current_step
+        
+        while step < last_step and stopped is None:
+            interval = self.checkpoints.interval
+            segment_end = min(last_step, (step // interval + 1) * interval)
+            last_seen = {}  # Line -> last step in this segment that executed it
+            for index in range(step + 1, segment_end + 1):
+                line = lines[index]
+                if line != last_flow:
+                    flow.append(line)
+                    last_flow = line
+                last_seen[line] = index
+                depth = depths[index]
+                frame = (functions[index], line)
+                if depth == len(stack):
+                    stack[-1] = frame
+                else:
+                    del stack[depth:]
+                    while len(stack) < depth:
+                        stack.append(frame)
+                    stack[depth - 1] = frame
+                if line < bitmap_size and breakpoint_lines[line] and self.breakpoint_hit(line, index):
+                    stopped = line
+                    segment_end = index
+                    break
+                    
+            if len(flow) > 2 * EXECUTION_FLOW_WINDOW:
+                self.trim_flow()
+            for line, index in last_seen.items():
+                self.line_states[line] = self.trace_line_state(index, line)
+            step = self.current_step = segment_end
+            self.replay_variables(step)
+            self.call_stack = [{'function': steps.function_names[function], 'line': line}
+                               for function, line in stack]
+            self.record_checkpoint()
+        return stopped
         
     def simulate_execution(self, step_index):
         """Simulate execution for non-Python languages"""
@@ -105,26 +297,14 @@ class DebuggingEngine:
         line_num = step.get('line', step_index + 1)
         
         # Track execution flow
-        if len(self.execution_flow) == 0 or self.execution_flow[-1] != line_num:
-            self.execution_flow.append(line_num)
+        self.track_flow(line_num)
         
-        # Randomly simulate some steps as successful and some as errors for demonstration
-        import random
-        if random.random() < 0.15:  # 15% chance of error
-            self.line_states[line_num] = {
-                'status': 'error',
-                'message': f"Runtime error at line {line_num}: Execution failed",
-                'filename': self.filename
-            }
-            self.error_state = True
-            self.error_line = line_num
-            self.error_message = f"Runtime error at line {line_num}: Execution failed"
-        else:
-            self.line_states[line_num] = {
-                'status': 'success',
-                'message': f"Executed successfully at line {line_num}",
-                'filename': self.filename
-            }
+        # Simulated steps do not run the code, so they cannot fail; errors come from tracing
+        self.line_states[line_num] = {
+            'status': 'success',
+            'message': f"Executed successfully at line {line_num}",
+            'filename': self.filename
+        }
             
         return True
         
@@ -144,57 +324,223 @@ class DebuggingEngine:
         
     def step_forward(self):
         """Move one step forward in execution"""
-        if self.language.lower() != "python":
+        if self.uses_simulated_steps():
             if not hasattr(self, 'simulated_steps'):
                 self.simulated_steps = self.create_simulated_steps()
             if self.current_step < len(self.simulated_steps) - 1:
                 self.current_step += 1
-                return self.simulate_execution(self.current_step)
+                if not self.simulate_execution(self.current_step):
+                    return False
+                self.record_checkpoint()
+                return True
             return False
             
         if self.current_step < len(self.execution_steps) - 1:
             self.current_step += 1
-            return self.execute_step(self.current_step)
+            if not self.execute_step(self.current_step):
+                return False
+            self.record_checkpoint()
+            return True
         return False
         
     def step_back(self):
         """Move one step backward in execution"""
         if self.current_step > 0:
-            self.current_step -= 1
-            # Reset state to this step
-            return True
+            return self.go_to_step(self.current_step - 1)
         return False
         
+    def go_to_step(self, step_index):
+        """Rebuild the execution state at any step.
+        
+        Going backwards restores the nearest earlier checkpoint and replays at
+        most one checkpoint interval of steps from it.
+        """
+        steps = getattr(self, 'simulated_steps', []) if self.uses_simulated_steps() else self.execution_steps
+        if not 0 <= step_index < len(steps):
+            return False
+            
+        if step_index < self.current_step:
+            checkpoint, snapshot = self.checkpoints.nearest(step_index)
+            if snapshot is None:
+                return False
+            self.restore_checkpoint(checkpoint, snapshot)
+            
+        if self.trace is not None:
+            if self.current_step < step_index:
+                self.replay_until(step_index)
+            return True
+            
+        while self.current_step < step_index:
+            if not self.step_forward():
+                return False
+        return True
+        
+    def record_checkpoint(self):
+        """Snapshot the state at the current step if it falls on the checkpoint interval"""
+        if not self.checkpoints.wants(self.current_step):
+            return
+        # Line states and frames are replaced rather than mutated, so the
+        # snapshot shares them with the live state and copies only containers
+        snapshot = {
+            'line_states': dict(self.line_states),
+            'flow_length': self.get_execution_flow_length(),
+            'variables': self.variables,
+            'call_stack': list(self.call_stack),
+            'error': (self.error_state, self.error_line, self.error_message)
+        }
+        size = estimate_size(snapshot, snapshot['line_states'], snapshot['call_stack'])
+        self.checkpoints.add(self.current_step, snapshot, size)
+        
+    def restore_checkpoint(self, step_index, snapshot):
+        """Return to the state captured at an earlier step"""
+        self.current_step = step_index
+        self.line_states = dict(snapshot['line_states'])
+        # The flow only grows while stepping forward, so the earlier flow is a prefix,
+        # unless that part was already dropped from the window
+        keep = snapshot['flow_length'] - self.flow_dropped
+        if keep >= 0:
+            del self.execution_flow[keep:]
+        else:
+            self.execution_flow.clear()
+            self.flow_dropped = snapshot['flow_length']
+        self.variables = snapshot['variables']
+        self.call_stack = list(snapshot['call_stack'])
+        self.error_state, self.error_line, self.error_message = snapshot['error']
+        
     def run_to_end(self):
-        """Run execution to the end"""
-        if self.language.lower() != "python":
-            if not hasattr(self, 'simulated_steps'):
-                self.simulated_steps = self.create_simulated_steps()
-            while self.current_step < len(self.simulated_steps) - 1:
-                if not self.step_forward():
-                    return False
+        """Run execution to the end, or until a breakpoint is hit.
+        
+        The step that hits a breakpoint becomes the current step and its line
+        is kept in stopped_at_breakpoint. Breakpoints on the current step are
+        not hit again, so calling this once more continues past them.
+        """
+        self.stopped_at_breakpoint = None
+        self.stopped_at_watchpoint = None
+        self.breakpoint_error = None
+        breakpoint_lines = self.build_breakpoint_bitmap()
+        
+        if self.trace is not None:
+            # Watch hits are known from the trace, so the run simply ends at the next one
+            last_step = len(self.execution_steps) - 1
+            hits = self.get_watch_hit_steps()
+            position = bisect.bisect_right(hits, self.current_step)
+            if position < len(hits):
+                last_step = min(last_step, hits[position])
+            if self.current_step < last_step:
+                self.stopped_at_breakpoint = self.replay_until(last_step, breakpoint_lines)
+                if position < len(hits) and self.current_step == hits[position]:
+                    self.stopped_at_watchpoint = self.get_watch_changes(self.current_step)
             return True
             
-        while self.current_step < len(self.execution_steps) - 1:
+        if self.uses_simulated_steps():
+            if not hasattr(self, 'simulated_steps'):
+                self.simulated_steps = self.create_simulated_steps()
+            steps = self.simulated_steps
+        else:
+            steps = self.execution_steps
+        while self.current_step < len(steps) - 1:
             if not self.step_forward():
                 return False
+            line = steps[self.current_step].get('line', self.current_step + 1)
+            if line < len(breakpoint_lines) and breakpoint_lines[line] and self.breakpoint_hit(line, self.current_step):
+                self.stopped_at_breakpoint = line
+                break
         return True
         
-    def set_breakpoint(self, line_number):
-        """Set a breakpoint at the specified line"""
+    def set_breakpoint(self, line_number, condition=None):
+        """Set a breakpoint at the specified line, optionally only when a condition holds.
+        
+        The condition is a Python expression over the program's variables. It
+        is compiled here, so a SyntaxError is raised when it is set rather
+        than when it is hit.
+        """
         self.breakpoints.add(line_number)
+        if condition:
+            code = compile(condition, f"<breakpoint line {line_number}>", 'eval')
+            self.breakpoint_conditions[line_number] = (condition, code)
+        else:
+            self.breakpoint_conditions.pop(line_number, None)
         
     def remove_breakpoint(self, line_number):
         """Remove a breakpoint at the specified line"""
         self.breakpoints.discard(line_number)
+        self.breakpoint_conditions.pop(line_number, None)
+        
+    def add_watchpoint(self, expression):
+        """Stop runs when a variable or attribute, such as self.result, changes.
+        
+        Changes are detected while the program is traced, so a watchpoint added
+        after tracing takes effect once the program is traced again. Raises
+        ValueError if the expression is not a name or attribute chain.
+        """
+        parse_watch_expression(expression)
+        expression = expression.strip()
+        if expression not in self.watchpoints:
+            self.watchpoints.append(expression)
+            
+    def remove_watchpoint(self, expression):
+        """Stop watching an expression"""
+        if expression in self.watchpoints:
+            self.watchpoints.remove(expression)
+            
+    def get_watch_changes(self, step_index):
+        """Get [expression, old, new] for the watched changes first seen at a step"""
+        if self.trace is None:
+            return []
+        return [change for change in self.trace.watch_hits.get(step_index, ()) if change[0] in self.watchpoints]
+        
+    def get_watch_hit_steps(self):
+        """Get the sorted steps at which a watched value changed"""
+        if self.trace is None or not self.watchpoints:
+            return []
+        return sorted(step for step, changes in self.trace.watch_hits.items()
+                      if any(change[0] in self.watchpoints for change in changes))
+        
+    def get_breakpoint_condition(self, line_number):
+        """Get the condition of a breakpoint, or None if it always stops"""
+        condition = self.breakpoint_conditions.get(line_number)
+        return condition[0] if condition else None
+        
+    def build_breakpoint_bitmap(self):
+        """Build a bytearray with a nonzero byte for each line that has a breakpoint"""
+        size = max(self.breakpoints, default=0) + 1
+        bitmap = bytearray(size)
+        for line in self.breakpoints:
+            if line > 0:
+                bitmap[line] = 1
+        return bitmap
+        
+    def breakpoint_hit(self, line_number, step_index):
+        """Check whether the breakpoint on a line stops the step.
+        
+        Conditions see the variables of that step; steps past the recorded
+        variables never satisfy a condition.
+        """
+        condition = self.breakpoint_conditions.get(line_number)
+        if condition is None:
+            return True
+        source, code = condition
+        if self.trace is not None:
+            history = self.trace.variables
+            if history.limit is not None and step_index >= history.limit:
+                return False
+            lookup = lambda name: history.value_at(step_index, name)
+        else:
+            lookup = self.variables.__getitem__
+        try:
+            return bool(eval(code, {'__builtins__': __builtins__}, BreakpointNamespace(lookup)))
+        except Exception as e:
+            # A condition that cannot be evaluated stops the run so it can be fixed
+            self.breakpoint_error = f"Breakpoint condition {source!r} failed: {type(e).__name__}: {e}"
+            return True
         
     def get_current_variables(self):
-        """Get the current state of variables"""
-        return copy.deepcopy(self.variables)
+        """Get a read-only view of the current variables"""
+        return MappingProxyType(self.variables)
         
     def get_execution_timeline(self):
         """Get the execution timeline"""
-        if self.language.lower() != "python":
+        if self.uses_simulated_steps():
             return getattr(self, 'simulated_steps', [])[:self.current_step+1]
         return self.execution_steps[:self.current_step+1]
         
@@ -202,6 +548,38 @@ class DebuggingEngine:
         """Get the execution state for a specific line"""
         return self.line_states.get(line_number, {'status': 'pending', 'message': 'Not executed yet', 'filename': self.filename})
         
+    def get_line_hits(self, line_number):
+        """Count how often a line has executed up to the current step"""
+        return self.line_index.hits(line_number, self.current_step)
+        
+    def get_coverage(self):
+        """Get {line: hits} for the lines executed up to the current step"""
+        return self.line_index.coverage(self.current_step)
+        
+    def get_total_coverage(self):
+        """Get {line: hits} over the whole run, whatever the current step"""
+        return self.line_index.coverage()
+        
+    def next_execution(self, line_number):
+        """Get the next step that executes a line, or None"""
+        return self.line_index.next_execution(line_number, self.current_step)
+        
+    def previous_execution(self, line_number):
+        """Get the previous step that executed a line, or None"""
+        return self.line_index.previous_execution(line_number, self.current_step)
+        
+    def get_line_transitions(self):
+        """Count how often execution moved from one line to another over the whole run, for hot path graphs"""
+        if self.trace is not None:
+            lines = self.trace.lines
+        else:
+            lines = [step['line'] for step in self.execution_steps]
+        transitions = {}
+        for edge in zip(lines, lines[1:]):
+            if edge[0] != edge[1]:
+                transitions[edge] = transitions.get(edge, 0) + 1
+        return transitions
+        
     def has_error(self):
         """Check if there's an error in execution"""
         return self.error_state
@@ -223,43 +601,259 @@ class DebuggingEngine:
         self.error_message = ""
         self.line_states = {}
         self.execution_flow = []
+        self.flow_dropped = 0
         self.call_stack = []
+        self.variables = {}
+        self.checkpoints.clear()
         
+    def track_flow(self, line_num):
+        """Add a line to the execution flow when execution moves to it"""
+        flow = self.execution_flow
+        if not flow or flow[-1] != line_num:
+            flow.append(line_num)
+            if len(flow) > 2 * EXECUTION_FLOW_WINDOW:
+                self.trim_flow()
+                
+    def trim_flow(self):
+        """Drop all but the most recent EXECUTION_FLOW_WINDOW flow entries, so long runs do not keep every one"""
+        drop = len(self.execution_flow) - EXECUTION_FLOW_WINDOW
+        if drop > 0:
+            del self.execution_flow[:drop]
+            self.flow_dropped += drop
+            
     def get_execution_flow(self):
-        """Get the execution flow for visualization"""
+        """Get the most recent part of the execution flow, for visualization"""
         return self.execution_flow
         
+    def get_execution_flow_length(self):
+        """Get the number of flow entries so far, including the ones dropped from the window"""
+        return self.flow_dropped + len(self.execution_flow)
+        
     def get_call_stack(self):
         """Get the current call stack"""
         return self.call_stack
         
+    def build_step_skeleton(self):
+        """Build the (line, statement type, depth, function) steps of a simulated run"""
+        return build_statement_steps(self.tree)
+        
+    def build_statement_types(self):
+        """Map each line to the type of the first statement starting on it"""
+        statement_types = {}
+        if self.tree is None:
+            return statement_types  # Compiled languages are not parsed
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.stmt):
+                if node.lineno not in statement_types or node.col_offset < statement_types[node.lineno][0]:
+                    statement_types[node.lineno] = (node.col_offset, type(node).__name__)
+        return {line: node_type for line, (col, node_type) in statement_types.items()}
+        
+    def sampling_options(self):
+        """Get the sampler settings in sample mode, or None when every line is traced"""
+        if self.execution_mode != "sample":
+            return None
+        return {'interval_ms': self.sample_interval_ms, 'every_events': self.sample_every_events}
+        
+    def runs_natively(self):
+        """Check whether the program is compiled with compiler_path and run for real"""
+        return (bool(self.compiler_path) and self.language.lower() in NATIVE_LANGUAGES
+                and self.execution_mode != "simulate")
+        
+    def runs_in_background(self):
+        """Check whether the program is run through start_tracing and poll_tracing before its steps are shown"""
+        if self.language.lower() == "python":
+            return self.execution_mode in ("trace", "sample")
+        return self.runs_natively()
+        
+    def start_tracing(self):
+        """Start tracing the program in a worker process, or building and running it in a thread, without waiting"""
+        if self.trace_worker is not None:
+            # A run still in progress is stopped before the next one starts
+            self.trace_worker.cancel()
+            self.trace_worker.wait().close()
+            self.trace_worker = None
+        if self._native_thread is not None:
+            self.native_runner.cancel()
+            self._native_thread.join()
+            self._native_thread = self.native_runner = None
+        self.trace = None
+        
+        if self.runs_natively():
+            self.native_runner = self.make_native_runner()
+            self._native_result = None
+            self._native_thread = threading.Thread(target=self._run_native_job, args=(self.native_runner,), daemon=True)
+            self._native_thread.start()
+            return
+            
+        sampling = self.sampling_options()
+        timeout = self.sample_timeout if sampling is not None else self.trace_timeout
+        self.trace_worker = TraceWorker(self.source_code, self.filename, timeout,
+                                        self.trace_memory_limit_mb, max_steps=self.step_limit(),
+                                        trace_path=self.trace_path,
+                                        watch=self.watchpoints, sampling=sampling,
+                                        script_dir=self.script_dir)
+        self.trace_worker.start()
+        
+    def poll_tracing(self):
+        """Check on the run started by start_tracing; return True once it is over"""
+        if self._native_thread is not None:
+            if self._native_thread.is_alive():
+                return False
+            self._native_thread = None
+            self.apply_native_result(self.native_runner, self._native_result)
+            self.native_runner = None
+            return True
+        if self.trace_worker is None:
+            return self.trace is not None
+        if not self.trace_worker.poll():
+            return False
+        self.trace = self.trace_worker.trace
+        self.output = self.trace.output
+        self.trace_worker = None
+        return True
+        
+    def cancel_tracing(self):
+        """Stop a running worker, keeping the steps recorded so far, or a background build"""
+        if self.trace_worker is not None:
+            self.trace_worker.cancel()
+        if self.native_runner is not None:
+            self.native_runner.cancel()
+            
+    def trace_execution(self):
+        """Run the program under the tracer, blocking until it finishes"""
+        if self.isolated:
+            self.start_tracing()
+            self.trace_worker.wait()
+            self.poll_tracing()
+        else:
+            sampling = self.sampling_options()
+            if sampling is not None:
+                tracer = ExecutionSampler(self.filename, sampling['interval_ms'], sampling['every_events'],
+                                          self.step_limit())
+            else:
+                tracer = ExecutionTracer(self.filename, self.step_limit(), watch=self.watchpoints)
+            self.trace = tracer.run(self.source_code)
+            if self.trace_path is not None:
+                save_trace(self.trace, self.trace_path)
+                self.trace = open_trace(self.trace_path)
+            self.output = self.trace.output
+            
+    def step_limit(self):
+        """Get the number of steps a trace may record: traces written to a file are bounded by disk, not memory"""
+        return self.trace_file_max_steps if self.trace_path is not None else self.trace_max_steps
+        
+    def uses_simulated_steps(self):
+        """Check whether steps are simulated, as for non-Python code that has not been compiled and run"""
+        return self.language.lower() != "python" and self.trace is None
+        
+    def make_native_runner(self):
+        """Create the runner that builds and runs the program with the configured compiler"""
+        return NativeRunner(self.source_code, self.filename, self.language, self.compiler_path,
+                            self.build_cache_dir, self.trace_timeout)
+        
+    def _run_native_job(self, runner):
+        """Build and run the program, keeping the trace or the exception that stopped it"""
+        try:
+            self._native_result = runner.run()
+        except (BuildError, OSError, subprocess.SubprocessError) as e:
+            self._native_result = e
+            
+    def apply_native_result(self, runner, result):
+        """Take the trace of a finished build and run, or enter the error state of a failed or cancelled one"""
+        if runner.cancelled or isinstance(result, Exception):
+            self.error_state = True
+            self.error_line = getattr(result, 'line', None)
+            if runner.cancelled:
+                self.error_message = "Build and run cancelled"
+            elif isinstance(result, BuildError):
+                self.error_message = str(result)
+            else:
+                self.error_message = f"Could not build and run with {self.compiler_path}: {result}"
+            return False
+        self.trace = result
+        self.build_cached = runner.cache_hit
+        self.output = self.trace.output
+        return True
+        
+    def run_native(self):
+        """Build and run a compiled program with compiler_path, blocking until it finishes; return True on success"""
+        runner = self.make_native_runner()
+        self._run_native_job(runner)
+        return self.apply_native_result(runner, self._native_result)
+        
+    def discard_trace(self):
+        """Drop the recorded trace and delete its trace file"""
+        self.cancel_tracing()
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+        if self.trace_path is not None:
+            remove_trace(self.trace_path)
+            
+    def build_trace_steps(self):
+        """Build the execution steps from the recorded trace"""
+        trace = self.trace
+        steps = StepStore()
+        steps.function_names = trace.function_names
+        steps.messages = trace.messages  # Only exception steps have messages
+        
+        # Steps read the trace's columns, in memory or mapped from its file;
+        # every step on a line takes the type of the line's statement
+        exceptions = {index: 'Exception' for index in trace.messages if trace.events[index] == EVENT_EXCEPTION}
+        steps.share_columns(trace.lines, trace.depths, trace.functions, self.build_statement_types(),
+                            self.filename, exceptions)
+        self.execution_steps = steps
+        if trace.line_index is None:
+            if trace.path is not None:
+                trace.line_index = LineIndex.build_file(trace.lines, index_path(trace.path))
+            else:
+                trace.line_index = LineIndex.build(trace.lines)
+        self.line_index = trace.line_index
+        
+        # The first recorded step is where execution starts
+        if self.execution_steps:
+            self.replay_step(0)
+            
     def initialize_execution_steps(self):
         """Initialize the execution steps based on the language"""
         if self.language.lower() == "python":
             if not self.tree:
                 return
                 
-            # Clear previous steps
-            self.execution_steps = []
+            if self.execution_mode in ("trace", "sample"):
+                # A finished trace is reused; resetting only replays it from the start
+                if self.trace is None:
+                    self.trace_execution()
+                self.build_trace_steps()
+                self.record_checkpoint()
+                return
                 
-            # Walk the tree and create execution steps
-            for node in ast.walk(self.tree):
-                if hasattr(node, 'lineno'):
-                    lineno = getattr(node, 'lineno', 0)
-                    if lineno > 0:  # Only add steps with valid line numbers
-                        step = {
-                            'line': lineno,
-                            'type': type(node).__name__,
-                            'description': f"Executing {type(node).__name__} at line {lineno}",
-                            'filename': self.filename
-                        }
-                        self.execution_steps.append(step)
+            self.trace = None
+            skeleton = self.cache.get_steps(self.source_code) if self.cache is not None else None
+            if skeleton is None:
+                skeleton = self.build_step_skeleton()
+                if self.cache is not None:
+                    self.cache.put_steps(self.source_code, skeleton)
                     
-            # Sort steps by line number
-            self.execution_steps.sort(key=lambda x: x['line'])
+            # Clear previous steps
+            self.execution_steps = StepStore()
+            steps = self.execution_steps
+            for lineno, node_type, depth, function in skeleton:
+                steps.append(lineno, node_type, self.filename, depth, steps.function_id(function))
+            self.line_index = LineIndex.build(self.execution_steps.lines)
         else:
+            # Compiled languages run for real, in the background, when a compiler is configured;
+            # without a finished run (start_tracing) the steps are simulated
+            if self.runs_natively():
+                if self.trace is not None:
+                    self.build_trace_steps()
+                    self.record_checkpoint()
+                    return
+                    
             # For non-Python languages, create simulated steps
             self.simulated_steps = self.create_simulated_steps()
+            self.line_index = LineIndex.build(step['line'] for step in self.simulated_steps)
+        self.record_checkpoint()
 
 # Example usage
 if __name__ == "__main__":
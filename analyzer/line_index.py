@@ -0,0 +1,119 @@
+"""
+Line Index for the Code Analysis and Debugging Visualizer
+Postings lists from each line to the steps that executed it
+"""
+
+import bisect
+import mmap
+from array import array
+from collections import Counter
+
+BUILD_CHUNK = 1_000_000  # Steps grouped in memory at a time when building a postings file
+
+class LineIndex:
+    """Sorted step indices per line, for hit counts and line navigation in O(log n)"""
+
+    def __init__(self):
+        self.postings = {}  # Line -> array of step indices, ascending
+        self.step_count = 0
+        self.mapping = None  # Postings file the lists are read from, if any
+
+    @classmethod
+    def build(cls, lines):
+        """Index every step of a line column"""
+        index = cls()
+        index.add_steps(lines)
+        return index
+
+    @classmethod
+    def build_file(cls, lines, path):
+        """Index a line column into a postings file read back through mmap, for runs larger than memory"""
+        counts = Counter(lines)
+        offsets = {}
+        total = 0
+        for line in sorted(counts):
+            offsets[line] = total
+            total += counts[line]
+        with open(path, 'w+b') as f:
+            f.truncate(max(total, 1) * 4)
+            mapping = mmap.mmap(f.fileno(), 0)
+        column = memoryview(mapping).cast('I')
+
+        # Steps are grouped by line one chunk at a time and copied to each line's region
+        positions = dict(offsets)
+        for start in range(0, total, BUILD_CHUNK):
+            chunk = {}
+            for step, line in enumerate(lines[start:start + BUILD_CHUNK], start):
+                steps = chunk.get(line)
+                if steps is None:
+                    steps = chunk[line] = array('I')
+                steps.append(step)
+            for line, steps in chunk.items():
+                position = positions[line]
+                column[position:position + len(steps)] = steps
+                positions[line] = position + len(steps)
+
+        index = cls()
+        index.postings = {line: column[offsets[line]:offsets[line] + count] for line, count in counts.items()}
+        index.step_count = total
+        index.mapping = mapping
+        return index
+
+    def close(self):
+        """Unmap the postings file, if the index has one"""
+        if self.mapping is None:
+            return
+        for steps in self.postings.values():
+            steps.release()
+        self.postings = {}
+        try:
+            self.mapping.close()
+        except BufferError:
+            pass  # Views handed out elsewhere keep the mapping open until collected
+        self.mapping = None
+
+    def add_steps(self, lines):
+        """Index the steps that follow the ones already indexed"""
+        postings = self.postings
+        step = self.step_count
+        for line in lines:
+            steps = postings.get(line)
+            if steps is None:
+                steps = postings[line] = array('I')
+            steps.append(step)
+            step += 1
+        self.step_count = step
+
+    def hits(self, line, upto=None):
+        """Count the executions of a line at or before step upto (all steps if None)"""
+        steps = self.postings.get(line)
+        if steps is None:
+            return 0
+        if upto is None:
+            return len(steps)
+        return bisect.bisect_right(steps, upto)
+
+    def next_execution(self, line, after):
+        """Get the first step after the given one that executes the line, or None"""
+        steps = self.postings.get(line)
+        if steps is None:
+            return None
+        position = bisect.bisect_right(steps, after)
+        return steps[position] if position < len(steps) else None
+
+    def previous_execution(self, line, before):
+        """Get the last step before the given one that executes the line, or None"""
+        steps = self.postings.get(line)
+        if steps is None:
+            return None
+        position = bisect.bisect_left(steps, before)
+        return steps[position - 1] if position else None
+
+    def coverage(self, upto=None):
+        """Get {line: hits} for every line executed at or before step upto"""
+        counts = {}
+        for line in self.postings:
+            hits = self.hits(line, upto)
+            if hits:
+                counts[line] = hits
+        return counts
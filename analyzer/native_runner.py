@@ -0,0 +1,593 @@
+"""
+Native Runner for the Code Analysis and Debugging Visualizer
+Builds and runs C++ and Java programs with line tracing, caching builds by source hash
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import re
+import select
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from array import array
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.tracer import ExecutionTrace, EVENT_LINE
+
+BUILD_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'codeflow_build')
+
+# Language codes the runner can build; everything but Java is compiled as C or C++
+NATIVE_LANGUAGES = ('cpp', 'c++', 'c', 'java')
+
+# Bump when the probe or the build flags change so older builds are not reused
+PROBE_VERSION = 1
+
+# Flags that make the compiler call the probe on every basic block and function entry and exit
+CPP_TRACE_FLAGS = ['-g', '-O0', '-fsanitize-coverage=trace-pc', '-finstrument-functions']
+
+# Event kinds, stored in the top two bits of each 64-bit probe record
+PROBE_BLOCK = 0
+PROBE_ENTER = 1
+PROBE_EXIT = 2
+_ADDRESS_MASK = (1 << 62) - 1
+
+# Functions the compiler adds for static initialization, not written in the program
+_GENERATED_PREFIXES = ('_GLOBAL__', '__static_initialization')
+
+# Linked into C++ programs; records go to the file named by CODEFLOW_TRACE as
+# addresses relative to the executable's load address
+PROBE_SOURCE = r'''
+#define _GNU_SOURCE
+#include <fcntl.h>
+#include <link.h>
+#include <signal.h>
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <unistd.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+#define CF_NOINST __attribute__((no_instrument_function))
+
+static int cf_state;  /* 0 before the first event, 1 recording, 2 off */
+static int cf_fd = -1;
+static uint64_t cf_bias, cf_limit, cf_count;
+static uint64_t cf_buffer[8192];
+static size_t cf_used;
+
+static int CF_NOINST cf_main_object(struct dl_phdr_info *info, size_t size, void *data) {
+    *(uint64_t *)data = (uint64_t)info->dlpi_addr;
+    return 1;
+}
+
+static void CF_NOINST cf_flush(void) {
+    const char *bytes = (const char *)cf_buffer;
+    size_t offset = 0, total = cf_used * sizeof(uint64_t);
+    while (offset < total) {
+        ssize_t written = write(cf_fd, bytes + offset, total - offset);
+        if (written <= 0)
+            break;
+        offset += (size_t)written;
+    }
+    cf_used = 0;
+}
+
+static void CF_NOINST cf_on_signal(int sig) {
+    cf_flush();
+    signal(sig, SIG_DFL);
+    raise(sig);
+}
+
+static void CF_NOINST cf_start(void) {
+    const char *path = getenv("CODEFLOW_TRACE");
+    const char *limit = getenv("CODEFLOW_MAX_EVENTS");
+    cf_state = 2;
+    if (!path || (cf_fd = open(path, O_WRONLY | O_CREAT | O_TRUNC, 0644)) < 0)
+        return;
+    cf_limit = limit ? strtoull(limit, NULL, 10) : 0;
+    dl_iterate_phdr(cf_main_object, &cf_bias);
+    atexit(cf_flush);
+    signal(SIGSEGV, cf_on_signal);
+    signal(SIGABRT, cf_on_signal);
+    signal(SIGFPE, cf_on_signal);
+    signal(SIGBUS, cf_on_signal);
+    signal(SIGILL, cf_on_signal);
+    signal(SIGTERM, cf_on_signal);
+    /* Complete lines of output survive a crash */
+    setvbuf(stdout, NULL, _IOLBF, 0);
+    cf_state = 1;
+}
+
+static void CF_NOINST cf_record(uint64_t kind, void *address) {
+    if (cf_state != 1) {
+        if (cf_state == 2)
+            return;
+        cf_start();
+        if (cf_state != 1)
+            return;
+    }
+    if (cf_limit && cf_count >= cf_limit)
+        return;
+    cf_count++;
+    cf_buffer[cf_used++] = (kind << 62) | ((uint64_t)(uintptr_t)address - cf_bias);
+    if (cf_used == sizeof(cf_buffer) / sizeof(cf_buffer[0]) || cf_count == cf_limit)
+        cf_flush();
+}
+
+void CF_NOINST __sanitizer_cov_trace_pc(void) { cf_record(0, __builtin_return_address(0)); }
+void CF_NOINST __cyg_profile_func_enter(void *fn, void *site) { cf_record(1, fn); }
+void CF_NOINST __cyg_profile_func_exit(void *fn, void *site) { cf_record(2, fn); }
+
+#ifdef __cplusplus
+}
+#endif
+'''
+
+class BuildError(Exception):
+    """The compiler rejected the program; line is the first error line in the source, if known"""
+
+    def __init__(self, message, line=None, output=""):
+        super().__init__(message)
+        self.line = line
+        self.output = output
+
+def source_hash(*parts):
+    """Hash the inputs of a build into its cache key"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def unsupported_platform(language, platform=None):
+    """Explain why programs in a language cannot be traced on a platform, or None if they can.
+
+    The C++ probe finds the load address with dl_iterate_phdr and lines are
+    read from objdump's DWARF output, which needs Linux; Java is stepped with
+    select() on jdb's pipes, which Windows does not support.
+    """
+    platform = platform or sys.platform
+    if language.lower() == 'java':
+        if platform.startswith(('win', 'cygwin')):
+            return f"Unsupported platform: Java programs cannot be traced on {platform}"
+    elif not platform.startswith('linux'):
+        return f"Unsupported platform: C and C++ programs can only be traced on Linux, not {platform}"
+    return None
+
+def _first_error_line(output, filename):
+    """Find the line of the first compiler error reported for the source file"""
+    match = re.search(re.escape(filename) + r':(\d+):(?:\d+:)?\s*error', output)
+    return int(match.group(1)) if match else None
+
+class NativeRunner:
+    """Builds a C++ or Java program with compiler_path, runs it and records its lines.
+
+    C++ programs are compiled with basic-block and function instrumentation
+    that writes a probe record per event; the records are mapped back to
+    source lines through the program's disassembly and line table. Java
+    programs are compiled with javac -g, run once with java for their
+    output and stepped line by line with jdb. Builds are stored under
+    cache_dir by a hash of the source, compiler and flags, so an unchanged
+    program is not compiled again.
+    """
+
+    def __init__(self, source_code, filename, language, compiler_path, cache_dir=None, timeout=10.0,
+                 max_steps=1_000_000):
+        self.source_code = source_code
+        self.filename = filename
+        self.language = language.lower()
+        self.compiler_path = compiler_path
+        self.cache_dir = cache_dir or BUILD_CACHE_DIR
+        self.timeout = timeout  # Seconds before the program is stopped
+        self.max_steps = max_steps  # Probe events (C++) or jdb steps (Java) to record at most
+        self.cache_hit = False  # True when run() reused an earlier build
+        self.cancelled = False  # Set by cancel(); the run's results should be ignored
+        self._process = None  # Compiler, program or debugger currently running
+
+    def build_key(self):
+        """Get the cache key of the build"""
+        return source_hash(PROBE_VERSION, self.language, os.path.abspath(self.compiler_path)
+                           if os.path.exists(self.compiler_path) else self.compiler_path,
+                           CPP_TRACE_FLAGS, self.filename, self.source_code)
+
+    def build(self):
+        """Compile the program unless a build of the same source is cached; return the build directory.
+
+        Raises BuildError if compilation fails and OSError if the compiler cannot be run.
+        """
+        build_dir = os.path.join(self.cache_dir, self.build_key())
+        if os.path.exists(os.path.join(build_dir, 'complete')):
+            self.cache_hit = True
+            return build_dir
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='build_', dir=self.cache_dir)
+        try:
+            with open(os.path.join(staging, self.filename), 'w', encoding='utf-8') as f:
+                f.write(self.source_code)
+            if self.language == 'java':
+                self._build_java(staging)
+            else:
+                self._build_cpp(staging)
+            open(os.path.join(staging, 'complete'), 'w').close()
+            try:
+                os.rename(staging, build_dir)
+            except OSError:
+                pass  # Another run finished the same build first
+        finally:
+            if os.path.exists(staging):
+                shutil.rmtree(staging, ignore_errors=True)
+        return build_dir
+
+    def cancel(self):
+        """Stop the build or run in progress, from any thread"""
+        self.cancelled = True
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.kill()
+
+    def _start(self, args, **kwargs):
+        """Start a process that cancel() can stop"""
+        process = self._process = subprocess.Popen(args, **kwargs)
+        if self.cancelled:
+            process.kill()
+        return process
+
+    def _compile(self, args, cwd):
+        process = self._start(args, cwd=cwd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                              stderr=subprocess.PIPE, text=True)
+        try:
+            stdout, stderr = process.communicate(timeout=120)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise BuildError("Compilation did not finish within 120s")
+        if self.cancelled:
+            raise BuildError("Build cancelled")
+        if process.returncode != 0:
+            output = stderr or stdout
+            first = next((line for line in output.splitlines() if 'error' in line), output.strip())
+            raise BuildError(first or "Compilation failed", _first_error_line(output, self.filename), output)
+
+    def _build_cpp(self, build_dir):
+        with open(os.path.join(build_dir, 'codeflow_probe.c'), 'w') as f:
+            f.write(PROBE_SOURCE)
+        # The probe itself is built without instrumentation
+        self._compile([self.compiler_path, '-O2', '-c', 'codeflow_probe.c', '-o', 'codeflow_probe.o'], build_dir)
+        self._compile([self.compiler_path, *CPP_TRACE_FLAGS, self.filename, 'codeflow_probe.o',
+                       '-o', 'program'], build_dir)
+
+    def _build_java(self, build_dir):
+        self._compile([self.compiler_path, '-g', '-d', 'classes', self.filename], build_dir)
+
+    def run(self):
+        """Build if needed, run the program and return its ExecutionTrace.
+
+        Raises BuildError if the program cannot be built or traced on this platform.
+        """
+        message = unsupported_platform(self.language)
+        if message:
+            raise BuildError(message)
+        build_dir = self.build()
+        trace = ExecutionTrace(self.filename, locals_limit=0)
+        start = time.perf_counter()
+        if self.language == 'java':
+            self._run_java(build_dir, trace)
+        else:
+            self._run_cpp(build_dir, trace)
+        trace.duration = time.perf_counter() - start
+        return trace
+
+    def _run_cpp(self, build_dir, trace):
+        handle, events_path = tempfile.mkstemp(prefix='codeflow_events_')
+        os.close(handle)
+        env = dict(os.environ, CODEFLOW_TRACE=events_path, CODEFLOW_MAX_EVENTS=str(self.max_steps))
+        try:
+            process = self._start([os.path.join(build_dir, 'program')], cwd=build_dir, env=env,
+                                  stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            try:
+                stdout, _ = process.communicate(timeout=self.timeout)
+                returncode = process.returncode
+            except subprocess.TimeoutExpired:
+                # SIGTERM lets the probe write out its buffered records first
+                process.terminate()
+                try:
+                    stdout, _ = process.communicate(timeout=1.0)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+                    stdout, _ = process.communicate()
+                returncode = None
+            trace.output = stdout.decode('utf-8', 'replace')
+
+            events = array('Q')
+            with open(events_path, 'rb') as f:
+                data = f.read()
+            events.frombytes(data[:len(data) - len(data) % 8])
+        finally:
+            os.remove(events_path)
+
+        self._record_cpp_steps(build_dir, events, trace)
+        trace.truncated = len(events) >= self.max_steps
+        if returncode is None:
+            trace.set_error(f"TimeoutError: execution did not finish within {self.timeout}s")
+        elif returncode < 0:
+            trace.set_error(f"Program terminated by signal {-returncode}")
+        elif returncode > 0:
+            trace.set_error(f"Program exited with code {returncode}")
+
+    def _read_block_map(self, build_dir):
+        """Map each probe return address to the source lines of its basic block.
+
+        A block runs from one probe call to the next, and its lines come from
+        the program's DWARF line table in address order. Blocks that call
+        one of the program's own functions are split after each such call, so
+        the lines that follow the call are shown after the callee's. Returns
+        ({return address: (line segments, function start, is entry block)},
+        {function start: name}) for the program's own functions; the map is
+        stored with the build.
+        """
+        path = os.path.join(build_dir, 'block_map.json')
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            return ({int(address): tuple(block) for address, block in data['blocks'].items()},
+                    {int(start): name for start, name in data['functions'].items()})
+
+        program = os.path.join(build_dir, 'program')
+        disassembly = self._read_tool_output(['objdump', '-d', '-C', '--no-show-raw-insn', program])
+        line_table = self._read_tool_output(['objdump', '--dwarf=decodedline', program])
+
+        rows = []  # (address, line) of the program's own file, sorted by address
+        for row in line_table.splitlines():
+            parts = row.split()
+            if len(parts) >= 3 and parts[0] == self.filename and parts[1].isdigit() and parts[2].startswith('0x'):
+                rows.append((int(parts[2], 16), int(parts[1])))
+        rows.sort()
+        row_addresses = [address for address, line in rows]
+
+        symbols = {}  # Start address -> demangled name
+        probe_calls = []  # (call address, return address, function start)
+        calls = []  # (call address, target) of every direct call
+        function_start = None
+        probe_call = None
+        for text in disassembly.splitlines():
+            header = re.match(r'^([0-9a-f]+) <(.+)>:$', text)
+            if header:
+                function_start = int(header.group(1), 16)
+                symbols[function_start] = header.group(2)
+                continue
+            instruction = re.match(r'^\s*([0-9a-f]+):\s+(\S+)\s*(.*)$', text)
+            if not instruction:
+                continue
+            address = int(instruction.group(1), 16)
+            if probe_call is not None:
+                probe_calls.append((probe_call, address, function_start))
+                probe_call = None
+            if instruction.group(2).startswith('call'):
+                if '<__sanitizer_cov_trace_pc>' in instruction.group(3):
+                    probe_call = address
+                else:
+                    target = re.match(r'([0-9a-f]+) <', instruction.group(3))
+                    if target:
+                        calls.append((address, int(target.group(1), 16)))
+
+        # The program's own functions start on a line of its file
+        starts = set(row_addresses)
+        functions = {start: name for start, name in symbols.items()
+                     if start in starts and not name.startswith(_GENERATED_PREFIXES)}
+        split_points = sorted(address for address, target in calls if target in functions)
+        ends = sorted(symbols)
+
+        blocks = {}
+        entered = set()  # Functions whose entry block has been mapped
+        for i, (call, returned, start) in enumerate(probe_calls):
+            if start not in functions:
+                continue
+            entry = start not in entered
+            entered.add(start)
+            next_symbol = bisect.bisect_right(ends, call)
+            end = ends[next_symbol] if next_symbol < len(ends) else returned
+            if i + 1 < len(probe_calls):
+                end = min(end, probe_calls[i + 1][0])
+            # The row covering the probe call gives the block's first line
+            first = bisect.bisect_right(row_addresses, call) - 1
+            if first < 0 or row_addresses[first] < start:
+                continue  # Code from another file, such as an inlined header function
+            segments = [[]]
+            split = bisect.bisect_right(split_points, call)
+            for address, line in rows[first:]:
+                if address >= end:
+                    break
+                while split < len(split_points) and split_points[split] < min(address, end):
+                    if segments[-1]:
+                        segments.append([])
+                    split += 1
+                if not segments[-1] or segments[-1][-1] != line:
+                    segments[-1].append(line)
+            blocks[returned] = ([segment for segment in segments if segment], start, entry)
+
+        with open(path, 'w') as f:
+            json.dump({'blocks': blocks, 'functions': functions}, f)
+        return blocks, functions
+
+    def _read_tool_output(self, args):
+        """Run a build tool that cancel() can stop and return its output"""
+        process = self._start(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True)
+        try:
+            stdout, _ = process.communicate(timeout=120)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise
+        # Output cut short by cancel() must not be stored as the block map
+        if self.cancelled:
+            raise BuildError("Build cancelled")
+        return stdout
+
+    def _record_cpp_steps(self, build_dir, events, trace):
+        """Turn probe records into a step per source line of each block the program ran"""
+        blocks, functions = self._read_block_map(build_dir)
+        function_ids = {start: trace.function_id(name) for start, name in functions.items()}
+
+        stack = []  # Function start per entered function, including library code
+        frames = []  # [function id, line segments still to run] per own frame, innermost last
+        entering = []  # Segments of a function's first block, which runs before its entry probe
+        resume = None  # (frame, depth) whose next segment runs once a callee's last block is done
+        returned = None  # Function id of the callee whose exit probe was the last record
+        last = None
+
+        def emit(segment, depth, function):
+            nonlocal last
+            for line in segment:
+                if (line, depth) != last:
+                    trace.append_step(line, EVENT_LINE, depth, function)
+                    last = (line, depth)
+
+        for record in events:
+            kind, address = record >> 62, record & _ADDRESS_MASK
+            block = blocks.get(address) if kind == PROBE_BLOCK else None
+            if returned is not None:
+                # A function's last block runs after its exit probe
+                epilogue = block is not None and not block[2] and function_ids[block[1]] == returned
+                if epilogue:
+                    emit([line for segment in block[0] for line in segment], len(frames) + 1, returned)
+                returned = None
+                if epilogue:
+                    continue
+            if resume is not None:
+                frame, depth = resume
+                if frame[1]:
+                    emit(frame[1].pop(0), depth, frame[0])
+                resume = None
+
+            if kind == PROBE_ENTER:
+                stack.append(address)
+                if address in function_ids:
+                    frames.append([function_ids[address], entering])
+                entering = []
+            elif kind == PROBE_EXIT:
+                if stack and stack.pop() in function_ids and frames:
+                    returned = frames.pop()[0]
+                    resume = (frames[-1], len(frames)) if frames else None
+            elif block is not None:
+                segments, start, entry = block
+                function = function_ids[start]
+                if entry or not frames:
+                    # A function's first block runs before its entry probe
+                    emit(segments[0], len(frames) + 1, function)
+                    entering = segments[1:]
+                else:
+                    emit(segments[0], len(frames), function)
+                    frames[-1][1] = segments[1:] + frames[-1][1]
+
+    def _tool_path(self, name):
+        """Find a JDK tool next to the configured javac, or on PATH"""
+        candidate = os.path.join(os.path.dirname(self.compiler_path), name)
+        if os.path.exists(candidate):
+            return candidate
+        return shutil.which(name) or name
+
+    def _run_java(self, build_dir, trace):
+        main_class = os.path.splitext(self.filename)[0]
+        classes = os.path.join(build_dir, 'classes')
+        # Output comes from a plain run; jdb interleaves its own text with the program's
+        process = self._start([self._tool_path('java'), '-cp', classes, main_class], cwd=build_dir,
+                              stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            stdout, stderr = process.communicate(timeout=self.timeout)
+            returncode = process.returncode
+        except subprocess.TimeoutExpired:
+            process.kill()
+            stdout, stderr = process.communicate()
+            returncode = None
+        trace.output = stdout.decode('utf-8', 'replace')
+
+        stepper = JdbStepper(self._tool_path('jdb'), classes, main_class, self.timeout, self.max_steps)
+        if not self.cancelled:
+            stepper.record(trace, self._start)
+        if returncode is None:
+            trace.set_error(f"TimeoutError: execution did not finish within {self.timeout}s")
+        elif returncode != 0:
+            message = (stderr.decode('utf-8', 'replace').strip().splitlines() or [""])[0]
+            trace.set_error(message or f"Program exited with code {returncode}")
+        elif stepper.timed_out:
+            trace.set_error(f"TimeoutError: stepping with jdb did not finish within {self.timeout}s")
+
+class JdbStepper:
+    """Steps a Java program through jdb and records the line of every step"""
+
+    _PROMPT = re.compile(r'(?:^|\n)(?:\S+\[\d+\]|>) $')
+    _LOCATION = re.compile(r'"thread=[^"]*",\s*([\w$.]+)\.([\w$<>]+)\(\),\s*line=(\d+)')
+
+    def __init__(self, jdb_path, classpath, main_class, timeout=10.0, max_steps=20_000):
+        self.jdb_path = jdb_path
+        self.classpath = classpath
+        self.main_class = main_class
+        self.timeout = timeout
+        self.max_steps = max_steps
+        self.timed_out = False  # Set by record() when stepping ran out of time before the program ended
+
+    def _read_prompt(self, process, deadline):
+        """Read jdb output up to its next prompt; return None once jdb has exited or time is up"""
+        output = ""
+        fd = process.stdout.fileno()
+        while not self._PROMPT.search(output):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not select.select([fd], [], [], remaining)[0]:
+                return None
+            chunk = os.read(fd, 4096)
+            if not chunk:
+                return None
+            output += chunk.decode('utf-8', 'replace')
+            if 'application exited' in output:
+                return None
+        return output
+
+    def _send(self, process, command):
+        process.stdin.write((command + "\n").encode('utf-8'))
+        process.stdin.flush()
+
+    def record(self, trace, start=subprocess.Popen):
+        """Append a step per jdb step of the program's code to the trace; start launches jdb"""
+        process = start([self.jdb_path, '-classpath', self.classpath, self.main_class],
+                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        deadline = time.monotonic() + self.timeout
+        stack = []  # Method names of the frames seen so far, innermost last
+        output = None
+        try:
+            if self._read_prompt(process, deadline) is None:
+                return
+            self._send(process, f"stop in {self.main_class}.main")
+            self._read_prompt(process, deadline)
+            self._send(process, "run")
+            # jdb prompts while the VM starts, before the breakpoint in main is hit
+            output = self._read_prompt(process, deadline)
+            while output is not None and not self._LOCATION.search(output):
+                output = self._read_prompt(process, deadline)
+            while output is not None and len(trace) < self.max_steps:
+                match = self._LOCATION.search(output)
+                if match:
+                    method, line = match.group(2), int(match.group(3))
+                    # A method seen on the stack means a return to it; any other is a call
+                    if method in stack:
+                        del stack[stack.index(method) + 1:]
+                    else:
+                        stack.append(method)
+                    trace.append_step(line, EVENT_LINE, len(stack), trace.function_id(method))
+                self._send(process, "step")
+                output = self._read_prompt(process, deadline)
+        finally:
+            # _read_prompt also gives None at the deadline, so a timeout is told apart by the clock
+            self.timed_out = output is None and time.monotonic() >= deadline
+            trace.truncated = output is not None or self.timed_out
+            process.kill()
+            process.wait()
@@ -0,0 +1,189 @@
+"""
+Project Analyzer for the Code Analysis and Debugging Visualizer
+Runs ASTAnalyzer over every file of a project in a process pool
+"""
+
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.ast_analyzer import ASTAnalyzer, RESULT_KINDS
+from analyzer.analysis_cache import shared_cache, source_key
+
+def analyze_source(file_path, source_code):
+    """Analyze one file in a worker process.
+
+    Returns a (file_path, results, error) tuple; results is None on failure.
+    """
+    try:
+        # Workers do not share the parent's cache, the parent stores the results
+        analyzer = ASTAnalyzer(source_code, cache=None)
+        if analyzer.analyze():
+            return file_path, analyzer.get_results(), None
+        return file_path, None, "Syntax error"
+    except Exception as e:
+        return file_path, None, str(e)
+
+class ProjectAnalyzer:
+    def __init__(self, project_files, max_workers=None, cache=shared_cache):
+        self.project_files = list(project_files)
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.cache = cache
+        self.executor = None
+        self.submitted = 0  # Files sent to the process pool rather than served from the cache
+        self.ready = queue.Queue()  # Finished results not yet handed out by poll(), then None
+        self.results = {}  # File path -> analysis results
+        self.errors = {}  # File path -> error message
+        self.source_keys = {}  # File path -> content key of the analyzed source
+        self.totals = {kind: 0 for kind in RESULT_KINDS}
+        self.cancelled = False
+        self._done = False  # True once every result has been handed out
+        self._lock = threading.Lock()  # Guards the executor between the loader thread and shutdown()
+
+    def start(self):
+        """Start reading and analyzing the files in a background thread"""
+        threading.Thread(target=self._load, daemon=True).start()
+
+    def _load(self):
+        """Read every file, serve cached results and analyze the rest in the process pool"""
+        pending = {}  # Future -> (file path, source code)
+        for file_path in self.project_files:
+            if self.cancelled:
+                break
+            try:
+                with open(file_path, 'r', encoding='utf-8') as file:
+                    source_code = file.read()
+            except Exception as e:
+                self.ready.put((file_path, None, str(e)))
+                continue
+            self.source_keys[file_path] = source_key(source_code)
+
+            cached = self.cache.get_results(source_code) if self.cache is not None else None
+            if cached is not None:
+                self.ready.put((file_path, cached, None))
+                continue
+
+            with self._lock:
+                if self.cancelled:
+                    break
+                if self.executor is None:
+                    # Spawned workers do not inherit the parent's threads and Qt state
+                    self.executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                        mp_context=multiprocessing.get_context('spawn'))
+                future = self.executor.submit(analyze_source, file_path, source_code)
+            pending[future] = (file_path, source_code)
+            self.submitted += 1
+
+        for future in as_completed(pending):
+            if self.cancelled:
+                break
+            self.ready.put(self._collect(future, *pending[future]))
+        self.ready.put(None)
+        self.shutdown()
+
+    def _collect(self, future, file_path, source_code):
+        """Turn a finished future into a result tuple and cache its results"""
+        try:
+            result = future.result()
+        except Exception as e:
+            return file_path, None, str(e)
+        if result[1] is not None and self.cache is not None:
+            self.cache.put_results(source_code, result[1])
+        return result
+
+    def _merge(self, file_path, results, error):
+        """Merge one file's results into the project summary"""
+        if results is None:
+            self.errors[file_path] = error
+            return
+        self.results[file_path] = results
+        for kind in RESULT_KINDS:
+            self.totals[kind] += len(results.get(kind, []))
+
+    def _take(self, result):
+        """Merge a result from the queue; return False for the end marker"""
+        if result is None:
+            self._done = True
+            return False
+        self._merge(*result)
+        return True
+
+    def poll(self):
+        """Return the per-file results finished since the last call, without blocking"""
+        finished = []
+        while not self._done:
+            try:
+                result = self.ready.get_nowait()
+            except queue.Empty:
+                break
+            if self._take(result):
+                finished.append(result)
+        return finished
+
+    def iter_results(self):
+        """Yield (file_path, results, error) tuples as files finish, blocking until all are done"""
+        while not self._done:
+            result = self.ready.get()
+            if self._take(result):
+                yield result
+
+    def analyze(self):
+        """Analyze the whole project and return the summary"""
+        self.start()
+        for _ in self.iter_results():
+            pass
+        return self.get_summary()
+
+    def is_finished(self):
+        """Check whether every file has been analyzed"""
+        return self._done
+
+    def progress(self):
+        """Get the fraction of files analyzed so far"""
+        if not self.project_files:
+            return 1.0
+        return (len(self.results) + len(self.errors)) / len(self.project_files)
+
+    def get_summary(self):
+        """Get the project-level summary of the results merged so far"""
+        return {
+            'files_total': len(self.project_files),
+            'files_analyzed': len(self.results),
+            'files_failed': dict(self.errors),
+            'totals': dict(self.totals),
+            'per_file': {
+                file_path: {kind: len(results.get(kind, [])) for kind in RESULT_KINDS}
+                for file_path, results in self.results.items()
+            }
+        }
+
+    def shutdown(self, cancel=False):
+        """Stop the worker processes"""
+        with self._lock:
+            if cancel:
+                self.cancelled = True
+            if self.executor is not None:
+                self.executor.shutdown(wait=not cancel, cancel_futures=cancel)
+                self.executor = None
+
+# Example usage
+if __name__ == "__main__":
+    import glob
+    import time
+
+    folder = sys.argv[1] if len(sys.argv) > 1 else os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    files = [f for f in glob.glob(os.path.join(folder, "**", "*.py"), recursive=True) if "venv" not in f]
+
+    start = time.perf_counter()
+    project = ProjectAnalyzer(files)
+    project.start()
+    for file_path, results, error in project.iter_results():
+        status = "error: " + error if error else f"{len(results['functions'])} functions"
+        print(f"{os.path.relpath(file_path, folder)}: {status}")
+    summary = project.get_summary()
+    print(f"Analyzed {summary['files_analyzed']}/{summary['files_total']} files in {time.perf_counter() - start:.2f}s")
+    print("Totals:", summary['totals'])
@@ -0,0 +1,83 @@
+"""
+Result records for the Code Analysis and Debugging Visualizer
+Compact tuple-backed records for the findings produced by ASTAnalyzer
+"""
+
+from collections import namedtuple
+
+class RecordMixin:
+    """Dict-style read access so records work wherever result dicts were used.
+
+    Each record type names its result list in the ``kind`` class attribute.
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        """Return the field value, or default if the record has no such field"""
+        return getattr(self, key, default) if key in self._fields else default
+
+    def keys(self):
+        return self._fields
+
+    def items(self):
+        return zip(self._fields, self)
+
+    def as_dict(self):
+        """Return the record as a plain dict (the JSON-serializable view)"""
+        return dict(zip(self._fields, self))
+
+class VariableRecord(RecordMixin, namedtuple('VariableRecord', ['name', 'line', 'value'])):
+    __slots__ = ()
+    kind = 'variables'
+
+class FunctionRecord(RecordMixin, namedtuple('FunctionRecord', ['name', 'line', 'params', 'returns'])):
+    __slots__ = ()
+    kind = 'functions'
+
+class ClassRecord(RecordMixin, namedtuple('ClassRecord', ['name', 'line', 'methods', 'attributes'])):
+    __slots__ = ()
+    kind = 'classes'
+
+class ConditionalRecord(RecordMixin, namedtuple('ConditionalRecord', ['line', 'type', 'test'])):
+    __slots__ = ()
+    kind = 'conditionals'
+
+class LoopRecord(RecordMixin, namedtuple('LoopRecord', ['line', 'type', 'target', 'test'])):
+    __slots__ = ()
+    kind = 'loops'
+
+# Record type used for each result kind
+RECORD_TYPES = {
+    'variables': VariableRecord,
+    'functions': FunctionRecord,
+    'classes': ClassRecord,
+    'conditionals': ConditionalRecord,
+    'loops': LoopRecord,
+}
+
+def results_as_dicts(results):
+    """Convert analysis results to plain dicts for JSON export and session storage"""
+    converted = {}
+    for kind, items in results.items():
+        converted[kind] = [item.as_dict() if isinstance(item, RecordMixin) else item for item in items]
+    return converted
+
+def results_from_dicts(results):
+    """Convert analysis results loaded from JSON back to records"""
+    converted = {}
+    for kind, items in results.items():
+        record_type = RECORD_TYPES.get(kind)
+        if record_type is None:
+            converted[kind] = list(items)
+        else:
+            converted[kind] = [record_type(**item) if isinstance(item, dict) else item for item in items]
+    return converted
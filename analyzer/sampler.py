@@ -0,0 +1,114 @@
+"""
+Execution Sampler for the Code Analysis and Debugging Visualizer
+Records periodic stack samples of long-running programs instead of every line
+"""
+
+import os
+import sys
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.tracer import ExecutionTracer, EVENT_LINE, SPILL_STEPS
+
+class ExecutionSampler(ExecutionTracer):
+    """Samples the running program every interval_ms milliseconds, or every
+    every_events call and return events when that is set.
+
+    Each sample becomes one step of an ExecutionTrace: the line of the
+    innermost frame of the traced file, with the number of its frames as the
+    depth. Samples taken while library code runs are attributed to the line
+    that called into it. No locals are recorded.
+    """
+
+    def __init__(self, filename="main.py", interval_ms=5, every_events=None, max_steps=5_000_000):
+        super().__init__(filename, max_steps, locals_limit=0)
+        self.interval_ms = interval_ms
+        self.every_events = every_events
+
+    def _execute(self, code, namespace):
+        if self.every_events:
+            self._run_event_sampling(code, namespace)
+        else:
+            self._run_timed_sampling(code, namespace)
+
+    def _make_sampler(self):
+        """Build the function that records the stack of a frame as one sample"""
+        trace = self.trace
+        target = self.filename
+        max_steps = self.max_steps
+        spill = self.spill
+        function_ids = {}  # Code id -> (function id, code kept alive)
+
+        def record_sample(frame):
+            line = None
+            depth = 0
+            while frame is not None:
+                code = frame.f_code
+                if code.co_filename == target:
+                    if line is None:
+                        line = frame.f_lineno
+                        innermost = code
+                    depth += 1
+                frame = frame.f_back
+            if line is None:
+                return  # Only interpreter or library frames are running
+            if len(trace) >= max_steps:
+                trace.truncated = True
+                return
+            if spill is not None and len(trace.lines) >= SPILL_STEPS:
+                spill(trace)
+            entry = function_ids.get(id(innermost))
+            if entry is None:
+                trace.function_names.append(innermost.co_name)
+                entry = function_ids[id(innermost)] = (len(trace.function_names) - 1, innermost)
+            # Columns are appended in the order the worker's streamer relies on
+            trace.lines.append(line)
+            trace.events.append(EVENT_LINE)
+            trace.depths.append(depth)
+            trace.functions.append(entry[0])
+
+        return record_sample
+
+    def _run_timed_sampling(self, code, namespace):
+        """Sample the main thread's stack from a background thread"""
+        record_sample = self._make_sampler()
+        main_thread = threading.get_ident()
+        interval = self.interval_ms / 1000.0
+        stop = threading.Event()
+
+        def sample_loop():
+            while not stop.wait(interval):
+                frame = sys._current_frames().get(main_thread)
+                if frame is not None:
+                    record_sample(frame)
+
+        # The sampler needs the GIL on time, so the program hands it over at least once per interval
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(switch_interval, interval))
+        thread = threading.Thread(target=sample_loop, daemon=True)
+        thread.start()
+        try:
+            exec(code, namespace)
+        finally:
+            stop.set()
+            thread.join()
+            sys.setswitchinterval(switch_interval)
+
+    def _run_event_sampling(self, code, namespace):
+        """Sample the stack on every Nth call or return event, seen through sys.setprofile"""
+        record_sample = self._make_sampler()
+        every_events = self.every_events
+        state = {'events': 0}
+
+        def profile(frame, event, arg):
+            state['events'] += 1
+            if state['events'] >= every_events:
+                state['events'] = 0
+                record_sample(frame)
+
+        previous = sys.getprofile()
+        sys.setprofile(profile)
+        try:
+            exec(code, namespace)
+        finally:
+            sys.setprofile(previous)
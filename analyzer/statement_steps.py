@@ -0,0 +1,158 @@
+"""
+Statement Steps for the Code Analysis and Debugging Visualizer
+Statement-level steps in the order a run would reach them, without running the code
+"""
+
+import ast
+
+# Statement lists that are not part of a statement's own evaluation
+_BODY_FIELDS = ('body', 'orelse', 'finalbody', 'handlers', 'cases')
+
+# Control flow signals that end a block early
+_RETURN = 'return'
+_BREAK = 'break'
+_CONTINUE = 'continue'
+
+def _leaves_block(statements):
+    """Check whether a block always ends by returning, raising or jumping"""
+    return bool(statements) and isinstance(statements[-1], (ast.Return, ast.Raise, ast.Break, ast.Continue))
+
+class StatementStepBuilder:
+    """Orders a module's statements by a static walk of its control flow.
+
+    Each statement becomes one ``(line, type, depth, function)`` step. Calls
+    to functions defined in the module expand into the callee's statements
+    one level deeper, loops run their body once, an ``if`` takes its first
+    branch unless it is a guard clause with no ``else``, and ``try`` skips
+    its handlers. Recursive calls are not expanded again. The order is a
+    guess used only in simulate mode; traced runs record the real one.
+    """
+
+    def __init__(self, tree, max_depth=16, max_steps=100_000):
+        self.tree = tree
+        self.max_depth = max_depth
+        self.max_steps = max_steps
+        self.functions = {}  # Name -> FunctionDef, as the walk defines them
+        self.methods = {}  # Method name -> (class name, FunctionDef)
+        self.classes = {}  # Class name -> ClassDef
+        self.steps = []
+        self._active = []  # Function nodes being walked, innermost last
+
+    def build(self):
+        """Build the steps of the whole module"""
+        self.steps = []
+        self._walk_block(self.tree.body, 1, '<module>')
+        return self.steps
+
+    def _walk_block(self, statements, depth, function):
+        """Walk a list of statements; return the signal that ended it early, if any"""
+        for statement in statements:
+            if len(self.steps) >= self.max_steps:
+                return _RETURN
+            signal = self._walk_statement(statement, depth, function)
+            if signal is not None:
+                return signal
+        return None
+
+    def _walk_statement(self, statement, depth, function):
+        self.steps.append((statement.lineno, type(statement).__name__, depth, function))
+
+        if isinstance(statement, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            if function in self.classes:
+                self.methods[statement.name] = (function, statement)
+            else:
+                self.functions[statement.name] = statement
+            return None
+        if isinstance(statement, ast.ClassDef):
+            self.classes[statement.name] = statement
+            self._walk_block(statement.body, depth + 1, statement.name)
+            return None
+
+        self._expand_calls(statement, depth)
+
+        if isinstance(statement, ast.If):
+            # Guard clauses are assumed not taken so the code after them is shown
+            if statement.orelse or not _leaves_block(statement.body):
+                return self._walk_block(statement.body, depth, function)
+            return None
+        if isinstance(statement, (ast.For, ast.AsyncFor, ast.While)):
+            signal = self._walk_block(statement.body, depth, function)
+            if signal == _RETURN:
+                return signal
+            if signal != _BREAK:
+                return self._walk_block(statement.orelse, depth, function)
+            return None
+        if isinstance(statement, (ast.With, ast.AsyncWith)):
+            return self._walk_block(statement.body, depth, function)
+        if isinstance(statement, ast.Try) or type(statement).__name__ == 'TryStar':  # Python 3.11+
+            signal = self._walk_block(statement.body, depth, function)
+            if signal is None:
+                signal = self._walk_block(statement.orelse, depth, function)
+            return self._walk_block(statement.finalbody, depth, function) or signal
+        if type(statement).__name__ == 'Match':  # Python 3.10+
+            if statement.cases:
+                return self._walk_block(statement.cases[0].body, depth, function)
+            return None
+        if isinstance(statement, (ast.Return, ast.Raise)):
+            return _RETURN
+        if isinstance(statement, ast.Break):
+            return _BREAK
+        if isinstance(statement, ast.Continue):
+            return _CONTINUE
+        return None
+
+    def _expand_calls(self, statement, depth):
+        """Walk the bodies of module functions called while the statement itself is evaluated"""
+        if depth >= self.max_depth:
+            return
+        for call in self._calls(statement):
+            target = self._resolve(call.func)
+            if target is None or target[1] in self._active:
+                continue
+            name, node = target
+            self._active.append(node)
+            self._walk_block(node.body, depth + 1, name)
+            self._active.pop()
+
+    def _calls(self, node):
+        """Collect the calls in a statement's own expressions, inner calls first"""
+        calls = []
+        for field, value in ast.iter_fields(node):
+            if field in _BODY_FIELDS or field == 'decorator_list':
+                continue
+            for child in value if isinstance(value, list) else [value]:
+                if isinstance(child, ast.AST):
+                    self._collect_calls(child, calls)
+        return calls
+
+    def _collect_calls(self, node, calls):
+        if isinstance(node, (ast.Lambda, ast.stmt)):
+            return
+        for child in ast.iter_child_nodes(node):
+            self._collect_calls(child, calls)
+        if isinstance(node, ast.Call):
+            calls.append(node)
+
+    def _resolve(self, func):
+        """Find the (name, FunctionDef) a call runs, or None if it is not defined in the module"""
+        if isinstance(func, ast.Name):
+            if func.id in self.functions:
+                return func.id, self.functions[func.id]
+            if func.id in self.classes:
+                init = self._class_method(func.id, '__init__')
+                if init is not None:
+                    return '__init__', init
+            return None
+        if isinstance(func, ast.Attribute) and func.attr in self.methods:
+            return func.attr, self.methods[func.attr][1]
+        return None
+
+    def _class_method(self, class_name, method_name):
+        for node in self.classes[class_name].body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) and node.name == method_name:
+                return node
+        return None
+
+def build_statement_steps(tree):
+    """Get the statement-level steps of a parsed module in execution order"""
+    return StatementStepBuilder(tree).build()
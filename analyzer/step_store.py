@@ -0,0 +1,174 @@
+"""
+Step Store for the Code Analysis and Debugging Visualizer
+Columnar storage for execution steps with a list-of-dicts view
+"""
+
+from array import array
+from collections.abc import Sequence
+
+class _InternTable:
+    """Assigns small integer codes to repeated strings"""
+
+    def __init__(self):
+        self.names = []
+        self._codes = {}
+
+    def code(self, name):
+        code = self._codes.get(name)
+        if code is None:
+            code = self._codes[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+class LineTypeColumn(Sequence):
+    """Type codes derived from each step's line, so traced runs need no type column"""
+
+    def __init__(self, lines, line_codes, default_code, overrides):
+        self.lines = lines
+        self.line_codes = line_codes  # Line -> type code of its statement
+        self.default_code = default_code
+        self.overrides = overrides  # Step index -> type code for steps that differ from their line
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __getitem__(self, index):
+        code = self.overrides.get(index)
+        if code is None:
+            code = self.line_codes.get(self.lines[index], self.default_code)
+        return code
+
+class ConstantColumn(Sequence):
+    """The same value for every step of another column"""
+
+    def __init__(self, value, lines):
+        self.value = value
+        self.lines = lines
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __getitem__(self, index):
+        if not -len(self.lines) <= index < len(self.lines):
+            raise IndexError("step index out of range")
+        return self.value
+
+class StepStore(Sequence):
+    """Execution steps stored as parallel arrays.
+
+    Indexing builds the step dict on demand, with its description formatted
+    only then, so long runs cost a few bytes per step instead of a dict.
+    """
+
+    def __init__(self):
+        self.lines = array('I')
+        self.types = array('H')  # Codes into type_table
+        self.files = array('H')  # Codes into file_table
+        self.depths = array('I')
+        self.functions = array('I')  # Codes into function_names
+        self.type_table = _InternTable()
+        self.file_table = _InternTable()
+        self.function_names = ['<module>']
+        self.messages = {}  # Step index -> message shown for exception steps
+
+    def append(self, line, node_type, filename, depth=0, function=0):
+        """Add one step; function is an index into function_names"""
+        self.lines.append(line)
+        self.types.append(self.type_table.code(node_type))
+        self.files.append(self.file_table.code(filename))
+        self.depths.append(depth)
+        self.functions.append(function)
+
+    def function_id(self, name):
+        """Get the index of a function name, adding it to function_names if needed"""
+        try:
+            return self.function_names.index(name)
+        except ValueError:
+            self.function_names.append(name)
+            return len(self.function_names) - 1
+
+    def share_columns(self, lines, depths, functions, line_types, filename, overrides=None):
+        """Use another trace's columns as this store's steps without copying them.
+
+        line_types maps each line to its type name; overrides maps step
+        indices to type names for steps whose type differs from their line.
+        The columns may be arrays or memoryviews of a mapped trace file.
+        """
+        code = self.type_table.code
+        line_codes = {line: code(node_type) for line, node_type in line_types.items()}
+        type_overrides = {index: code(node_type) for index, node_type in (overrides or {}).items()}
+        self.lines = lines
+        self.types = LineTypeColumn(lines, line_codes, code('Statement'), type_overrides)
+        self.files = ConstantColumn(self.file_table.code(filename), lines)
+        self.depths = depths
+        self.functions = functions
+
+    def description(self, index):
+        """Format the description of one step"""
+        line = self.lines[index]
+        message = self.messages.get(index)
+        if message is not None:
+            description = f"{message} at line {line}"
+        else:
+            description = f"Executing {self.type_table.names[self.types[index]]} at line {line}"
+        function = self.function_names[self.functions[index]]
+        if function != '<module>':
+            description += f" in {function}"
+        return description
+
+    def step(self, index):
+        """Build the dict for one step"""
+        return {
+            'line': self.lines[index],
+            'type': self.type_table.names[self.types[index]],
+            'description': self.description(index),
+            'filename': self.file_table.names[self.files[index]],
+            'depth': self.depths[index],
+            'function': self.function_names[self.functions[index]]
+        }
+
+    def __len__(self):
+        return len(self.lines)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return StepSlice(self, range(len(self))[index])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("step index out of range")
+        return self.step(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.step(index)
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+class StepSlice(Sequence):
+    """A lazy slice of a StepStore"""
+
+    def __init__(self, store, indices):
+        self.store = store
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return StepSlice(self.store, self.indices[index])
+        return self.store.step(self.indices[index])
+
+    def __iter__(self):
+        step = self.store.step
+        for index in self.indices:
+            yield step(index)
+
+    def __eq__(self, other):
+        if isinstance(other, Sequence) and not isinstance(other, str):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
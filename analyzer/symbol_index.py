@@ -0,0 +1,142 @@
+"""
+Symbol Index for the Code Analysis and Debugging Visualizer
+Project-wide inverted index of functions, classes and variables by name
+"""
+
+import bisect
+import os
+import sys
+from collections import namedtuple
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.records import RecordMixin
+
+class SymbolLocation(RecordMixin, namedtuple('SymbolLocation', ['name', 'kind', 'file_path', 'line'])):
+    __slots__ = ()
+
+# Symbol kind recorded for each indexed result kind
+INDEXED_KINDS = {
+    'functions': 'function',
+    'classes': 'class',
+    'variables': 'variable',
+}
+
+# Above this many added or removed names an update re-sorts the name list
+# instead of inserting into it one name at a time
+_BULK_THRESHOLD = 64
+
+class SymbolIndex:
+    def __init__(self, store=None):
+        self.store = store  # Optional persistent store (see db.symbol_index_db)
+        self._by_name = {}  # Name -> list of SymbolLocation
+        self._files = {}  # File path -> (source key, names defined in the file)
+        self._sorted_names = []
+        self._sorted_dirty = False
+
+    def load(self):
+        """Populate the index from the persistent store"""
+        if self.store is None:
+            return
+        for file_path, (source_key, symbols) in self.store.load().items():
+            self._replace(file_path, source_key, symbols)
+
+    def is_current(self, file_path, source_key):
+        """Check whether a file is indexed from exactly this content"""
+        entry = self._files.get(file_path)
+        return entry is not None and source_key is not None and entry[0] == source_key
+
+    def update_file(self, file_path, results, source_key=None):
+        """Index one file's analysis results, replacing what was indexed for it before.
+
+        Returns False when the file was already indexed from the same content.
+        """
+        if self.is_current(file_path, source_key):
+            return False
+
+        symbols = []
+        for result_kind, kind in INDEXED_KINDS.items():
+            for item in results.get(result_kind, []):
+                symbols.append((item['name'], kind, item['line']))
+
+        self._replace(file_path, source_key, symbols)
+        if self.store is not None:
+            self.store.replace_file(file_path, source_key, symbols)
+        return True
+
+    def remove_file(self, file_path):
+        """Drop a file from the index"""
+        self._replace(file_path, None, None)
+        if self.store is not None:
+            self.store.remove_file(file_path)
+
+    def _replace(self, file_path, source_key, symbols):
+        """Swap the symbols of one file in the in-memory index"""
+        removed = []
+        old = self._files.pop(file_path, None)
+        if old is not None:
+            for name in set(old[1]):
+                remaining = [location for location in self._by_name[name] if location.file_path != file_path]
+                if remaining:
+                    self._by_name[name] = remaining
+                else:
+                    del self._by_name[name]
+                    removed.append(name)
+
+        added = []
+        if symbols is not None:
+            names = []
+            for name, kind, line in symbols:
+                locations = self._by_name.get(name)
+                if locations is None:
+                    locations = self._by_name[name] = []
+                    added.append(name)
+                locations.append(SymbolLocation(name, kind, file_path, line))
+                names.append(name)
+            self._files[file_path] = (source_key, names)
+
+        self._update_sorted_names(added, removed)
+
+    def _update_sorted_names(self, added, removed):
+        """Keep the sorted name list used for prefix queries in step with the index"""
+        if self._sorted_dirty:
+            return
+        if len(added) + len(removed) > _BULK_THRESHOLD:
+            self._sorted_dirty = True
+            return
+        names = self._sorted_names
+        for name in removed:
+            position = bisect.bisect_left(names, name)
+            if position < len(names) and names[position] == name:
+                del names[position]
+        for name in added:
+            # A name removed and re-added in one update may already be present
+            position = bisect.bisect_left(names, name)
+            if position == len(names) or names[position] != name:
+                names.insert(position, name)
+
+    def lookup(self, name):
+        """Get every definition or assignment of an exact name"""
+        return list(self._by_name.get(name, ()))
+
+    def search(self, prefix, limit=50):
+        """Get the locations of names starting with prefix, in name order"""
+        if self._sorted_dirty:
+            self._sorted_names = sorted(self._by_name)
+            self._sorted_dirty = False
+
+        names = self._sorted_names
+        matches = []
+        position = bisect.bisect_left(names, prefix)
+        while position < len(names) and names[position].startswith(prefix):
+            matches.extend(self._by_name[names[position]])
+            if len(matches) >= limit:
+                return matches[:limit]
+            position += 1
+        return matches
+
+    def files(self):
+        """Get the indexed file paths"""
+        return list(self._files)
+
+    def __len__(self):
+        return sum(len(locations) for locations in self._by_name.values())
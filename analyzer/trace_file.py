@@ -0,0 +1,138 @@
+"""
+Trace Files for the Code Analysis and Debugging Visualizer
+Fixed-record on-disk traces, read back through mmap with random access by step
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.tracer import ExecutionTrace
+
+TRACE_MAGIC = b'CFTR'
+TRACE_VERSION = 1
+
+# Magic, version, record size in bytes, step count
+_FILE_HEADER = struct.Struct('<4sHHQ')
+
+# Each step is four little-endian uint32 fields: line, depth, function id, event
+RECORD_FIELDS = 4
+RECORD_SIZE = RECORD_FIELDS * 4
+
+def metadata_path(path):
+    """Get the path of the JSON file holding a trace's name tables and details"""
+    return path + '.json'
+
+def index_path(path):
+    """Get the path of the postings file indexing a trace's steps by line"""
+    return path + '.index'
+
+class TraceFileWriter:
+    """Appends step records to a trace file while the program runs"""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.last_line = 0
+        self.last_depth = 1
+        self.last_function = None
+        self._file = open(path, 'w+b')
+        self._file.write(_FILE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, RECORD_SIZE, 0))
+
+    def append(self, lines, events, depths, functions):
+        """Write a chunk of steps given as equal-length columns"""
+        count = len(lines)
+        if not count:
+            return
+        records = array('I', bytes(count * RECORD_SIZE))
+        records[0::RECORD_FIELDS] = array('I', lines)
+        records[1::RECORD_FIELDS] = array('I', depths)
+        records[2::RECORD_FIELDS] = array('I', functions)
+        records[3::RECORD_FIELDS] = array('I', events)
+        if sys.byteorder == 'big':
+            records.byteswap()
+        self._file.write(records.tobytes())
+        self.count += count
+        self.last_line = lines[-1]
+        self.last_depth = depths[-1]
+        self.last_function = functions[-1]
+
+    def close(self, trace):
+        """Finish the file: store the step count and write the trace details beside it"""
+        self._file.seek(0)
+        self._file.write(_FILE_HEADER.pack(TRACE_MAGIC, TRACE_VERSION, RECORD_SIZE, self.count))
+        self._file.close()
+
+        variables = trace.variables
+        metadata = {
+            'filename': trace.filename,
+            'function_names': trace.function_names,
+            'messages': trace.messages,
+            'watch_expressions': trace.watch_expressions,
+            'watch_hits': trace.watch_hits,
+            'variables': [[step, *variables.entries[step]] for step in variables.steps],
+            'locals_limit': variables.limit,
+            'error': trace.error,
+            'truncated': trace.truncated,
+            'output': trace.output,
+            'duration': trace.duration,
+        }
+        with open(metadata_path(self.path), 'w', encoding='utf-8') as f:
+            json.dump(metadata, f)
+
+def save_trace(trace, path):
+    """Write an in-memory trace to a trace file"""
+    writer = TraceFileWriter(path)
+    writer.append(trace.lines, trace.events, trace.depths, trace.functions)
+    writer.close(trace)
+
+def open_trace(path):
+    """Map a trace file into an ExecutionTrace whose columns are read from disk on demand.
+
+    Raises ValueError if the file is not a trace file this version can read.
+    """
+    with open(metadata_path(path), encoding='utf-8') as f:
+        metadata = json.load(f)
+
+    with open(path, 'rb') as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, record_size, count = _FILE_HEADER.unpack_from(mapping)
+    if magic != TRACE_MAGIC or version != TRACE_VERSION or record_size != RECORD_SIZE:
+        mapping.close()
+        raise ValueError(f"Not a readable trace file: {path}")
+    if sys.byteorder == 'big':
+        mapping.close()
+        raise ValueError("Trace files can only be mapped on little-endian hosts")
+
+    trace = ExecutionTrace(metadata['filename'], metadata['locals_limit'])
+    records = memoryview(mapping)[_FILE_HEADER.size:_FILE_HEADER.size + count * RECORD_SIZE].cast('I')
+    trace.lines = records[0::RECORD_FIELDS]
+    trace.depths = records[1::RECORD_FIELDS]
+    trace.functions = records[2::RECORD_FIELDS]
+    trace.events = records[3::RECORD_FIELDS]
+    trace.mapping = mapping
+    trace.path = path
+
+    trace.function_names = metadata['function_names']
+    trace.messages = {int(step): message for step, message in metadata['messages'].items()}
+    trace.watch_expressions = metadata.get('watch_expressions', [])
+    trace.watch_hits = {int(step): changes for step, changes in metadata.get('watch_hits', {}).items()}
+    for step, base_step, changed, removed in metadata['variables']:
+        trace.variables.add(step, base_step, changed, removed)
+    trace.error = metadata['error']
+    trace.truncated = metadata['truncated']
+    trace.output = metadata['output']
+    trace.duration = metadata['duration']
+    return trace
+
+def remove_trace(path):
+    """Delete a trace file and its details; files still mapped elsewhere may stay until closed"""
+    for file_path in (path, metadata_path(path), index_path(path)):
+        try:
+            os.remove(file_path)
+        except OSError:
+            pass
@@ -0,0 +1,337 @@
+"""
+Trace Worker for the Code Analysis and Debugging Visualizer
+Runs traced programs in a separate process and streams the trace back over a pipe
+"""
+
+import json
+import os
+import math
+import queue
+import signal
+import struct
+import subprocess
+import sys
+import threading
+import time
+from array import array
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.tracer import ExecutionTrace, ExecutionTracer, EVENT_EXCEPTION
+from analyzer.sampler import ExecutionSampler
+from analyzer.trace_file import TraceFileWriter, open_trace
+from analyzer.line_index import LineIndex
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Every message is a header followed by a payload of the given length
+_HEADER = struct.Struct('<BI')  # Message kind, payload length
+_COUNT = struct.Struct('<I')
+
+# Message kinds
+MSG_STEPS = 0  # Step count followed by the line, event, depth and function columns
+MSG_NAMES = 1  # Newly seen function names, newline separated
+MSG_DETAILS = 2  # JSON variable deltas, exception messages and watch hits keyed by step
+MSG_DONE = 3  # JSON summary of the finished run
+
+FLUSH_INTERVAL = 0.05  # Seconds between streamed chunks
+
+# Directories of codeflow itself, hidden from the traced program
+_CODEFLOW_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_CODEFLOW_PATHS = {_CODEFLOW_ROOT, os.path.join(_CODEFLOW_ROOT, 'analyzer')}
+
+def _limit_memory(memory_limit_mb):
+    """Cap the worker's address space so runaway allocations raise MemoryError"""
+    if resource is None or not memory_limit_mb:
+        return
+    limit = memory_limit_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError):
+        pass
+
+def _use_script_paths(script_dir):
+    """Import the traced program's modules from its own directory instead of codeflow's"""
+    paths = [path for path in sys.path[1:] if os.path.abspath(path) not in _CODEFLOW_PATHS]
+    sys.path[:] = [script_dir or os.getcwd()] + paths
+    # The worker's own modules stay loaded for the tracer but can no longer shadow the program's
+    for name, module in list(sys.modules.items()):
+        locations = [getattr(module, '__file__', None) or ''] + list(getattr(module, '__path__', []))
+        if name != '__main__' and any(location.startswith(_CODEFLOW_ROOT + os.sep) for location in locations):
+            del sys.modules[name]
+
+class _TraceStreamer:
+    """Sends the steps recorded so far to the parent process"""
+
+    def __init__(self, stream, tracer):
+        self.stream = stream
+        self.tracer = tracer
+        self.sent_steps = 0
+        self.sent_names = 0
+        self.lock = threading.Lock()  # Keeps a flush and the tracer's spill from interleaving
+
+    def send(self, kind, payload):
+        self.stream.write(_HEADER.pack(kind, len(payload)))
+        self.stream.write(payload)
+
+    def flush(self, final=False):
+        """Send the steps recorded since the last flush"""
+        trace = self.tracer.trace
+        if trace is None:
+            return
+        # While the program runs the newest step may still be receiving its
+        # locals snapshot, so it is held back until the next flush
+        first = trace.first_step
+        end = first + len(trace.functions) if final else first + len(trace.functions) - 1
+        names = trace.function_names[self.sent_names:]
+        if names:
+            self.send(MSG_NAMES, "\n".join(names).encode('utf-8'))
+            self.sent_names += len(names)
+
+        start = self.sent_steps
+        if end <= start:
+            return
+        payload = [_COUNT.pack(end - start)]
+        for column in (trace.lines, trace.events, trace.depths, trace.functions):
+            payload.append(column[start - first:end - first].tobytes())
+        self.send(MSG_STEPS, b"".join(payload))
+
+        details = {'locals': {}, 'messages': {}, 'watch': {}}
+        entries = trace.variables.entries
+        for step in range(start, end):
+            entry = entries.get(step)
+            if entry is not None:
+                details['locals'][step] = entry
+            message = trace.messages.get(step)
+            if message is not None:
+                details['messages'][step] = message
+            changes = trace.watch_hits.get(step)
+            if changes is not None:
+                details['watch'][step] = changes
+        if details['locals'] or details['messages'] or details['watch']:
+            self.send(MSG_DETAILS, json.dumps(details).encode('utf-8'))
+        self.sent_steps = end
+        self.stream.flush()
+
+    def spill(self, trace):
+        """Send the steps recorded so far and drop them from the worker's memory; return trace.first_step"""
+        with self.lock:
+            self.flush()
+            trace.drop_steps(self.sent_steps - trace.first_step)
+            return trace.first_step
+
+    def run(self, stop):
+        while not stop.wait(FLUSH_INTERVAL):
+            with self.lock:
+                self.flush()
+
+def worker_main(argv):
+    """Entry point of the worker process: trace the program read from stdin"""
+    filename, max_steps, locals_limit, memory_limit_mb = argv[0], int(argv[1]), int(argv[2]), int(argv[3])
+    watch = json.loads(argv[4]) if len(argv) > 4 else []
+    sampling = json.loads(argv[5]) if len(argv) > 5 else None
+    timeout = float(argv[6]) if len(argv) > 6 else 0
+    script_dir = argv[7] if len(argv) > 7 else ""
+    source_code = sys.stdin.buffer.read().decode('utf-8')
+
+    # Keep the real stdout as the private trace channel and point fd 1 at
+    # devnull so stray writes from the traced program cannot corrupt it
+    stream = os.fdopen(os.dup(1), 'wb')
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    _use_script_paths(script_dir)
+    _limit_memory(memory_limit_mb)
+    if timeout and hasattr(signal, 'alarm'):
+        # The worker ends itself shortly after its deadline, even if the parent stops polling it
+        signal.alarm(math.ceil(timeout) + 1)
+    if sampling is not None:
+        tracer = ExecutionSampler(filename, sampling['interval_ms'], sampling['every_events'], max_steps)
+    else:
+        tracer = ExecutionTracer(filename, max_steps, locals_limit, watch=watch)
+    streamer = _TraceStreamer(stream, tracer)
+    tracer.spill = streamer.spill  # Long runs are streamed out instead of piling up in the worker
+    stop = threading.Event()
+    thread = threading.Thread(target=streamer.run, args=(stop,), daemon=True)
+    thread.start()
+
+    trace = tracer.run(source_code)
+
+    stop.set()
+    thread.join()
+    streamer.flush(final=True)
+    summary = {
+        'error': trace.error,
+        'truncated': trace.truncated,
+        'output': trace.output,
+        'duration': trace.duration,
+    }
+    streamer.send(MSG_DONE, json.dumps(summary).encode('utf-8'))
+    stream.flush()
+
+class TraceWorker:
+    def __init__(self, source_code, filename="main.py", timeout=10.0, memory_limit_mb=512,
+                 max_steps=5_000_000, locals_limit=100_000, trace_path=None, watch=(), sampling=None,
+                 script_dir=None):
+        self.source_code = source_code
+        self.filename = filename
+        self.script_dir = script_dir  # Directory of the program: its sys.path[0] and working directory
+        self.timeout = timeout  # Seconds before the worker is killed, None for no limit
+        self.memory_limit_mb = memory_limit_mb  # Address space limit of the worker (POSIX only)
+        self.max_steps = max_steps
+        self.locals_limit = locals_limit
+        self.trace_path = trace_path  # Write steps to this trace file instead of keeping them in memory
+        self.watch = list(watch)  # Expressions the tracer reports changes of
+        self.sampling = sampling  # {'interval_ms', 'every_events'} to sample the stack instead of tracing every line
+        if sampling is not None:
+            locals_limit = self.locals_limit = 0
+        self.trace = ExecutionTrace(filename, locals_limit)
+        self.trace.watch_expressions = list(self.watch)
+        # Kept up to date as steps arrive; traces written to a file are indexed on disk once finished
+        self.trace.line_index = LineIndex() if trace_path is None else None
+        self._writer = None
+        self.process = None
+        self.finished = False
+        self.timed_out = False
+        self.cancelled = False
+        self._messages = queue.Queue()
+        self._done = False
+        self._started_at = None
+
+    def start(self):
+        """Launch the worker process"""
+        if self.trace_path is not None:
+            self._writer = TraceFileWriter(self.trace_path)
+        args = [sys.executable, os.path.abspath(__file__), self.filename,
+                str(self.max_steps), str(self.locals_limit), str(self.memory_limit_mb or 0),
+                json.dumps(self.watch), json.dumps(self.sampling), str(self.timeout or 0),
+                self.script_dir or ""]
+        self.process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, cwd=self.script_dir or None)
+        self._started_at = time.monotonic()
+        threading.Thread(target=self._read_messages, daemon=True).start()
+        try:
+            self.process.stdin.write(self.source_code.encode('utf-8'))
+            self.process.stdin.close()
+        except OSError:
+            pass  # The worker died early; poll() reports it
+
+    def _read_messages(self):
+        """Read framed messages from the worker until the pipe closes"""
+        stream = self.process.stdout
+        while True:
+            header = stream.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                break
+            kind, length = _HEADER.unpack(header)
+            payload = stream.read(length)
+            if len(payload) < length:
+                break
+            self._messages.put((kind, payload))
+        self._messages.put(None)
+
+    def poll(self):
+        """Merge the trace data received so far; return True once the run is over"""
+        if self.finished:
+            return True
+
+        if not self._done and self.timeout is not None and time.monotonic() - self._started_at > self.timeout:
+            self.timed_out = True
+            self.process.kill()
+
+        while True:
+            try:
+                message = self._messages.get_nowait()
+            except queue.Empty:
+                return False
+            if message is None:
+                self._finish()
+                return True
+            self._apply(*message)
+
+    def steps_received(self):
+        """Get the number of steps received so far"""
+        return self._writer.count if self._writer is not None else len(self.trace)
+
+    def wait(self):
+        """Block until the run is over and return the trace"""
+        while not self.poll():
+            time.sleep(0.01)
+        return self.trace
+
+    def cancel(self):
+        """Stop the worker, keeping the steps received so far"""
+        if self.process is not None and not self.finished:
+            self.cancelled = True
+            self.process.kill()
+
+    def _apply(self, kind, payload):
+        trace = self.trace
+        if kind == MSG_STEPS:
+            count = _COUNT.unpack_from(payload)[0]
+            offset = _COUNT.size
+            columns = [array(typecode) for typecode in ('I', 'B', 'I', 'I')]
+            for column in columns:
+                size = count * column.itemsize
+                column.frombytes(payload[offset:offset + size])
+                offset += size
+            if self._writer is not None:
+                self._writer.append(*columns)
+            else:
+                trace.line_index.add_steps(columns[0])
+                for column, received in zip((trace.lines, trace.events, trace.depths, trace.functions), columns):
+                    column.extend(received)
+        elif kind == MSG_NAMES:
+            trace.function_names.extend(payload.decode('utf-8').split("\n"))
+        elif kind == MSG_DETAILS:
+            details = json.loads(payload)
+            for step, (base_step, changed, removed) in details['locals'].items():
+                trace.variables.add(int(step), base_step, changed, removed)
+            trace.messages.update((int(step), message) for step, message in details['messages'].items())
+            trace.watch_hits.update((int(step), changes) for step, changes in details['watch'].items())
+        elif kind == MSG_DONE:
+            summary = json.loads(payload)
+            trace.error = summary['error']
+            trace.truncated = summary['truncated']
+            trace.output = summary['output']
+            trace.duration = summary['duration']
+            self._done = True
+
+    def _finish(self):
+        """Reap the worker and record why it stopped if it did not finish normally"""
+        returncode = self.process.wait()
+        self.finished = True
+        if not self._done:
+            if self.timed_out:
+                message = f"TimeoutError: execution did not finish within {self.timeout}s"
+            elif self.cancelled:
+                message = "Execution cancelled"
+            else:
+                message = f"Worker exited unexpectedly (exit code {returncode})"
+            self._set_error(message)
+            self.trace.duration = time.monotonic() - self._started_at
+
+        if self._writer is not None:
+            self._writer.close(self.trace)
+            self.trace = open_trace(self.trace_path)
+
+    def _set_error(self, message):
+        """End the trace with an error step, in memory or in the trace file"""
+        if self._writer is None:
+            self.trace.set_error(message)
+            self.trace.line_index.add_steps([self.trace.error['line']])
+            return
+        writer = self._writer
+        step, line = writer.count, writer.last_line
+        function_id = writer.last_function
+        if function_id is None:
+            function_id = self.trace.function_id('<module>')
+        writer.append([line], [EVENT_EXCEPTION], [writer.last_depth], [function_id])
+        self.trace.messages[step] = message
+        self.trace.error = {'step': step, 'line': line, 'message': message}
+
+if __name__ == "__main__":
+    worker_main(sys.argv[1:])
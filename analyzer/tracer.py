@@ -0,0 +1,446 @@
+"""
+Execution Tracer for the Code Analysis and Debugging Visualizer
+Runs Python code and records the real line events, call depth and locals
+"""
+
+import builtins
+import contextlib
+import io
+import os
+import reprlib
+import sys
+import time
+import types
+from array import array
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.variable_history import VariableHistory, DeltaRecorder
+from analyzer.watchpoints import WatchSet
+
+# Event codes stored for each recorded step
+EVENT_LINE = 0
+EVENT_EXCEPTION = 1
+EVENT_NAMES = ('line', 'exception')
+
+SPILL_STEPS = 1_000_000  # Steps between calls to a tracer's spill hook
+
+class TraceLimitExceeded(BaseException):
+    """Raised inside the traced program once the step limit is reached.
+
+    Derives from BaseException so ``except Exception`` in user code does not
+    swallow it.
+    """
+
+REPR_MAX_LENGTH = 60  # Longest string or object repr kept in a snapshot
+REPR_MAX_ITEMS = 10  # Most container items kept in a snapshot
+
+def _make_repr():
+    """Build the bounded repr used for local variable snapshots"""
+    short = reprlib.Repr()
+    short.maxstring = REPR_MAX_LENGTH
+    short.maxother = REPR_MAX_LENGTH
+    short.maxlist = short.maxtuple = short.maxset = short.maxdict = REPR_MAX_ITEMS
+    return short.repr
+
+def _has_shortened_part(value):
+    """Check a literal read back from a snapshot for the marks reprlib leaves where it cut something"""
+    if value is Ellipsis:
+        return True
+    if isinstance(value, (str, bytes)):
+        return len(repr(value)) == REPR_MAX_LENGTH and ('...' if isinstance(value, str) else b'...') in value
+    if isinstance(value, dict):
+        return any(_has_shortened_part(key) or _has_shortened_part(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return any(_has_shortened_part(item) for item in value)
+    return False
+
+def repr_is_truncated(text, value=None):
+    """Check whether a snapshot repr was shortened and so no longer describes the whole value.
+
+    value is the literal the text evaluates to, or None if it is not a literal.
+    """
+    if '...' not in text:
+        return False
+    if value is None:
+        return True  # Shortened ints, dicts and objects no longer parse
+    return _has_shortened_part(value)
+
+_HIDDEN_TYPES = (types.ModuleType, types.FunctionType, types.BuiltinFunctionType, type)
+
+def snapshot_locals(frame_locals, safe_repr=_make_repr()):
+    """Render the data variables of a frame as short strings"""
+    snapshot = {}
+    for name, value in frame_locals.items():
+        if name.startswith('__') or isinstance(value, _HIDDEN_TYPES):
+            continue
+        try:
+            snapshot[name] = safe_repr(value)
+        except Exception:
+            snapshot[name] = '<unrepresentable>'
+    return snapshot
+
+class ExecutionTrace:
+    """Columnar record of one traced run, one entry per step"""
+
+    def __init__(self, filename, locals_limit=None):
+        self.filename = filename
+        self.lines = array('I')
+        self.events = array('B')
+        self.depths = array('I')
+        self.functions = array('I')  # Index into function_names
+        self.function_names = []
+        self.variables = VariableHistory(locals_limit)  # Locals of the first locals_limit steps
+        self.messages = {}  # Step index -> exception message
+        self.watch_expressions = []  # Expressions watched while tracing
+        self.watch_hits = {}  # Step index -> [[expression, old text, new text], ...] first seen at that step
+        self.output = ""
+        self.error = None  # {'step', 'line', 'message'} when the program raised
+        self.truncated = False  # True when the step limit stopped the run
+        self.duration = 0.0
+        self.path = None  # Trace file the columns are mapped from, if any
+        self.line_index = None  # LineIndex over the steps, once built
+        self.mapping = None
+        self.first_step = 0  # Steps before this one were streamed out and dropped from the columns
+
+    def __len__(self):
+        return self.first_step + len(self.lines)
+
+    def drop_steps(self, count):
+        """Drop the oldest steps held in the columns once they have been streamed out"""
+        for column in (self.lines, self.events, self.depths, self.functions):
+            del column[:count]
+        self.first_step += count
+
+    def function_id(self, name):
+        """Get the index of a function name, adding it to the name table if needed"""
+        try:
+            return self.function_names.index(name)
+        except ValueError:
+            self.function_names.append(name)
+            return len(self.function_names) - 1
+
+    def append_step(self, line, event, depth, function_id):
+        """Append one step and return its index"""
+        self.lines.append(line)
+        self.events.append(event)
+        self.depths.append(depth)
+        self.functions.append(function_id)
+        return len(self) - 1
+
+    def set_error(self, message, line=None):
+        """Record an error that ended the run, as a new exception step after the last one"""
+        if line is None:
+            line = self.lines[-1] if self.lines else 0
+        # The error step stays in the frame of the step before it
+        if self.lines:
+            depth, function_id = self.depths[-1], self.functions[-1]
+        else:
+            depth, function_id = 1, self.function_id('<module>')
+        step = self.append_step(line, EVENT_EXCEPTION, depth, function_id)
+        self.messages[step] = message
+        self.error = {'step': step, 'line': line, 'message': message}
+
+    def close(self):
+        """Unmap the trace file backing the columns"""
+        if self.line_index is not None:
+            self.line_index.close()
+        if self.mapping is None:
+            return
+        for column in (self.lines, self.events, self.depths, self.functions):
+            column.release()
+        self.lines, self.events, self.depths, self.functions = array('I'), array('B'), array('I'), array('I')
+        try:
+            self.mapping.close()
+        except BufferError:
+            pass  # Views handed out elsewhere keep the mapping open until collected
+        self.mapping = None
+
+    def step(self, index):
+        """Get one step as a dict"""
+        return {
+            'line': self.lines[index],
+            'event': EVENT_NAMES[self.events[index]],
+            'depth': self.depths[index],
+            'function': self.function_names[self.functions[index]],
+        }
+
+class ExecutionTracer:
+    def __init__(self, filename="main.py", max_steps=5_000_000, locals_limit=100_000, backend="auto",
+                 watch=()):
+        self.filename = filename
+        self.max_steps = max_steps  # Stop the program after this many steps
+        self.locals_limit = locals_limit  # Snapshot locals only for the first steps
+        self.backend = backend  # "settrace", "monitoring" (3.12+) or "auto"
+        self.watch = list(watch)  # Expressions such as "self.result" to report changes of
+        self.spill = None  # Called with the trace every SPILL_STEPS steps to stream steps out; returns trace.first_step
+        self.trace = None
+
+    def select_backend(self):
+        """Pick the tracing backend for this interpreter"""
+        if self.backend != "auto":
+            return self.backend
+        return "monitoring" if hasattr(sys, "monitoring") else "settrace"
+
+    def run(self, source_code):
+        """Execute the source under the tracer and return the ExecutionTrace.
+
+        Raises SyntaxError if the source does not compile.
+        """
+        code = compile(source_code, self.filename, 'exec')
+        self.trace = ExecutionTrace(self.filename, self.locals_limit)
+        self.trace.watch_expressions = list(self.watch)
+        namespace = {'__name__': '__main__', '__file__': self.filename, '__builtins__': builtins}
+        output = io.StringIO()
+
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(output):
+                self._execute(code, namespace)
+        except TraceLimitExceeded:
+            self.trace.truncated = True
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                self._record_error(e)
+        except BaseException as e:
+            self._record_error(e)
+        self._flush_watch_changes()
+        self.trace.duration = time.perf_counter() - start
+        self.trace.output = output.getvalue()
+        return self.trace
+
+    def _execute(self, code, namespace):
+        """Run the compiled program with the selected backend recording it"""
+        backend = self.select_backend()
+        if backend == "monitoring":
+            try:
+                self._run_monitoring(code, namespace)
+            except ValueError:
+                # Another tool (debugger, coverage) holds the tool id
+                self._run_settrace(code, namespace)
+        else:
+            self._run_settrace(code, namespace)
+
+    def _record_error(self, error):
+        """Remember the exception that ended the program and the step that raised it"""
+        trace = self.trace
+        line = 0
+        tb = error.__traceback__
+        while tb is not None:
+            if tb.tb_frame.f_code.co_filename == self.filename:
+                line = tb.tb_lineno
+            tb = tb.tb_next
+
+        message = f"{type(error).__name__}: {error}"
+        step = getattr(self, '_last_exception_step', None)
+        if getattr(self, '_last_exception', None) is not error or step is None:
+            trace.set_error(message, line or None)
+        else:
+            index = step - trace.first_step
+            recorded_line = trace.lines[index] if index >= 0 else 0
+            trace.error = {'step': step, 'line': line or recorded_line, 'message': message}
+
+    def _flush_watch_changes(self):
+        """Attach changes seen after the last recorded step to that step"""
+        pending = getattr(self, '_pending_watch_changes', None)
+        trace = self.trace
+        if pending and len(trace):
+            trace.watch_hits.setdefault(len(trace) - 1, []).extend(pending)
+            pending.clear()
+
+    def _make_recorders(self):
+        """Build the per-event recording functions shared by both backends.
+
+        Hot-path state is bound into closures to keep the per-event cost down.
+        """
+        trace = self.trace
+        lines = trace.lines
+        append_line = lines.append
+        append_event = trace.events.append
+        append_depth = trace.depths.append
+        append_function = trace.functions.append
+        deltas = DeltaRecorder(trace.variables)
+        max_steps = self.max_steps
+        spill = self.spill
+        dropped = 0  # Steps spilled out of the columns so far
+        next_check = min(max_steps, SPILL_STEPS) if spill is not None else max_steps
+        locals_limit = self.locals_limit
+        function_ids = {}
+        self._last_exception = None
+        self._last_exception_step = None
+        watches = WatchSet(self.watch, _make_repr()) if self.watch else None
+        # Changes seen when a frame returns belong to the step that runs next
+        pending = self._pending_watch_changes = []
+        watch_hits = trace.watch_hits
+
+        def function_id(code):
+            fid = function_ids.get(code)
+            if fid is None:
+                trace.function_names.append(code.co_name)
+                fid = function_ids[code] = len(trace.function_names) - 1
+            return fid
+
+        def record_line(line, depth, fid, frame):
+            nonlocal dropped, next_check
+            step = dropped + len(lines)
+            if step >= next_check:
+                if step >= max_steps:
+                    raise TraceLimitExceeded()
+                dropped = spill(trace)
+                next_check = min(max_steps, step + SPILL_STEPS)
+            append_line(line)
+            append_event(EVENT_LINE)
+            append_depth(depth)
+            append_function(fid)
+            if step < locals_limit:
+                deltas.record(step, id(frame), snapshot_locals(frame.f_locals))
+            if watches is not None:
+                changes = watches.check(frame)
+                if pending:
+                    changes = pending + (changes or [])
+                    pending.clear()
+                if changes:
+                    watch_hits[step] = changes
+
+        def record_exception(line, depth, fid, error):
+            # Only the frame that raised records a step, not every frame it unwinds
+            if error is self._last_exception:
+                return
+            step = dropped + len(lines)
+            append_line(line)
+            append_event(EVENT_EXCEPTION)
+            append_depth(depth)
+            append_function(fid)
+            trace.messages[step] = f"{type(error).__name__}: {error}"
+            self._last_exception = error
+            self._last_exception_step = step
+
+        def forget_frame(frame):
+            frame_key = id(frame)
+            deltas.forget(frame_key)
+            if watches is not None:
+                # The last line of a frame can change a watched value too
+                changes = watches.check(frame)
+                if changes:
+                    pending.extend(changes)
+                watches.forget(frame_key)
+
+        return function_id, record_line, record_exception, forget_frame
+
+    def _run_settrace(self, code, namespace):
+        """Trace with sys.settrace, installing a local tracer only on frames of the traced file"""
+        target = self.filename
+        function_id, record_line, record_exception, forget_frame = self._make_recorders()
+        state = {'depth': 0}
+
+        def global_trace(frame, event, arg):
+            if event != 'call' or frame.f_code.co_filename != target:
+                return None
+            state['depth'] += 1
+            depth = state['depth']
+            fid = function_id(frame.f_code)
+
+            def local_trace(frame, event, arg):
+                if event == 'line':
+                    record_line(frame.f_lineno, depth, fid, frame)
+                elif event == 'return':
+                    state['depth'] -= 1
+                    forget_frame(frame)
+                elif event == 'exception':
+                    record_exception(frame.f_lineno, depth, fid, arg[1])
+                return local_trace
+
+            return local_trace
+
+        previous = sys.gettrace()
+        sys.settrace(global_trace)
+        try:
+            exec(code, namespace)
+        finally:
+            sys.settrace(previous)
+
+    def _run_monitoring(self, code, namespace):
+        """Trace with sys.monitoring (Python 3.12+), disabling events outside the traced file"""
+        monitoring = sys.monitoring
+        events = monitoring.events
+        tool = monitoring.DEBUGGER_ID
+        DISABLE = monitoring.DISABLE
+        target = self.filename
+        function_id, record_line, record_exception, forget_frame = self._make_recorders()
+        state = {'depth': 0}
+        getframe = sys._getframe
+
+        def on_start(code, offset, *args):
+            if code.co_filename != target:
+                return DISABLE
+            state['depth'] += 1
+
+        def on_return(code, offset, *args):
+            if code.co_filename != target:
+                return DISABLE
+            state['depth'] -= 1
+            forget_frame(getframe(1))
+
+        def on_unwind(code, offset, error):
+            if code.co_filename == target:
+                state['depth'] -= 1
+                forget_frame(getframe(1))
+
+        def on_line(code, line):
+            if code.co_filename != target:
+                return DISABLE
+            record_line(line, state['depth'], function_id(code), getframe(1))
+
+        def on_raise(code, offset, error):
+            if code.co_filename == target:
+                line = 0
+                for start, end, lineno in code.co_lines():
+                    if start <= offset < end:
+                        line = lineno or 0
+                        break
+                record_exception(line, state['depth'], function_id(code), error)
+
+        callbacks = {
+            events.PY_START: on_start,
+            events.PY_RESUME: on_start,
+            events.PY_THROW: on_start,
+            events.PY_RETURN: on_return,
+            events.PY_YIELD: on_return,
+            events.PY_UNWIND: on_unwind,
+            events.LINE: on_line,
+            events.RAISE: on_raise,
+        }
+
+        monitoring.use_tool_id(tool, "codeflow")
+        try:
+            mask = 0
+            for event, callback in callbacks.items():
+                monitoring.register_callback(tool, event, callback)
+                mask |= event
+            monitoring.restart_events()  # Re-enable locations disabled by earlier runs
+            monitoring.set_events(tool, mask)
+            exec(code, namespace)
+        finally:
+            monitoring.set_events(tool, 0)
+            for event in callbacks:
+                monitoring.register_callback(tool, event, None)
+            monitoring.free_tool_id(tool)
+
+# Example usage
+if __name__ == "__main__":
+    sample_code = """
+def fibonacci(n):
+    if n <= 1:
+        return n
+    return fibonacci(n-1) + fibonacci(n-2)
+
+total = 0
+for i in range(1000000):
+    total += i
+print(fibonacci(10), total)
+"""
+
+    tracer = ExecutionTracer("sample.py")
+    trace = tracer.run(sample_code)
+    print(f"Backend: {tracer.select_backend()}")
+    print(f"Recorded {len(trace)} steps in {trace.duration:.2f}s")
+    print(f"Output: {trace.output.strip()}")
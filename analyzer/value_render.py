@@ -0,0 +1,124 @@
+"""
+Value rendering for the Code Analysis and Debugging Visualizer
+Renders AST nodes as bounded ast.dump() previews, formatted only when displayed
+"""
+
+import ast
+
+class _Pruner:
+    """Copy an AST keeping only the part ast.dump() can print within a character limit.
+
+    Nodes are visited in the order ast.dump() prints them while counting a
+    lower bound of the characters printed so far. Once that bound passes the
+    limit, the rest of the tree cannot show up in the first ``limit``
+    characters and is dropped, so the cost no longer depends on the node size.
+    """
+
+    # Placeholder for required fields that lie past the limit
+    STUB = ast.Pass()
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.remaining = limit + 1
+        self.truncated = False
+
+    def prune(self, value):
+        if isinstance(value, ast.AST):
+            if self.remaining <= 0:
+                self.truncated = True
+                return self.STUB
+            cls = type(value)
+            self.remaining -= len(cls.__name__) + 1  # "Name("
+            pruned = cls.__new__(cls)
+            for name in value._fields:
+                try:
+                    field = getattr(value, name)
+                except AttributeError:
+                    continue
+                setattr(pruned, name, self.prune(field))
+            return pruned
+
+        if isinstance(value, list):
+            items = []
+            for item in value:
+                if self.remaining <= 0:
+                    self.truncated = True
+                    break
+                items.append(self.prune(item))
+            return items
+
+        if isinstance(value, (str, bytes)):
+            self.remaining -= len(value)
+            if len(value) > self.limit:
+                return self.prune_text(value)
+        return value
+
+    def prune_text(self, value):
+        """Shorten a long string while keeping the quote style repr() picks for it"""
+        if isinstance(value, str):
+            single, double = "'", '"'
+        else:
+            single, double = b"'", b'"'
+        prefix = value[:self.limit]
+        # repr() switches quotes based on which quote characters occur anywhere
+        # in the value, so keep both markers after the visible prefix
+        if single in value and single not in prefix:
+            prefix += single
+        if double in value and double not in prefix:
+            prefix += double
+        return prefix
+
+def bounded_dump(node, limit):
+    """Return (text, truncated) where text starts with the first ``limit`` characters of ast.dump(node)"""
+    pruner = _Pruner(limit)
+    text = ast.dump(pruner.prune(node))
+    return text, pruner.truncated or len(text) > limit
+
+def render_node(node, limit=50):
+    """Render a node as its ast.dump() text, cut to ``limit`` characters plus "..." """
+    try:
+        text, truncated = bounded_dump(node, limit)
+        return text[:limit] + "..." if truncated else text
+    except Exception:
+        return "Unknown"
+
+class LazyValue:
+    """String preview of an AST node that is only rendered when first displayed.
+
+    Behaves like the rendered string for formatting, comparison and
+    hashing, and pickles as a plain string so it can cross process
+    boundaries without the node.
+    """
+
+    __slots__ = ('_node', '_limit', '_text')
+
+    def __init__(self, node, limit=50):
+        self._node = node
+        self._limit = limit
+        self._text = None
+
+    def __str__(self):
+        if self._text is None:
+            self._text = render_node(self._node, self._limit)
+            self._node = None  # Release the subtree once rendered
+        return self._text
+
+    def __repr__(self):
+        return repr(str(self))
+
+    def __format__(self, format_spec):
+        return format(str(self), format_spec)
+
+    def __eq__(self, other):
+        if isinstance(other, (LazyValue, str)):
+            return str(self) == str(other)
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(str(self))
+
+    def __len__(self):
+        return len(str(self))
+
+    def __reduce__(self):
+        return (str, (str(self),))
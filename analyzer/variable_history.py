@@ -0,0 +1,139 @@
+"""
+Variable History for the Code Analysis and Debugging Visualizer
+Delta-encoded local variable states of a traced run
+"""
+
+import bisect
+from array import array
+from collections import OrderedDict
+from types import MappingProxyType
+
+# Longest chain of deltas before a full snapshot is stored
+FULL_SNAPSHOT_INTERVAL = 32
+
+EMPTY_STATE = MappingProxyType({})
+
+class VariableHistory:
+    """Variable states keyed by step, stored as changes against an earlier step.
+
+    Only steps whose state differs from the step before get an entry. Each
+    entry is ``(base_step, changed, removed)``: the state is the state at
+    ``base_step`` with ``changed`` applied and ``removed`` names dropped, or a
+    full snapshot when ``base_step`` is -1. Unchanged values are shared
+    between states rather than copied.
+    """
+
+    def __init__(self, limit=None, cache_size=64):
+        self.limit = limit  # Steps at or after this have no recorded variables
+        self.steps = array('I')  # Steps with an entry, ascending
+        self.entries = {}  # Step -> (base step, changed, removed)
+        self._cache = OrderedDict()  # Entry step -> rebuilt read-only state
+        self._cache_size = cache_size
+
+    def add(self, step, base_step, changed, removed=()):
+        """Record the state at a step as a delta against base_step (-1 for a full snapshot)"""
+        self.steps.append(step)
+        self.entries[step] = (base_step, changed, tuple(removed))
+
+    def entry_step(self, step):
+        """Get the latest step at or before step that has an entry"""
+        position = bisect.bisect_right(self.steps, step)
+        return self.steps[position - 1] if position else None
+
+    def state_at(self, step):
+        """Get a read-only view of the variables at a step, or None if not recorded"""
+        if self.limit is not None and step >= self.limit:
+            return None
+        entry_step = self.entry_step(step)
+        if entry_step is None:
+            return EMPTY_STATE
+        return self._rebuild(entry_step)
+
+    def value_at(self, step, name):
+        """Get one variable at a step by walking its delta chain, without rebuilding the state.
+
+        Raises KeyError if the variable is not set or not recorded at that step.
+        """
+        if self.limit is not None and step >= self.limit:
+            raise KeyError(name)
+        current = self.entry_step(step)
+        while current is not None:
+            cached = self._cache.get(current)
+            if cached is not None:
+                return cached[name]
+            base_step, changed, removed = self.entries[current]
+            if name in changed:
+                return changed[name]
+            if base_step < 0 or name in removed:
+                break
+            current = self.entry_step(base_step)
+        raise KeyError(name)
+
+    def _rebuild(self, entry_step):
+        """Apply the chain of deltas that leads to an entry, starting from a cached or full state"""
+        chain = []
+        current = entry_step
+        state = None
+        while current is not None:
+            cached = self._cache.get(current)
+            if cached is not None:
+                self._cache.move_to_end(current)
+                state = cached
+                break
+            entry = self.entries[current]
+            chain.append((current, entry))
+            if entry[0] < 0:
+                break
+            current = self.entry_step(entry[0])
+
+        for step, (base_step, changed, removed) in reversed(chain):
+            if base_step < 0:
+                values = dict(changed)
+            else:
+                values = dict(state) if state is not None else {}
+                values.update(changed)
+                for name in removed:
+                    values.pop(name, None)
+            state = MappingProxyType(values)
+            self._remember(step, state)
+        return state
+
+    def _remember(self, step, state):
+        self._cache[step] = state
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def __len__(self):
+        return len(self.steps)
+
+class DeltaRecorder:
+    """Turns per-step variable snapshots into VariableHistory entries"""
+
+    def __init__(self, history):
+        self.history = history
+        self._frames = {}  # Frame key -> (entry step, snapshot, chain length)
+        self._previous_key = None
+
+    def record(self, step, frame_key, snapshot):
+        """Record the snapshot of the frame executing a step"""
+        last = self._frames.get(frame_key)
+        if last is None:
+            self.history.add(step, -1, snapshot)
+            self._frames[frame_key] = (step, snapshot, 0)
+        else:
+            base_step, base, chain = last
+            changed = {name: value for name, value in snapshot.items() if base.get(name) != value}
+            removed = [name for name in base if name not in snapshot]
+            if frame_key == self._previous_key and not changed and not removed:
+                pass  # Same state as the previous step
+            elif chain >= FULL_SNAPSHOT_INTERVAL:
+                self.history.add(step, -1, snapshot)
+                self._frames[frame_key] = (step, snapshot, 0)
+            else:
+                self.history.add(step, base_step, changed, removed)
+                self._frames[frame_key] = (step, snapshot, chain + 1)
+        self._previous_key = frame_key
+
+    def forget(self, frame_key):
+        """Drop the state of a frame that has returned"""
+        self._frames.pop(frame_key, None)
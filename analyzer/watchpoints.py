@@ -0,0 +1,220 @@
+"""
+Watchpoints for the Code Analysis and Debugging Visualizer
+Change detection for watched variables and attributes while a program is traced
+"""
+
+import ast
+import inspect
+import itertools
+import weakref
+
+_MISSING = object()
+
+# Values of these types cannot change in place, so an identity check is enough
+_IMMUTABLE_TYPES = (int, float, complex, str, bytes, bool, type(None), range, frozenset)
+
+# Containers larger than this are fingerprinted by their length and ends only
+FULL_HASH_ITEMS = 256
+SAMPLE_ITEMS = 8
+
+UNDEFINED_TEXT = '<undefined>'
+
+# Where a code object keeps a watched root name
+_SCOPE_DICT = 0
+_SCOPE_FAST = 1
+_SCOPE_GLOBAL = 2
+
+def parse_watch_expression(expression):
+    """Split a watch expression such as ``self.result`` into its names.
+
+    Raises ValueError unless the expression is a name followed by attribute names.
+    """
+    try:
+        node = ast.parse(expression.strip(), mode='eval').body
+    except SyntaxError:
+        raise ValueError(f"Invalid watch expression: {expression!r}")
+    path = []
+    while isinstance(node, ast.Attribute):
+        path.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        raise ValueError(f"Only variables and attributes can be watched, not {expression!r}")
+    path.append(node.id)
+    path.reverse()
+    return path
+
+def _hash_items(items):
+    """Hash a sequence of items by value, falling back to their reprs for unhashable ones"""
+    try:
+        return hash(tuple(items))
+    except TypeError:
+        return hash(repr(items))
+
+def fingerprint(value):
+    """Hash the content of a value that could change without changing identity, or None.
+
+    Containers up to FULL_HASH_ITEMS are hashed in full; larger ones hash
+    their length and the items at each end, so appends and removals are
+    seen without a cost that grows with the container. Other objects hash
+    which objects their attributes refer to.
+    """
+    if isinstance(value, _IMMUTABLE_TYPES) or value is _MISSING:
+        return None
+    try:
+        if isinstance(value, (list, tuple, bytearray)):
+            if len(value) > FULL_HASH_ITEMS:
+                return hash((len(value), _hash_items(value[:SAMPLE_ITEMS]), _hash_items(value[-SAMPLE_ITEMS:])))
+            return _hash_items(value)
+        if isinstance(value, (dict, set)):
+            items = value.items() if isinstance(value, dict) else value
+            if len(value) > FULL_HASH_ITEMS:
+                head = _hash_items(list(itertools.islice(items, SAMPLE_ITEMS)))
+                tail = _hash_items(list(itertools.islice(reversed(items), SAMPLE_ITEMS))) if isinstance(value, dict) else 0
+                return hash((len(value), head, tail))
+            return _hash_items(list(items))
+        if hasattr(value, '__dict__') and not isinstance(value, type):
+            attributes = vars(value)
+            return hash((tuple(attributes), tuple(map(id, attributes.values()))))
+        return hash(repr(value))
+    except Exception:
+        return None
+
+def _identity(value):
+    """Identify a value by its id and type, so a state can be compared without keeping the value alive"""
+    return id(value), type(value)
+
+class Watchpoint:
+    """One watched expression and the last value seen in each scope.
+
+    Plain names are tracked per frame, so each call has its own ``total``.
+    Attribute chains are tracked per root object, so ``self.result`` follows
+    each instance across all of its methods. A value is unchanged while it
+    is the same object; objects that can change in place are compared by a
+    fingerprint of their content.
+
+    Watching never keeps the program's objects alive: roots are held through
+    weak references, and their state is dropped when they are collected.
+    """
+
+    def __init__(self, expression, render=repr):
+        self.expression = expression
+        self.path = parse_watch_expression(expression)
+        self.render = render
+        self._states = {}  # Scope key -> (identity, fingerprint, text, value if immutable)
+        self._roots = {}  # Root object id -> weak reference, or its type if it cannot be weakly referenced
+        self._scopes = {}  # Code id -> (where it keeps the root name, code kept alive); code objects hash slowly
+
+    def _scope(self, code):
+        """Classify where a code object keeps the root name: its locals dict, fast locals or globals"""
+        name = self.path[0]
+        if not code.co_flags & inspect.CO_OPTIMIZED:
+            scope = _SCOPE_DICT  # Module and class bodies
+        elif name in code.co_varnames or name in code.co_cellvars or name in code.co_freevars:
+            scope = _SCOPE_FAST
+        else:
+            scope = _SCOPE_GLOBAL
+        self._scopes[id(code)] = (scope, code)
+        return scope
+
+    def _track_root(self, key, root):
+        """Start following a root object; its state is dropped when it is collected"""
+        try:
+            self._roots[key] = weakref.ref(root, lambda _, key=key: self._drop_root(key))
+        except TypeError:
+            # Its id may be reused once it is collected, so the type is checked as well
+            self._roots[key] = type(root)
+
+    def _drop_root(self, key):
+        self._roots.pop(key, None)
+        self._states.pop(key, None)
+
+    def _text(self, value):
+        if value is _MISSING:
+            return UNDEFINED_TEXT
+        try:
+            return self.render(value)
+        except Exception:
+            return '<unrepresentable>'
+
+    def check(self, frame):
+        """Get (old text, new text) if the value changed since it was last seen in this scope"""
+        code = frame.f_code
+        scope = self._scopes.get(id(code))
+        if scope is None:
+            scope = self._scope(code)
+        else:
+            scope = scope[0]
+        path = self.path
+
+        # Resolve the expression; fast locals are only read through f_locals
+        # when the root name is one of them
+        if len(path) == 1:
+            if scope == _SCOPE_GLOBAL:
+                return None
+            key = id(frame)
+            value = frame.f_locals.get(path[0], _MISSING)
+        else:
+            root = frame.f_locals.get(path[0], _MISSING) if scope != _SCOPE_GLOBAL else _MISSING
+            if root is _MISSING:
+                root = frame.f_globals.get(path[0], _MISSING)
+                if root is _MISSING:
+                    return None
+            key = id(root)
+            tracked = self._roots.get(key)
+            if tracked is None:
+                self._track_root(key, root)
+            elif isinstance(tracked, type) and tracked is not type(root):
+                self._drop_root(key)  # A new object reusing the id of a collected one
+                self._track_root(key, root)
+            value = root
+            for attribute in path[1:]:
+                try:
+                    value = getattr(value, attribute)
+                except Exception:
+                    value = _MISSING
+                    break
+
+        identity = _identity(value)
+        state = self._states.get(key)
+        if state is not None and state[0] == identity:
+            if state[1] is None:
+                return None
+            content = fingerprint(value)
+            if content == state[1]:
+                return None
+        else:
+            content = fingerprint(value)
+        text = self._text(value)
+        # Immutable values are kept so their id stays theirs; others are only identified
+        kept = value if isinstance(value, _IMMUTABLE_TYPES) else None
+        self._states[key] = (identity, content, text, kept)
+        if state is None:
+            return None  # First time the scope is seen
+        if text == state[2] and content == state[1]:
+            return None  # A new object with the same value
+        return state[2], text
+
+    def forget(self, frame_key):
+        """Drop the state of a frame that has returned"""
+        self._states.pop(frame_key, None)
+
+class WatchSet:
+    """The watchpoints checked on every traced line"""
+
+    def __init__(self, expressions, render=repr):
+        self.watchpoints = [Watchpoint(expression, render) for expression in expressions]
+
+    def check(self, frame):
+        """Get [expression, old text, new text] for each watched value that changed, or None"""
+        changes = None
+        for watchpoint in self.watchpoints:
+            change = watchpoint.check(frame)
+            if change is not None:
+                if changes is None:
+                    changes = []
+                changes.append([watchpoint.expression, *change])
+        return changes
+
+    def forget(self, frame_key):
+        for watchpoint in self.watchpoints:
+            watchpoint.forget(frame_key)
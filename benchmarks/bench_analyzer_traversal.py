@@ -0,0 +1,156 @@
+"""
+Benchmark for the ASTAnalyzer traversal engine
+Compares the legacy five-walk extraction against the single-pass analyze()
+"""
+
+import ast
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.ast_analyzer import ASTAnalyzer
+
+def generate_module(functions=2000):
+    """Generate a large module similar to our generated code"""
+    chunks = []
+    for i in range(functions):
+        chunks.append(f"""
+def handler_{i}(request, retries={i % 5}):
+    total = 0
+    for item in request.items:
+        if item.value > {i}:
+            total += item.value
+    while retries > 0:
+        retries -= 1
+    return total
+
+class Model{i}:
+    limit = {i}
+    def run(self):
+        self.state = {{'id': {i}, 'name': 'model_{i}'}}
+        return self.state
+""")
+    return "".join(chunks)
+
+class WalkCounter:
+    """Count how many full traversals are started through ast.walk"""
+
+    def __init__(self):
+        self.calls = 0
+        self.original = ast.walk
+
+    def __enter__(self):
+        def counting_walk(node):
+            self.calls += 1
+            return self.original(node)
+        ast.walk = counting_walk
+        return self
+
+    def __exit__(self, *exc_info):
+        ast.walk = self.original
+
+class BaselineAnalyzer:
+    """Frozen copy of ASTAnalyzer before the single-pass visitor: one ast.walk per result kind"""
+
+    def __init__(self, source_code):
+        self.tree = ast.parse(source_code)
+        self.variables = []
+        self.functions = []
+        self.classes = []
+        self.conditionals = []
+        self.loops = []
+
+    def extract_variables(self):
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Assign):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        value_str = ast.dump(node.value)[:50] + "..." if len(ast.dump(node.value)) > 50 else ast.dump(node.value)
+                        self.variables.append({'name': target.id, 'line': getattr(node, 'lineno', 0), 'value': value_str})
+
+    def extract_functions(self):
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.FunctionDef):
+                params = [arg.arg for arg in node.args.args]
+                self.functions.append({'name': node.name, 'line': getattr(node, 'lineno', 0), 'params': params,
+                                       'returns': None})
+
+    def extract_classes(self):
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.ClassDef):
+                methods = []
+                attributes = []
+                for item in node.body:
+                    if isinstance(item, ast.FunctionDef):
+                        methods.append(item.name)
+                    elif isinstance(item, ast.Assign):
+                        for target in item.targets:
+                            if isinstance(target, ast.Name):
+                                attributes.append(target.id)
+                self.classes.append({'name': node.name, 'line': getattr(node, 'lineno', 0), 'methods': methods,
+                                     'attributes': attributes})
+
+    def extract_conditionals(self):
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.If):
+                test_str = ast.dump(node.test)[:50] + "..." if len(ast.dump(node.test)) > 50 else ast.dump(node.test)
+                self.conditionals.append({'line': getattr(node, 'lineno', 0), 'type': 'if', 'test': test_str})
+
+    def extract_loops(self):
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.For):
+                target_str = ast.dump(node.target)[:30] + "..." if len(ast.dump(node.target)) > 30 else ast.dump(node.target)
+                self.loops.append({'line': getattr(node, 'lineno', 0), 'type': 'for', 'target': target_str, 'test': None})
+            elif isinstance(node, ast.While):
+                test_str = ast.dump(node.test)[:50] + "..." if len(ast.dump(node.test)) > 50 else ast.dump(node.test)
+                self.loops.append({'line': getattr(node, 'lineno', 0), 'type': 'while', 'target': None, 'test': test_str})
+
+    def analyze(self):
+        self.extract_variables()
+        self.extract_functions()
+        self.extract_classes()
+        self.extract_conditionals()
+        self.extract_loops()
+        return {'variables': self.variables, 'functions': self.functions, 'classes': self.classes,
+                'conditionals': self.conditionals, 'loops': self.loops}
+
+def run_legacy(source):
+    """Run the original extractors (one traversal per result kind)"""
+    return BaselineAnalyzer(source).analyze()
+
+def run_single_pass(source):
+    """Run the single-pass analysis"""
+    analyzer = ASTAnalyzer(source, cache=None)
+    analyzer.analyze()
+    return analyzer.get_results(as_dicts=True)
+
+def measure(label, func, source, repeat=3):
+    """Time a run and count the traversals it performs"""
+    with WalkCounter() as counter:
+        func(source)
+    walks = counter.calls
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(source)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    print(f"{label:<14} traversals: {walks}  best time: {best * 1000:.1f} ms")
+    return walks, best
+
+if __name__ == "__main__":
+    source = generate_module()
+    print(f"Module size: {len(source.splitlines())} lines")
+    print("=" * 50)
+
+    legacy_walks, legacy_time = measure("five-pass", run_legacy, source)
+    single_walks, single_time = measure("single-pass", run_single_pass, source)
+
+    assert run_legacy(source) == run_single_pass(source)
+
+    print("=" * 50)
+    print(f"Traversals reduced from {legacy_walks} to {single_walks}")
+    print(f"Speedup: {legacy_time / single_time:.2f}x")
@@ -0,0 +1,67 @@
+"""
+Benchmark for session history save and load latency
+Compares the shared WAL connection against opening a connection per call
+"""
+
+import sqlite3
+import sys
+import os
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.history_db import HistoryDatabase
+
+SESSIONS = 500
+
+class PerCallConnections(HistoryDatabase):
+    """The previous behaviour: a new connection in rollback journal mode for every call"""
+
+    def connection(self):
+        if self._conn is not None:
+            self._conn.close()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        return self._conn
+
+def make_session(i):
+    """Build a session of the size a short debugging run saves"""
+    code = "".join(f"value_{n} = compute({n}, {i})\n" for n in range(100))
+    steps = [{'line': n % 100 + 1, 'type': 'Assign', 'description': f"Executing statement at line {n % 100 + 1}"}
+             for n in range(300)]
+    return (f"file_{i % 20}.py", code, {'variables': [f"value_{n}" for n in range(100)]}, steps,
+            {f"value_{n}": repr(n * i) for n in range(20)}, {'nodes': list(range(100))})
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+def run(database_class):
+    """Time saving and then loading SESSIONS sessions; return (save times, load times) in seconds"""
+    directory = tempfile.mkdtemp()
+    db = database_class(os.path.join(directory, "sessions.db"))
+    sessions = [make_session(i) for i in range(SESSIONS)]
+    save_times, load_times, ids = [], [], []
+    for session in sessions:
+        start = time.perf_counter()
+        ids.append(db.save_session(*session))
+        save_times.append(time.perf_counter() - start)
+    for session_id in ids:
+        start = time.perf_counter()
+        db.load_session(session_id)
+        load_times.append(time.perf_counter() - start)
+    db.close()
+    return save_times, load_times
+
+if __name__ == "__main__":
+    print(f"Sessions: {SESSIONS}")
+    print("=" * 64)
+    print(f"{'connection':<12} {'save mean':>10} {'save p95':>10} {'load mean':>10} {'load p95':>10}  (ms)")
+    results = {}
+    for name, database_class in (("per call", PerCallConnections), ("shared WAL", HistoryDatabase)):
+        save_times, load_times = run(database_class)
+        results[name] = (sum(save_times) / len(save_times), sum(load_times) / len(load_times))
+        print(f"{name:<12} {results[name][0] * 1000:10.3f} {percentile(save_times, 0.95) * 1000:10.3f} "
+              f"{results[name][1] * 1000:10.3f} {percentile(load_times, 0.95) * 1000:10.3f}")
+    print("=" * 64)
+    print(f"Save speedup: {results['per call'][0] / results['shared WAL'][0]:.2f}x, "
+          f"load speedup: {results['per call'][1] / results['shared WAL'][1]:.2f}x")
@@ -0,0 +1,41 @@
+"""
+Benchmark for the memory used by analysis results
+Compares the compact result records against the previous dict representation
+"""
+
+import sys
+import os
+import gc
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.ast_analyzer import ASTAnalyzer
+from bench_analyzer_traversal import generate_module
+
+def measure(build):
+    """Return (object, bytes allocated) for the containers created by build()"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return built, after - before
+
+if __name__ == "__main__":
+    analyzer = ASTAnalyzer(generate_module(functions=5000), cache=None)
+    analyzer.analyze()
+    results = analyzer.get_results()
+    count = sum(len(items) for items in results.values())
+    print(f"Findings: {count}")
+    print("=" * 50)
+
+    # Both representations share the same field values, so only the
+    # per-finding containers are measured
+    records, records_bytes = measure(lambda: {kind: [item._replace() for item in items] for kind, items in results.items()})
+    dicts, dicts_bytes = measure(lambda: {kind: [item.as_dict() for item in items] for kind, items in results.items()})
+
+    print(f"{'dicts':<10} {dicts_bytes / 1024:10.1f} KiB  {dicts_bytes / count:6.1f} bytes/finding")
+    print(f"{'records':<10} {records_bytes / 1024:10.1f} KiB  {records_bytes / count:6.1f} bytes/finding")
+    print("=" * 50)
+    print(f"Memory reduction: {dicts_bytes / records_bytes:.2f}x")
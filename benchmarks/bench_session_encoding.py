@@ -0,0 +1,59 @@
+"""
+Benchmark for the encoding of stored session payloads
+Reports the size and encode/decode time of each format for a long trace
+"""
+
+import json
+import sys
+import os
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.debug_engine import DebuggingEngine
+from db.session_codec import dump_json, encode_payload, decode_payload
+
+SOURCE = """
+def accumulate(values):
+    total = 0
+    for value in values:
+        if value % 3:
+            total += value
+    return total
+
+result = accumulate(range(20000))
+"""
+
+REPEATS = 5
+
+def best_time(function):
+    """Run a function REPEATS times; return its result and fastest time"""
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+if __name__ == "__main__":
+    engine = DebuggingEngine(SOURCE, "bench.py", cache=None, isolated=False)
+    engine.parse()
+    engine.initialize_execution_steps()
+    steps = list(engine.execution_steps)
+    print(f"Steps: {len(steps)}")
+    print("=" * 64)
+    print(f"{'format':<14} {'size KiB':>10} {'ratio':>8} {'encode ms':>10} {'decode ms':>10}")
+
+    # The previous format: json.dumps text stored as is
+    text, encode_time = best_time(lambda: json.dumps(steps))
+    _, decode_time = best_time(lambda: json.loads(text))
+    baseline = len(text.encode('utf-8'))
+    print(f"{'json (before)':<14} {baseline / 1024:10.1f} {1.0:8.2f} {encode_time * 1000:10.1f} {decode_time * 1000:10.1f}")
+
+    for compression in ('none', 'zlib', 'lzma'):
+        data, encode_time = best_time(lambda: encode_payload(dump_json(steps), compression))
+        decoded, decode_time = best_time(lambda: json.loads(decode_payload(data)))
+        assert decoded == steps
+        print(f"{compression:<14} {len(data) / 1024:10.1f} {baseline / len(data):8.2f} "
+              f"{encode_time * 1000:10.1f} {decode_time * 1000:10.1f}")
+    print("=" * 64)
@@ -0,0 +1,44 @@
+"""
+Benchmark for the memory used by execution steps
+Compares the columnar step store against a list of step dicts
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analyzer.debug_engine import DebuggingEngine
+from bench_result_memory import measure
+
+SOURCE = """
+def accumulate(values):
+    total = 0
+    for value in values:
+        if value % 3:
+            total += value
+    return total
+
+result = accumulate(range(200000))
+"""
+
+if __name__ == "__main__":
+    engine = DebuggingEngine(SOURCE, "bench.py", cache=None, isolated=False)
+    engine.parse()
+    engine.trace_execution()
+    count = len(engine.trace)
+    print(f"Steps: {count}")
+    print("=" * 50)
+
+    def build_store():
+        engine.build_trace_steps()
+        return engine.execution_steps
+
+    store, store_bytes = measure(build_store)
+    # The store reads the trace's own columns, which would be kept anyway
+    store_bytes += sum(column.itemsize * len(column) for column in (store.lines, store.depths, store.functions))
+    dicts, dicts_bytes = measure(lambda: list(store))
+
+    print(f"{'dicts':<10} {dicts_bytes / 1024:10.1f} KiB  {dicts_bytes / count:6.1f} bytes/step")
+    print(f"{'columnar':<10} {store_bytes / 1024:10.1f} KiB  {store_bytes / count:6.1f} bytes/step")
+    print("=" * 50)
+    print(f"Memory reduction: {dicts_bytes / store_bytes:.2f}x")
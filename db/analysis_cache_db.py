@@ -0,0 +1,106 @@
+"""
+Persistent analysis cache for the Code Analysis and Debugging Visualizer
+Stores analysis results and execution-step skeletons across application restarts
+"""
+
+import sqlite3
+import json
+import time
+
+class AnalysisCacheDatabase:
+    def __init__(self, db_path="analysis_cache.db", max_bytes=64 * 1024 * 1024):
+        self.db_path = db_path
+        self.max_bytes = max_bytes  # Total payload size kept before evicting old entries
+        self.init_database()
+
+    def init_database(self):
+        """Initialize the database with the required tables"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        # Entries are keyed by content hash, payload kind and producer version
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS analysis_cache (
+                cache_key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_analysis_cache_last_used
+            ON analysis_cache (last_used)
+        """)
+
+        conn.commit()
+        conn.close()
+
+    def get(self, cache_key):
+        """Load a cached payload, or None if it is not stored"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT payload FROM analysis_cache WHERE cache_key = ?", (cache_key,))
+        row = cursor.fetchone()
+
+        if row:
+            cursor.execute("UPDATE analysis_cache SET last_used = ? WHERE cache_key = ?", (time.time(), cache_key))
+            conn.commit()
+            conn.close()
+            return json.loads(row[0])
+
+        conn.close()
+        return None
+
+    def put(self, cache_key, payload):
+        """Store a payload and evict the least recently used entries if over budget"""
+        data = json.dumps(payload, default=str)  # Renders lazy value previews
+
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            INSERT OR REPLACE INTO analysis_cache (cache_key, payload, size, last_used)
+            VALUES (?, ?, ?, ?)
+        """, (cache_key, data, len(data), time.time()))
+
+        self._evict(cursor)
+        conn.commit()
+        conn.close()
+
+    def _evict(self, cursor):
+        """Delete the oldest entries until the total size fits in max_bytes"""
+        cursor.execute("SELECT COALESCE(SUM(size), 0) FROM analysis_cache")
+        total = cursor.fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        cursor.execute("SELECT cache_key, size FROM analysis_cache ORDER BY last_used ASC")
+        stale_keys = []
+        for cache_key, size in cursor.fetchall():
+            if total <= self.max_bytes:
+                break
+            stale_keys.append((cache_key,))
+            total -= size
+
+        cursor.executemany("DELETE FROM analysis_cache WHERE cache_key = ?", stale_keys)
+
+    def total_size(self):
+        """Get the total size of the stored payloads in bytes"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT COALESCE(SUM(size), 0) FROM analysis_cache")
+        total = cursor.fetchone()[0]
+
+        conn.close()
+        return total
+
+    def clear(self):
+        """Delete every cached entry"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("DELETE FROM analysis_cache")
+        conn.commit()
+        conn.close()
@@ -3,112 +3,197 @@ Database module for the Code Analysis and Debugging Visualizer
 Handles session storage and retrieval using SQLite
 """
 
+import hashlib
+import os
 import sqlite3
+import sys
 import json
+import threading
 from datetime import datetime
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db.session_codec import dump_json, encode_payload, decode_payload
+
+# Applied once when the connection is opened
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",  # Readers in other connections are not blocked by a save
+    "PRAGMA synchronous=NORMAL",  # In WAL mode commits stay durable across crashes without a sync each
+    "PRAGMA cache_size=-16384",  # 16 MiB page cache
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Session fields kept in the blob table, with the sessions column holding each one's hash
+BLOB_FIELDS = (
+    ('code', 'code_hash'),
+    ('analysis_results', 'analysis_results_hash'),
+    ('execution_steps', 'execution_steps_hash'),
+    ('flow_graph', 'flow_graph_hash'),
+)
+
+# Value of each JSON field when a session has none
+EMPTY_VALUES = {'analysis_results': {}, 'execution_steps': [], 'variables_state': {}, 'flow_graph': {}}
+
+def content_hash(text):
+    """Get the key a payload is stored under in the blob table"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
 
 class HistoryDatabase:
-    def __init__(self, db_path="sessions.db"):
+    def __init__(self, db_path="sessions.db", compression="zlib"):
         self.db_path = db_path
+        self.compression = compression  # How new payloads are encoded: "zlib", "lzma" or "none"
+        self._conn = None  # Shared connection, opened on first use
+        self._lock = threading.RLock()  # Serializes use of the shared connection across threads
         self.init_database()
         
+    def connection(self):
+        """Get the shared connection, opening it on first use"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            self._conn = conn
+        return self._conn
+        
+    def close(self):
+        """Close the shared connection; it is reopened if the database is used again"""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+                
     def init_database(self):
         """Initialize the database with the required tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create sessions table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                filename TEXT NOT NULL,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                code TEXT,
-                analysis_results TEXT,
-                execution_steps TEXT,
-                variables_state TEXT,
-                flow_graph TEXT
-            )
-        """)
-        
-        conn.commit()
-        conn.close()
+        with self._lock:
+            conn = self.connection()
+            
+            # Create sessions table
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    filename TEXT NOT NULL,
+                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    code TEXT,
+                    analysis_results TEXT,
+                    execution_steps TEXT,
+                    variables_state TEXT,
+                    flow_graph TEXT
+                )
+            """)
+            # Newest-first listing and keyset paging read sessions in this order
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON sessions (timestamp DESC, id DESC)")
+            
+            # Large payloads are stored once per distinct content and shared by
+            # the sessions that reference them; older sessions keep them inline
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS blobs (
+                    hash TEXT PRIMARY KEY,
+                    data BLOB NOT NULL,  -- Encoded by session_codec; text in older databases
+                    refcount INTEGER NOT NULL
+                )
+            """)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+            for field, column in BLOB_FIELDS:
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE sessions ADD COLUMN {column} TEXT")
+            conn.commit()
         
     def save_session(self, filename, code, analysis_results, execution_steps, variables_state, flow_graph):
-        """Save a session to the database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO sessions 
-            (filename, code, analysis_results, execution_steps, variables_state, flow_graph)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
-            filename,
-            code,
-            json.dumps(analysis_results),
-            json.dumps(execution_steps),
-            json.dumps(variables_state),
-            json.dumps(flow_graph)
-        ))
-        
-        session_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        
-        return session_id
+        """Save a session to the database, sharing payloads already stored by earlier sessions"""
+        payloads = {
+            'code': code or "",
+            'analysis_results': dump_json(analysis_results),
+            'execution_steps': dump_json(execution_steps),
+            'flow_graph': dump_json(flow_graph)
+        }
+        hashes = [content_hash(payloads[field]) for field, column in BLOB_FIELDS]
+        with self._lock:
+            conn = self.connection()
+            with conn:  # One transaction, so a failed save leaves no dangling references
+                for key, (field, column) in zip(hashes, BLOB_FIELDS):
+                    # Payloads already stored are only referenced again, not re-encoded
+                    if conn.execute("UPDATE blobs SET refcount = refcount + 1 WHERE hash = ?", (key,)).rowcount == 0:
+                        conn.execute("INSERT INTO blobs (hash, data, refcount) VALUES (?, ?, 1)",
+                                     (key, encode_payload(payloads[field], self.compression)))
+                cursor = conn.execute(f"""
+                    INSERT INTO sessions 
+                    (filename, variables_state, {', '.join(column for field, column in BLOB_FIELDS)})
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, (filename, dump_json(variables_state), *hashes))
+            
+        return cursor.lastrowid
         
     def load_session(self, session_id):
         """Load a session from the database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
-        row = cursor.fetchone()
-        
-        if row:
-            session_data = {
-                'id': row[0],
-                'filename': row[1],
-                'timestamp': row[2],
-                'code': row[3],
-                'analysis_results': json.loads(row[4]) if row[4] else {},
-                'execution_steps': json.loads(row[5]) if row[5] else [],
-                'variables_state': json.loads(row[6]) if row[6] else {},
-                'flow_graph': json.loads(row[7]) if row[7] else {}
-            }
-            conn.close()
-            return session_data
-            
-        conn.close()
-        return None
+        columns = ', '.join(f"{field}, {column}" for field, column in BLOB_FIELDS)
+        with self._lock:
+            conn = self.connection()
+            row = conn.execute(f"SELECT id, filename, timestamp, variables_state, {columns} FROM sessions WHERE id = ?",
+                               (session_id,)).fetchone()
+            if row is None:
+                return None
+            keys = [key for key in row[5::2] if key is not None]
+            blobs = dict(conn.execute(f"SELECT hash, data FROM blobs WHERE hash IN ({', '.join('?' * len(keys))})",
+                                      keys).fetchall()) if keys else {}
+        
+        session_data = {
+            'id': row[0],
+            'filename': row[1],
+            'timestamp': row[2],
+            'variables_state': json.loads(row[3]) if row[3] else {}
+        }
+        for i, (field, column) in enumerate(BLOB_FIELDS):
+            inline, key = row[4 + 2 * i], row[5 + 2 * i]
+            text = decode_payload(blobs.get(key)) if key is not None else inline
+            if field == 'code':
+                session_data[field] = text
+            else:
+                session_data[field] = json.loads(text) if text else EMPTY_VALUES[field]
+        return session_data
         
     def get_recent_sessions(self, limit=10):
         """Get the most recent sessions"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT id, filename, timestamp 
-            FROM sessions 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        """, (limit,))
-        
-        rows = cursor.fetchall()
-        sessions = [{'id': row[0], 'filename': row[1], 'timestamp': row[2]} for row in rows]
-        
-        conn.close()
-        return sessions
+        return self.get_sessions_page(limit)
+        
+    def get_sessions_page(self, limit=50, after_timestamp=None, after_id=None):
+        """Get a page of sessions, newest first.
+        
+        Pass the timestamp and id of the last session of the previous page to
+        get the sessions that follow it; each page is an index range scan, so
+        deep pages cost no more than the first.
+        """
+        if after_timestamp is None or after_id is None:
+            query = """
+                SELECT id, filename, timestamp 
+                FROM sessions 
+                ORDER BY timestamp DESC, id DESC 
+                LIMIT ?
+            """
+            params = (limit,)
+        else:
+            query = """
+                SELECT id, filename, timestamp 
+                FROM sessions 
+                WHERE (timestamp, id) < (?, ?) 
+                ORDER BY timestamp DESC, id DESC 
+                LIMIT ?
+            """
+            params = (after_timestamp, after_id, limit)
+        with self._lock:
+            rows = self.connection().execute(query, params).fetchall()
+        
+        return [{'id': row[0], 'filename': row[1], 'timestamp': row[2]} for row in rows]
         
     def delete_session(self, session_id):
-        """Delete a session from the database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
-        conn.commit()
-        conn.close()
+        """Delete a session from the database, and the payloads no other session shares"""
+        with self._lock:
+            conn = self.connection()
+            with conn:
+                row = conn.execute(f"SELECT {', '.join(column for field, column in BLOB_FIELDS)} FROM sessions WHERE id = ?",
+                                   (session_id,)).fetchone()
+                conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+                keys = [(key,) for key in row or () if key is not None]
+                conn.executemany("UPDATE blobs SET refcount = refcount - 1 WHERE hash = ?", keys)
+                conn.executemany("DELETE FROM blobs WHERE hash = ? AND refcount <= 0", keys)
 
 # Example usage
 if __name__ == "__main__":
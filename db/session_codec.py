@@ -0,0 +1,50 @@
+"""
+Session Codec for the Code Analysis and Debugging Visualizer
+Compact, versioned encoding of the payloads stored with history sessions
+"""
+
+import json
+import lzma
+import zlib
+
+# The first byte of an encoded payload says how the rest is stored
+FORMAT_PLAIN = 0  # UTF-8 text
+FORMAT_ZLIB = 1  # zlib-compressed UTF-8 text
+FORMAT_LZMA = 2  # lzma-compressed UTF-8 text
+
+COMPRESSIONS = {'none': FORMAT_PLAIN, 'zlib': FORMAT_ZLIB, 'lzma': FORMAT_LZMA}
+
+# Payloads shorter than this are not worth compressing
+COMPRESS_MIN_BYTES = 256
+
+def dump_json(value):
+    """Serialize a payload without the whitespace json.dumps adds by default"""
+    return json.dumps(value, separators=(',', ':'), default=str)  # Renders lazy value previews
+
+def encode_payload(text, compression='zlib'):
+    """Encode text as a format byte followed by its bytes, compressed when that makes it smaller"""
+    data = text.encode('utf-8')
+    payload_format = COMPRESSIONS[compression] if len(data) >= COMPRESS_MIN_BYTES else FORMAT_PLAIN
+    if payload_format == FORMAT_ZLIB:
+        compressed = zlib.compress(data, 6)
+    elif payload_format == FORMAT_LZMA:
+        compressed = lzma.compress(data, preset=6)
+    if payload_format == FORMAT_PLAIN or len(compressed) >= len(data):
+        return bytes([FORMAT_PLAIN]) + data
+    return bytes([payload_format]) + compressed
+
+def decode_payload(data):
+    """Decode a payload written by encode_payload; text stored before encoding existed is returned as is.
+
+    Raises ValueError for an unknown format byte.
+    """
+    if data is None or isinstance(data, str):
+        return data
+    payload_format, body = data[0], bytes(data[1:])
+    if payload_format == FORMAT_PLAIN:
+        return body.decode('utf-8')
+    if payload_format == FORMAT_ZLIB:
+        return zlib.decompress(body).decode('utf-8')
+    if payload_format == FORMAT_LZMA:
+        return lzma.decompress(body).decode('utf-8')
+    raise ValueError(f"Unknown session payload format: {payload_format}")
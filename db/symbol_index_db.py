@@ -0,0 +1,78 @@
+"""
+Symbol index storage for the Code Analysis and Debugging Visualizer
+Persists the project-wide symbol index so it survives application restarts
+"""
+
+import sqlite3
+
+class SymbolIndexDatabase:
+    def __init__(self, db_path="symbol_index.db"):
+        self.db_path = db_path
+        self.init_database()
+
+    def init_database(self):
+        """Initialize the database with the required tables"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        # One row per indexed file, with the content key it was indexed from
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS symbol_files (
+                file_path TEXT PRIMARY KEY,
+                source_key TEXT
+            )
+        """)
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS symbols (
+                file_path TEXT NOT NULL,
+                name TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                line INTEGER NOT NULL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_symbols_file_path ON symbols (file_path)")
+
+        conn.commit()
+        conn.close()
+
+    def replace_file(self, file_path, source_key, symbols):
+        """Replace the stored symbols of one file with (name, kind, line) tuples"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("DELETE FROM symbols WHERE file_path = ?", (file_path,))
+        cursor.execute("INSERT OR REPLACE INTO symbol_files (file_path, source_key) VALUES (?, ?)",
+                       (file_path, source_key))
+        cursor.executemany("INSERT INTO symbols (file_path, name, kind, line) VALUES (?, ?, ?, ?)",
+                           [(file_path, name, kind, line) for name, kind, line in symbols])
+
+        conn.commit()
+        conn.close()
+
+    def remove_file(self, file_path):
+        """Remove a file and its symbols"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("DELETE FROM symbols WHERE file_path = ?", (file_path,))
+        cursor.execute("DELETE FROM symbol_files WHERE file_path = ?", (file_path,))
+
+        conn.commit()
+        conn.close()
+
+    def load(self):
+        """Load every indexed file as {file_path: (source_key, [(name, kind, line), ...])}"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT file_path, source_key FROM symbol_files")
+        files = {file_path: (source_key, []) for file_path, source_key in cursor.fetchall()}
+
+        cursor.execute("SELECT file_path, name, kind, line FROM symbols ORDER BY rowid")
+        for file_path, name, kind, line in cursor.fetchall():
+            if file_path in files:
+                files[file_path][1].append((name, kind, line))
+
+        conn.close()
+        return files
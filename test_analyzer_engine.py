@@ -0,0 +1,410 @@
+"""
+Test script to verify the AST analyzer engine
+"""
+
+import sys
+import os
+import ast
+import json
+import pickle
+import tempfile
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from analyzer.ast_analyzer import ASTAnalyzer
+from analyzer.analysis_cache import AnalysisCache
+from analyzer.debug_engine import DebuggingEngine
+from analyzer.project_analyzer import ProjectAnalyzer
+from analyzer.value_render import LazyValue, render_node
+from analyzer.symbol_index import SymbolIndex
+from db.analysis_cache_db import AnalysisCacheDatabase
+from db.symbol_index_db import SymbolIndexDatabase
+
+SAMPLE_CODE = """
+def fibonacci(n):
+    if n <= 1:
+        return n
+    else:
+        return fibonacci(n-1) + fibonacci(n-2)
+
+def main():
+    x = 10
+    y = 20
+    result = fibonacci(x)
+    print(result)
+
+class Calculator:
+    precision = 2
+
+    def __init__(self):
+        self.result = 0
+
+    def add(self, a, b):
+        self.result = a + b
+        return self.result
+
+for i in range(5):
+    while i > 3:
+        i -= 1
+    print(i)
+"""
+
+class BaselineAnalyzer:
+    """Frozen copy of ASTAnalyzer before the single-pass visitor: one ast.walk per result kind"""
+
+    def __init__(self, source_code):
+        self.tree = ast.parse(source_code)
+        self.variables = []
+        self.functions = []
+        self.classes = []
+        self.conditionals = []
+        self.loops = []
+
+    def extract_variables(self):
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.Assign):
+                for target in node.targets:
+                    if isinstance(target, ast.Name):
+                        value_str = ast.dump(node.value)[:50] + "..." if len(ast.dump(node.value)) > 50 else ast.dump(node.value)
+                        self.variables.append({'name': target.id, 'line': getattr(node, 'lineno', 0), 'value': value_str})
+
+    def extract_functions(self):
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.FunctionDef):
+                params = [arg.arg for arg in node.args.args]
+                self.functions.append({'name': node.name, 'line': getattr(node, 'lineno', 0), 'params': params,
+                                       'returns': None})
+
+    def extract_classes(self):
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.ClassDef):
+                methods = []
+                attributes = []
+                for item in node.body:
+                    if isinstance(item, ast.FunctionDef):
+                        methods.append(item.name)
+                    elif isinstance(item, ast.Assign):
+                        for target in item.targets:
+                            if isinstance(target, ast.Name):
+                                attributes.append(target.id)
+                self.classes.append({'name': node.name, 'line': getattr(node, 'lineno', 0), 'methods': methods,
+                                     'attributes': attributes})
+
+    def extract_conditionals(self):
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.If):
+                test_str = ast.dump(node.test)[:50] + "..." if len(ast.dump(node.test)) > 50 else ast.dump(node.test)
+                self.conditionals.append({'line': getattr(node, 'lineno', 0), 'type': 'if', 'test': test_str})
+
+    def extract_loops(self):
+        for node in ast.walk(self.tree):
+            if isinstance(node, ast.For):
+                target_str = ast.dump(node.target)[:30] + "..." if len(ast.dump(node.target)) > 30 else ast.dump(node.target)
+                self.loops.append({'line': getattr(node, 'lineno', 0), 'type': 'for', 'target': target_str, 'test': None})
+            elif isinstance(node, ast.While):
+                test_str = ast.dump(node.test)[:50] + "..." if len(ast.dump(node.test)) > 50 else ast.dump(node.test)
+                self.loops.append({'line': getattr(node, 'lineno', 0), 'type': 'while', 'target': None, 'test': test_str})
+
+    def analyze(self):
+        self.extract_variables()
+        self.extract_functions()
+        self.extract_classes()
+        self.extract_conditionals()
+        self.extract_loops()
+        return {'variables': self.variables, 'functions': self.functions, 'classes': self.classes,
+                'conditionals': self.conditionals, 'loops': self.loops}
+
+def test_single_pass_matches_extractors():
+    """The single-pass analysis must match the original per-kind extractors"""
+    own_source = os.path.join(os.path.dirname(os.path.abspath(__file__)), "analyzer", "debug_engine.py")
+    with open(own_source, encoding='utf-8') as f:
+        sources = [SAMPLE_CODE, f.read()]
+    for source in sources:
+        single = ASTAnalyzer(source, cache=None)
+        assert single.analyze()
+        assert single.get_results(as_dicts=True) == BaselineAnalyzer(source).analyze()
+    print("✓ Single-pass analysis matches per-kind extraction")
+
+def test_single_pass_results():
+    """Check the content of the single-pass results"""
+    analyzer = ASTAnalyzer(SAMPLE_CODE)
+    assert analyzer.analyze()
+    results = analyzer.get_results()
+
+    assert [f['name'] for f in results['functions']] == ['fibonacci', 'main', '__init__', 'add']
+    assert [v['name'] for v in results['variables']] == ['x', 'y', 'result', 'precision']
+    assert results['classes'][0]['methods'] == ['__init__', 'add']
+    assert results['classes'][0]['attributes'] == ['precision']
+    assert [c['line'] for c in results['conditionals']] == [3]
+    assert [l['type'] for l in results['loops']] == ['for', 'while']
+    print("✓ Single-pass results are complete")
+
+def test_analysis_cache_shared_between_components():
+    """Unchanged source is parsed and analyzed only once"""
+    cache = AnalysisCache(max_entries=2)
+
+    first = ASTAnalyzer(SAMPLE_CODE, cache=cache)
+    assert first.analyze()
+    second = ASTAnalyzer(SAMPLE_CODE, cache=cache)
+    assert second.analyze()
+    assert second.get_results() == first.get_results()
+    assert second.tree is first.tree
+
+    # Results handed out by the cache do not alias the cached lists
+    second.variables.append({'name': 'extra', 'line': 0, 'value': ''})
+    third = ASTAnalyzer(SAMPLE_CODE, cache=cache)
+    third.analyze()
+    assert third.get_results() == first.get_results()
+
+    engine = DebuggingEngine(SAMPLE_CODE, cache=cache)
+    assert engine.parse()
+    assert engine.tree is first.tree
+    print("✓ Parse and analysis results are shared through the cache")
+
+def test_analysis_cache_eviction():
+    """The cache keeps only the most recently used entries"""
+    cache = AnalysisCache(max_entries=2)
+    for i in range(3):
+        cache.parse(f"x = {i}")
+    assert len(cache) == 2
+    assert cache.get_tree("x = 0") is None
+    assert cache.get_tree("x = 2") is not None
+
+    try:
+        cache.parse("def broken(:")
+        assert False, "SyntaxError expected"
+    except SyntaxError:
+        pass
+    assert cache.get_tree("def broken(:") is None
+    print("✓ Cache evicts least recently used entries")
+
+def test_persistent_analysis_cache():
+    """Results and step skeletons survive a restart through the on-disk store"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db_path = os.path.join(temp_dir, "analysis_cache.db")
+
+        cold_cache = AnalysisCache(store=AnalysisCacheDatabase(db_path))
+        analyzer = ASTAnalyzer(SAMPLE_CODE, cache=cold_cache)
+        assert analyzer.analyze()
+        engine = DebuggingEngine(SAMPLE_CODE, "sample.py", cache=cold_cache, execution_mode="simulate")
+        assert engine.parse()
+        engine.initialize_execution_steps()
+
+        # A fresh in-memory cache simulates the next application launch
+        warm_cache = AnalysisCache(store=AnalysisCacheDatabase(db_path))
+        warm_analyzer = ASTAnalyzer(SAMPLE_CODE, cache=warm_cache)
+        assert warm_analyzer.analyze()
+        assert warm_analyzer.get_results() == analyzer.get_results()
+        warm_engine = DebuggingEngine(SAMPLE_CODE, "other.py", cache=warm_cache, execution_mode="simulate")
+        assert warm_engine.parse()
+        warm_engine.initialize_execution_steps()
+        assert [(s['line'], s['type']) for s in warm_engine.execution_steps] == \
+            [(s['line'], s['type']) for s in engine.execution_steps]
+        assert warm_engine.execution_steps[0]['filename'] == "other.py"
+        assert warm_cache.hits >= 2
+    print("✓ Persistent cache serves results after a restart")
+
+def test_persistent_cache_eviction():
+    """The on-disk store evicts least recently used entries over its size budget"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = AnalysisCacheDatabase(os.path.join(temp_dir, "analysis_cache.db"), max_bytes=300)
+        for i in range(10):
+            store.put(f"key-{i}", {'payload': 'x' * 50})
+        assert store.total_size() <= 300
+        assert store.get("key-9") is not None
+        assert store.get("key-0") is None
+    print("✓ Persistent cache respects its size budget")
+
+def test_incremental_update():
+    """Only changed top-level statements are re-extracted after an edit"""
+    analyzer = ASTAnalyzer(SAMPLE_CODE, cache=None, incremental=True)
+    assert analyzer.analyze()
+    full = ASTAnalyzer(SAMPLE_CODE, cache=None)
+    full.analyze()
+    assert analyzer.get_results() == full.get_results()
+
+    # Edit one function and insert a line above the rest of the file
+    edited = SAMPLE_CODE.replace("    y = 20\n", "    y = 30\n    z = y * 2\n")
+    edited = "import math\n" + edited
+    assert analyzer.update(edited)
+    assert analyzer.last_update['reanalyzed'] == 2
+    assert analyzer.last_update['reused'] == analyzer.last_update['segments'] - 2
+
+    expected = ASTAnalyzer(edited, cache=None)
+    expected.analyze()
+    assert analyzer.get_results() == expected.get_results()
+
+    # Results cached without a tree or segments, as by the persistent store,
+    # still leave a tree and updates that reuse the unchanged statements
+    cache = AnalysisCache()
+    cache.put_results(SAMPLE_CODE, full.get_results())
+    cached = ASTAnalyzer(SAMPLE_CODE, cache=cache)
+    assert cached.analyze() and cached.tree is not None
+    incremental = ASTAnalyzer(SAMPLE_CODE, cache=cache, incremental=True)
+    assert incremental.analyze() and incremental.segments is not None
+    assert incremental.update(edited)
+    assert incremental.last_update['reanalyzed'] == 2
+
+    # Another incremental analyzer of the same source takes the cached segments
+    shared = ASTAnalyzer(SAMPLE_CODE, cache=cache, incremental=True)
+    assert shared.analyze() and shared.segments is not None
+    assert shared.get_results() == full.get_results()
+    print("✓ Incremental update matches a full re-analysis")
+
+def test_bounded_value_rendering():
+    """Previews of large literals match ast.dump without rendering the whole value"""
+    big_literal = "config = {" + ", ".join(f"'key_{i}': [{i}, \"it's\"]" for i in range(5000)) + "}"
+    node = ast.parse(big_literal).body[0].value
+    full = ast.dump(node)
+    assert render_node(node, 50) == full[:50] + "..."
+    assert render_node(ast.parse("x = 1").body[0].value, 50) == "Constant(value=1)"
+
+    long_string = ast.parse("s = 'a' * 0 or '" + "a" * 100 + "\"'").body[0].value
+    assert render_node(long_string, 50) == ast.dump(long_string)[:50] + "..."
+    print("✓ Bounded rendering matches ast.dump previews")
+
+def test_lazy_values():
+    """Values are formatted on first display and serialize as plain strings"""
+    analyzer = ASTAnalyzer("x = [1, 2, 3]\n", cache=None)
+    assert analyzer.analyze()
+    value = analyzer.variables[0]['value']
+    assert isinstance(value, LazyValue)
+    assert value._text is None
+    assert f"{value}" == "List(elts=[Constant(value=1), Constant(value=2), Constant(value=3)], ctx=Load())"[:50] + "..."
+    assert value == str(value)
+    assert pickle.loads(pickle.dumps(value)) == str(value)
+    assert json.loads(json.dumps(analyzer.get_results(as_dicts=True), default=str))['variables'][0]['value'] == str(value)
+    print("✓ Values are rendered lazily")
+
+def test_result_records():
+    """Findings are compact records that still read like the old dicts"""
+    analyzer = ASTAnalyzer(SAMPLE_CODE, cache=None)
+    assert analyzer.analyze()
+    function = analyzer.functions[0]
+    assert function['name'] == function.name == 'fibonacci'
+    assert function.get('params') == ['n']
+    assert function.get('missing', 'default') == 'default'
+    assert not hasattr(function, '__dict__')
+
+    as_dicts = analyzer.get_results(as_dicts=True)
+    assert as_dicts['functions'][0] == {'name': 'fibonacci', 'line': 2, 'params': ['n'], 'returns': None}
+    assert pickle.loads(pickle.dumps(analyzer.get_results())) == analyzer.get_results()
+    print("✓ Results are compact records with a dict view")
+
+def test_iter_results():
+    """Findings stream out during the traversal in discovery order"""
+    expected = ASTAnalyzer(SAMPLE_CODE, cache=None)
+    expected.analyze()
+
+    streaming = ASTAnalyzer(SAMPLE_CODE, cache=None)
+    findings = streaming.iter_results()
+    first = next(findings)
+    assert first.kind == 'functions' and first.name == 'fibonacci'
+    assert streaming.functions == [first] and streaming.variables == []
+    rest = list(findings)
+    assert streaming.get_results() == expected.get_results()
+    assert len(rest) + 1 == sum(len(items) for items in expected.get_results().values())
+
+    # Without collecting, nothing is kept on the analyzer
+    headless = ASTAnalyzer(SAMPLE_CODE, cache=None)
+    by_kind = {}
+    for finding in headless.iter_results(collect=False):
+        by_kind.setdefault(finding.kind, []).append(finding)
+    assert by_kind == {kind: items for kind, items in expected.get_results().items() if items}
+    assert headless.variables == [] and headless.functions == []
+
+    # Incremental analyzers stream statement by statement and keep their segments
+    incremental = ASTAnalyzer(SAMPLE_CODE, cache=None, incremental=True)
+    assert sorted(f.line for f in incremental.iter_results()) == \
+        sorted(f.line for items in expected.get_results().values() for f in items)
+    assert incremental.get_results() == expected.get_results()
+    assert list(ASTAnalyzer("def broken(:", cache=None).iter_results()) == []
+    print("✓ Findings are streamed while the tree is traversed")
+
+def test_project_analyzer():
+    """Every project file is analyzed in the pool and merged into a summary"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        files = []
+        for name, code in [("a.py", SAMPLE_CODE), ("b.py", "def helper(x):\n    return x\n"), ("broken.py", "def broken(:\n")]:
+            path = os.path.join(temp_dir, name)
+            with open(path, 'w') as f:
+                f.write(code)
+            files.append(path)
+
+        cache = AnalysisCache()
+        project = ProjectAnalyzer(files, max_workers=2, cache=cache)
+        project.start()
+        streamed = list(project.iter_results())
+        assert sorted(os.path.basename(path) for path, _, _ in streamed) == ["a.py", "b.py", "broken.py"]
+
+        summary = project.get_summary()
+        assert summary['files_analyzed'] == 2
+        assert list(summary['files_failed']) == [files[2]]
+        expected = ASTAnalyzer(SAMPLE_CODE, cache=None)
+        expected.analyze()
+        assert project.results[files[0]] == expected.get_results()
+        assert summary['totals']['functions'] == len(expected.functions) + 1
+
+        # A second run is served from the cache without starting a pool
+        again = ProjectAnalyzer(files[:2], cache=cache)
+        assert again.analyze()['files_analyzed'] == 2
+        assert again.submitted == 0 and again.executor is None
+
+        # A single file is a project too, and start() does not wait for the files
+        single = ProjectAnalyzer(files[1:2], cache=None)
+        single.start()
+        while not single.is_finished():
+            single.poll()
+            time.sleep(0.01)
+        assert single.submitted == 1
+        assert single.get_summary()['totals']['functions'] == 1
+    print("✓ Project files are analyzed in parallel and merged")
+
+def test_symbol_index():
+    """Symbols are found by exact name and prefix and follow file updates"""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        store = SymbolIndexDatabase(os.path.join(temp_dir, "symbol_index.db"))
+        index = SymbolIndex(store)
+
+        analyzer = ASTAnalyzer(SAMPLE_CODE, cache=None)
+        analyzer.analyze()
+        assert index.update_file("calc.py", analyzer.get_results(), "v1")
+        assert not index.update_file("calc.py", analyzer.get_results(), "v1")
+
+        helper = ASTAnalyzer("def fib_helper(n):\n    return n\n", cache=None)
+        helper.analyze()
+        index.update_file("helper.py", helper.get_results(), "v1")
+
+        assert [(l.kind, l.file_path, l.line) for l in index.lookup("fibonacci")] == [("function", "calc.py", 2)]
+        assert [l.name for l in index.search("fib")] == ["fib_helper", "fibonacci"]
+        assert index.lookup("Calculator")[0].kind == "class"
+
+        # Editing a file replaces only its own symbols
+        edited = ASTAnalyzer("def fibonacci_fast(n):\n    return n\n", cache=None)
+        edited.analyze()
+        index.update_file("calc.py", edited.get_results(), "v2")
+        assert index.lookup("fibonacci") == []
+        assert [l.name for l in index.search("fib")] == ["fib_helper", "fibonacci_fast"]
+
+        # The index survives a restart through the store
+        reloaded = SymbolIndex(SymbolIndexDatabase(store.db_path))
+        reloaded.load()
+        assert [l.name for l in reloaded.search("fib")] == ["fib_helper", "fibonacci_fast"]
+        assert reloaded.is_current("calc.py", "v2")
+    print("✓ Symbol index answers exact and prefix queries")
+
+if __name__ == "__main__":
+    test_single_pass_matches_extractors()
+    test_single_pass_results()
+    test_analysis_cache_shared_between_components()
+    test_analysis_cache_eviction()
+    test_persistent_analysis_cache()
+    test_persistent_cache_eviction()
+    test_incremental_update()
+    test_bounded_value_rendering()
+    test_lazy_values()
+    test_result_records()
+    test_iter_results()
+    test_project_analyzer()
+    test_symbol_index()
+    print("All analyzer engine tests completed!")
@@ -0,0 +1,905 @@
+"""
+Test script to verify the debugging engine's traced execution
+"""
+
+import ast
+import sys
+import os
+import time
+import tempfile
+import shutil
+from array import array
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from analyzer.debug_engine import DebuggingEngine
+from analyzer.tracer import ExecutionTracer
+from analyzer.trace_worker import TraceWorker
+from analyzer.checkpoints import CheckpointStore
+from analyzer.variable_history import VariableHistory, DeltaRecorder
+from analyzer.step_store import StepStore
+from analyzer.trace_file import save_trace, open_trace, remove_trace
+from analyzer.line_index import LineIndex
+from analyzer.statement_steps import build_statement_steps
+from analyzer.sampler import ExecutionSampler
+from analyzer.native_runner import NativeRunner, BuildError, unsupported_platform
+
+TRACED_CODE = """
+def fibonacci(n):
+    if n <= 1:
+        return n
+    return fibonacci(n-1) + fibonacci(n-2)
+
+x = 4
+result = fibonacci(x)
+print(result)
+"""
+
+def make_engine(source_code, **kwargs):
+    """Create a debugging engine with its execution steps initialized"""
+    engine = DebuggingEngine(source_code, "traced.py", cache=None, **kwargs)
+    assert engine.parse()
+    engine.initialize_execution_steps()
+    return engine
+
+def test_tracer_records_line_events():
+    """The tracer records each executed line with its call depth and locals"""
+    trace = ExecutionTracer("traced.py").run(TRACED_CODE)
+    assert trace.output == "3\n"
+    assert trace.error is None
+    assert list(trace.lines[:4]) == [2, 7, 8, 3]
+    assert [trace.step(i)['function'] for i in range(4)] == ['<module>', '<module>', '<module>', 'fibonacci']
+    assert max(trace.depths) == 5
+    assert trace.variables.state_at(3) == {'n': '4'}
+    print("✓ Tracer records line events, depth and locals")
+
+def test_tracer_step_limit():
+    """Runaway programs stop at the step limit instead of hanging"""
+    trace = ExecutionTracer("loop.py", max_steps=1000).run("while True:\n    pass\n")
+    assert trace.truncated
+    assert len(trace) == 1000
+
+    # A spill hook streams steps out so the tracer's columns stay short
+    import analyzer.tracer as tracer_module
+    code = "total = 0\nfor i in range(500):\n    total += i\nraise ValueError(total)\n"
+    expected = ExecutionTracer("spill.py").run(code)
+    spilled = []
+    def spill(trace):
+        spilled.extend(trace.lines[:-1])
+        trace.drop_steps(len(trace.lines) - 1)
+        return trace.first_step
+    saved, tracer_module.SPILL_STEPS = tracer_module.SPILL_STEPS, 100
+    try:
+        tracer = ExecutionTracer("spill.py")
+        tracer.spill = spill
+        trace = tracer.run(code)
+    finally:
+        tracer_module.SPILL_STEPS = saved
+    assert len(trace) == len(expected) and len(trace.lines) < 110
+    assert spilled + list(trace.lines) == list(expected.lines)
+    assert trace.error == expected.error
+    assert trace.variables.state_at(900) == expected.variables.state_at(900)
+    print("✓ Tracer stops at the step limit")
+
+def test_traced_execution_steps():
+    """Stepping replays the recorded run: line states, variables and call stack"""
+    engine = make_engine(TRACED_CODE)
+    assert engine.output == "3\n"
+    assert engine.execution_steps[3]['description'] == "Executing If at line 3 in fibonacci"
+
+    while engine.execution_steps[engine.current_step]['depth'] < 3:
+        assert engine.step_forward()
+    assert [frame['function'] for frame in engine.call_stack] == ['<module>', 'fibonacci', 'fibonacci']
+    assert engine.get_current_variables() == {'n': '3'}
+
+    assert engine.run_to_end()
+    assert not engine.has_error()
+    assert engine.get_line_state(9)['status'] == 'success'
+    assert engine.get_line_state(1)['status'] == 'pending'
+    assert engine.call_stack == [{'function': '<module>', 'line': 9}]
+    print("✓ Traced steps replay real execution")
+
+def test_traced_runtime_error():
+    """An uncaught exception marks the raising line as an error"""
+    engine = make_engine("values = [1, 0]\ntry:\n    1 / values[1]\nexcept ZeroDivisionError:\n    pass\nresult = 10 / values[1]\n")
+    assert engine.run_to_end()
+    error = engine.get_error_info()
+    assert error['has_error']
+    assert error['line'] == 6
+    assert error['message'] == "ZeroDivisionError: division by zero"
+    assert engine.get_line_state(3)['status'] == 'success'
+    assert engine.get_line_state(6)['status'] == 'error'
+    print("✓ Runtime errors come from the traced program")
+
+def test_trace_large_loop():
+    """A loop of a million iterations traces in seconds"""
+    start = time.perf_counter()
+    engine = make_engine("total = 0\nfor i in range(1000000):\n    total += i\n")
+    elapsed = time.perf_counter() - start
+    assert len(engine.execution_steps) == 2000002
+    assert elapsed < 30
+    print(f"✓ Traced {len(engine.execution_steps)} steps in {elapsed:.2f}s")
+
+def test_trace_worker_streams_trace():
+    """The worker process sends back the same trace as an in-process run"""
+    worker = TraceWorker(TRACED_CODE, "traced.py")
+    worker.start()
+    trace = worker.wait()
+    local = ExecutionTracer("traced.py").run(TRACED_CODE)
+    assert list(trace.lines) == list(local.lines)
+    assert list(trace.depths) == list(local.depths)
+    assert [trace.step(i)['function'] for i in range(len(trace))] == [local.step(i)['function'] for i in range(len(local))]
+    assert [trace.variables.state_at(i) for i in range(len(trace))] == \
+        [local.variables.state_at(i) for i in range(len(local))]
+    assert trace.output == "3\n"
+    assert trace.error is None
+    print("✓ Worker streams the trace over its pipe")
+
+def test_trace_worker_limits():
+    """Timeouts, memory limits and crashes end the run with an error instead of hanging"""
+    worker = TraceWorker("count = 0\nwhile True:\n    count += 1\n", "loop.py", timeout=1.0)
+    worker.start()
+    assert not worker.poll()
+    trace = worker.wait()
+    assert worker.timed_out
+    assert len(trace) > 1
+    assert trace.error['message'].startswith("TimeoutError")
+    assert trace.error['line'] in (2, 3)
+
+    if sys.platform != "win32":  # Memory limits need the resource module
+        worker = TraceWorker("data = bytearray(4 * 1024 ** 3)\n", "memory.py", memory_limit_mb=256)
+        worker.start()
+        trace = worker.wait()
+        assert trace.error['message'].startswith("MemoryError")
+
+    worker = TraceWorker("import os\nos._exit(3)\n", "crash.py")
+    worker.start()
+    trace = worker.wait()
+    assert trace.error['message'] == "Worker exited unexpectedly (exit code 3)"
+
+    # A worker nobody polls still ends itself at its deadline
+    worker = TraceWorker("while True:\n    pass\n", "orphan.py", timeout=1.0)
+    worker.start()
+    deadline = time.monotonic() + 10
+    while worker.process.poll() is None and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert worker.process.poll() is not None
+
+    # Starting a new run stops the one still in progress
+    engine = DebuggingEngine("while True:\n    pass\n", "loop.py", cache=None)
+    assert engine.parse()
+    engine.start_tracing()
+    first = engine.trace_worker
+    engine.start_tracing()
+    assert first.process.poll() is not None and first.cancelled
+    engine.cancel_tracing()
+    print("✓ Worker enforces timeouts and memory limits")
+
+def test_engine_traces_in_worker():
+    """The engine can trace without blocking and resets without rerunning the program"""
+    engine = DebuggingEngine("print('hi')\nx = 1\n", "worker.py", cache=None)
+    assert engine.parse()
+    engine.start_tracing()
+    while not engine.poll_tracing():
+        time.sleep(0.01)
+    engine.initialize_execution_steps()
+    assert engine.output == "hi\n"
+    assert [step['line'] for step in engine.execution_steps] == [1, 2]
+
+    trace = engine.trace
+    engine.run_to_end()
+    engine.reset_execution()
+    engine.initialize_execution_steps()
+    assert engine.trace is trace
+    assert engine.current_step == 0
+    print("✓ Engine traces in a worker process")
+
+def test_worker_uses_script_directory():
+    """The traced program imports from and runs in its own directory, not codeflow's"""
+    project = os.path.join(os.path.dirname(os.path.abspath(__file__)), "demo_project")
+    with open(os.path.join(project, "main.py")) as f:
+        engine = make_engine(f.read(), script_dir=project)
+    assert "Square of 5 is 25" in engine.output
+    assert engine.trace.error['message'].startswith("NameError")  # The demo's deliberate error
+
+    source = "import os, sys\nprint(os.getcwd())\nprint(sys.path[0])\nimport analyzer\n"
+    directory = tempfile.mkdtemp()
+    engine = make_engine(source, script_dir=directory)
+    assert engine.output.split("\n")[:2] == [os.path.realpath(directory), directory]
+    assert engine.trace.error['message'].startswith("ModuleNotFoundError")
+    shutil.rmtree(directory)
+    print("✓ Worker runs the program from its own directory")
+
+def test_step_back_restores_state():
+    """Stepping back rebuilds the line states, flow, variables and call stack of the earlier step"""
+    engine = make_engine(TRACED_CODE, isolated=False)
+    engine.configure_checkpoints(interval=4)
+    states = []
+    while True:
+        states.append((engine.current_step, dict(engine.line_states), list(engine.execution_flow),
+                       engine.get_current_variables(), list(engine.call_stack)))
+        if not engine.step_forward():
+            break
+
+    for step, line_states, flow, variables, call_stack in reversed(states[:-1]):
+        assert engine.step_back()
+        assert engine.current_step == step
+        assert engine.line_states == line_states
+        assert engine.execution_flow == flow
+        assert engine.get_current_variables() == variables
+        assert engine.call_stack == call_stack
+    assert not engine.step_back()
+
+    # Jumping back and forth lands on the same states
+    assert engine.go_to_step(len(states) - 1)
+    assert engine.go_to_step(5)
+    assert engine.line_states == states[5][1]
+    assert engine.execution_flow == states[5][2]
+    print("✓ Step back restores earlier states")
+
+def test_checkpoint_memory_budget():
+    """Snapshots are thinned to stay within the memory budget"""
+    store = CheckpointStore(interval=10, memory_budget=1000)
+    for step in range(1000):
+        if store.wants(step):
+            store.add(step, {'step': step}, 100)
+    assert store.memory_used <= 1000
+    assert store.interval > 10
+    assert store.nearest(995) == (960, {'step': 960})
+    assert store.nearest(0) == (0, {'step': 0})
+
+    engine = make_engine("total = 0\nfor i in range(200000):\n    total += i\n", isolated=False)
+    engine.configure_checkpoints(interval=100, memory_budget=16 * 1024)
+    assert engine.run_to_end()
+    assert engine.checkpoints.memory_used <= 16 * 1024
+    start = time.perf_counter()
+    assert engine.go_to_step(12345)
+    assert engine.step_back()
+    assert time.perf_counter() - start < 1.0
+    assert engine.current_step == 12344
+    assert engine.execution_steps[engine.current_step]['line'] == 3
+    print("✓ Checkpoints stay within their memory budget")
+
+def test_variable_deltas():
+    """Variable states are stored as deltas and rebuilt exactly at any step"""
+    code = "items = []\nfor i in range(50):\n    items.append(i)\n    label = 'x' * (i % 3)\ndel label\ndone = True\n"
+    trace = ExecutionTracer("deltas.py", locals_limit=60).run(code)
+    assert len(trace.variables) < len(trace)
+
+    # Rebuilding in any order matches a state built from full snapshots
+    expected = {}
+    namespace = {}
+    for step in range(len(trace)):
+        state = trace.variables.state_at(step)
+        if step >= 60:
+            assert state is None
+            continue
+        entry = trace.variables.entries.get(step)
+        if entry is not None:
+            base_step, changed, removed = entry
+            namespace = dict(expected[base_step]) if base_step >= 0 else {}
+            namespace.update(changed)
+            for name in removed:
+                namespace.pop(name)
+        expected[step] = namespace
+    fresh = VariableHistory(60)
+    for step in trace.variables.steps:
+        fresh.add(step, *trace.variables.entries[step])
+    for step in reversed(range(60)):
+        assert fresh.state_at(step) == expected[step]
+        for name in ('items', 'label', 'done'):
+            try:
+                assert fresh.value_at(step, name) == expected[step][name]
+            except KeyError:
+                assert name not in expected[step]
+
+    # States are read-only views
+    state = trace.variables.state_at(59)
+    try:
+        state['items'] = []
+        assert False, "TypeError expected"
+    except TypeError:
+        pass
+    print("✓ Variable deltas rebuild every step")
+
+def test_delta_recorder():
+    """Unchanged steps add no entry and returning frames start over with a full snapshot"""
+    history = VariableHistory()
+    recorder = DeltaRecorder(history)
+    recorder.record(0, 'module', {'a': '1'})
+    recorder.record(1, 'module', {'a': '1'})
+    recorder.record(2, 'module', {'a': '1', 'b': '2'})
+    recorder.record(3, 'call', {'n': '5'})
+    recorder.record(4, 'module', {'a': '1', 'b': '2'})
+    recorder.forget('call')
+    recorder.record(5, 'call', {'n': '6'})
+    assert list(history.steps) == [0, 2, 3, 4, 5]
+    assert history.entries[2] == (0, {'b': '2'}, ())
+    assert history.entries[4] == (2, {}, ())
+    assert history.entries[5] == (-1, {'n': '6'}, ())
+    assert history.state_at(1) == {'a': '1'}
+    assert history.state_at(4) == {'a': '1', 'b': '2'}
+    print("✓ Delta recorder stores only changes")
+
+def test_step_store_view():
+    """Columnar steps read back as the same dicts the list representation held"""
+    store = StepStore()
+    store.append(3, 'Assign', 'a.py')
+    store.append(4, 'If', 'a.py', depth=2)
+    store.function_names.append('helper')
+    store.append(5, 'Return', 'b.py', depth=2, function=1)
+    assert len(store) == 3
+    assert store[0] == {'line': 3, 'type': 'Assign', 'description': "Executing Assign at line 3",
+                        'filename': 'a.py', 'depth': 0, 'function': '<module>'}
+    assert store[-1]['description'] == "Executing Return at line 5 in helper"
+    assert [step['line'] for step in store[1:]] == [4, 5]
+    assert store[:2][-1]['type'] == 'If'
+    assert list(store.types) == [0, 1, 2]
+    assert list(store.files) == [0, 0, 1]
+
+    engine = make_engine(TRACED_CODE, isolated=False)
+    steps = engine.execution_steps
+    assert isinstance(steps, StepStore)
+    assert len(engine.get_execution_timeline()) == 1
+    assert steps[len(steps) - 1]['description'] == "Executing Expr at line 9"
+    assert set(steps.type_table.names) <= {"FunctionDef", "Assign", "If", "Return", "Expr", "Statement", "Exception"}
+    print("✓ Step store keeps the list-of-dicts view")
+
+def test_trace_file_round_trip():
+    """A trace saved to disk maps back with the same steps, names and variables"""
+    trace = ExecutionTracer("traced.py").run(TRACED_CODE)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "run.trace")
+        save_trace(trace, path)
+        mapped = open_trace(path)
+        assert isinstance(mapped.lines, memoryview)
+        assert len(mapped) == len(trace)
+        assert [mapped.step(i) for i in range(len(mapped))] == [trace.step(i) for i in range(len(trace))]
+        assert mapped.lines[-1] == trace.lines[-1]
+        assert mapped.variables.state_at(3) == {'n': '4'}
+        assert mapped.output == "3\n"
+        mapped.close()
+
+        with open(path, 'r+b') as f:
+            f.write(b"XXXX")
+        try:
+            open_trace(path)
+            assert False, "ValueError expected"
+        except ValueError:
+            pass
+        remove_trace(path)
+        assert not os.path.exists(path)
+    print("✓ Trace files map back with random access")
+
+def test_engine_replays_trace_file():
+    """The engine records to a trace file and steps through it without loading it"""
+    code = "total = 0\nfor i in range(20000):\n    total += i\nprint(total)\nraise ValueError('done')\n"
+    with tempfile.TemporaryDirectory() as temp_dir:
+        engine = DebuggingEngine(code, "big.py", cache=None)
+        engine.trace_path = os.path.join(temp_dir, "big.trace")
+        assert engine.parse()
+        engine.initialize_execution_steps()
+        assert isinstance(engine.execution_steps.lines, memoryview)
+        assert len(engine.execution_steps) == 40005
+        assert engine.output == "199990000\n"
+
+        assert engine.line_index.mapping is not None  # Indexed on disk, not in memory
+        assert engine.go_to_step(30000)
+        timeline = engine.get_execution_timeline()
+        assert len(timeline) == 30001
+        assert timeline[-1]['line'] in (2, 3)
+        assert engine.get_line_state(3)['status'] == 'success'
+        assert engine.get_line_state(4)['status'] == 'pending'
+
+        assert engine.run_to_end()
+        assert engine.get_error_info()['message'] == "ValueError: done"
+        assert engine.execution_steps[-1]['description'] == "ValueError: done at line 5"
+        engine.discard_trace()
+        assert not os.path.exists(engine.trace_path)
+
+        # Traces written to a file may run far past the in-memory step limit
+        assert engine.step_limit() == engine.trace_file_max_steps > engine.trace_max_steps
+        engine = DebuggingEngine(code, "big.py", cache=None)
+        engine.trace_max_steps = 1000
+        assert engine.parse()
+        engine.initialize_execution_steps()
+        assert engine.trace.truncated and len(engine.execution_steps) == 1000
+    print("✓ Engine replays traces from disk")
+
+def test_line_index():
+    """Postings lists answer hit counts and next/previous executions of a line"""
+    index = LineIndex.build([1, 2, 3, 2, 3, 2, 4])
+    index.add_steps([2, 5])
+    assert index.hits(2) == 4
+    assert index.hits(2, upto=3) == 2
+    assert index.hits(9) == 0
+    assert index.next_execution(2, after=3) == 5
+    assert index.next_execution(2, after=7) is None
+    assert index.previous_execution(2, before=5) == 3
+    assert index.previous_execution(1, before=0) is None
+    assert index.coverage(upto=2) == {1: 1, 2: 1, 3: 1}
+    assert index.coverage()[2] == 4
+
+    # Large runs are indexed into a postings file mapped from disk
+    import analyzer.line_index as line_index_module
+    lines = array('I', [(step * 7) % 5 + 1 for step in range(1000)])
+    saved, line_index_module.BUILD_CHUNK = line_index_module.BUILD_CHUNK, 64
+    try:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            mapped = LineIndex.build_file(lines, os.path.join(temp_dir, "steps.index"))
+            expected = LineIndex.build(lines)
+            assert mapped.mapping is not None and mapped.step_count == 1000
+            assert {line: list(steps) for line, steps in mapped.postings.items()} == \
+                {line: list(steps) for line, steps in expected.postings.items()}
+            assert mapped.hits(3, upto=500) == expected.hits(3, upto=500)
+            assert mapped.next_execution(4, after=10) == expected.next_execution(4, after=10)
+            mapped.close()
+            assert mapped.mapping is None
+    finally:
+        line_index_module.BUILD_CHUNK = saved
+    print("✓ Line index answers hit and navigation queries")
+
+def test_engine_line_navigation():
+    """The engine counts hits up to the current step and jumps between executions of a line"""
+    engine = make_engine("total = 0\nfor i in range(5):\n    total += i\nprint(total)\n")
+    assert engine.get_line_hits(3) == 0
+    step = engine.next_execution(3)
+    assert engine.go_to_step(step)
+    assert engine.get_line_hits(3) == 1
+    assert engine.go_to_step(engine.next_execution(3))
+    assert engine.get_line_hits(3) == 2
+    assert engine.get_current_variables()['i'] == '1'
+    assert engine.go_to_step(engine.previous_execution(3))
+    assert engine.get_line_hits(3) == 1
+    assert engine.run_to_end()
+    assert engine.get_coverage() == {1: 1, 2: 6, 3: 5, 4: 1}
+    assert engine.next_execution(3) is None
+
+    # Steps past the recorded variables show none rather than stale ones
+    engine.trace.variables.limit = 6
+    assert engine.go_to_step(5) and engine.get_current_variables()['i'] == '1'
+    assert engine.get_variables_note() is None
+    assert engine.go_to_step(8)
+    assert engine.get_current_variables() == {}
+    assert engine.get_variables_note() == "Variables not recorded beyond step 6"
+    assert engine.go_to_step(2) and engine.run_to_end()
+    assert engine.get_current_variables() == {}
+
+    # Long runs keep only the most recent part of the execution flow
+    import analyzer.debug_engine as debug_engine_module
+    saved, debug_engine_module.EXECUTION_FLOW_WINDOW = debug_engine_module.EXECUTION_FLOW_WINDOW, 4
+    try:
+        engine = make_engine("total = 0\nfor i in range(20):\n    total += i\nprint(total)\n")
+        engine.configure_checkpoints(interval=5)
+        assert engine.run_to_end()
+        assert len(engine.get_execution_flow()) <= 8
+        assert engine.get_execution_flow_length() == 43
+        assert engine.get_execution_flow()[-1] == 4
+        assert engine.go_to_step(3)
+        assert engine.get_execution_flow_length() == 4
+    finally:
+        debug_engine_module.EXECUTION_FLOW_WINDOW = saved
+    print("✓ Engine navigates between executions of a line")
+
+def test_run_to_end_matches_stepping():
+    """Running in bulk leaves the same state as stepping one step at a time"""
+    stepped = make_engine(TRACED_CODE, isolated=False)
+    stepped.configure_checkpoints(interval=4)
+    while stepped.step_forward():
+        pass
+    ran = make_engine(TRACED_CODE, isolated=False)
+    ran.configure_checkpoints(interval=4)
+    assert ran.run_to_end()
+    assert ran.stopped_at_breakpoint is None
+    assert ran.current_step == stepped.current_step
+    assert ran.line_states == stepped.line_states
+    assert ran.execution_flow == stepped.execution_flow
+    assert ran.get_current_variables() == stepped.get_current_variables()
+    assert ran.call_stack == stepped.call_stack
+    assert len(ran.checkpoints) == len(stepped.checkpoints)
+
+    # Stepping back from a bulk run replays from its checkpoints
+    assert ran.go_to_step(7)
+    assert stepped.go_to_step(7)
+    assert ran.line_states == stepped.line_states
+    assert ran.call_stack == stepped.call_stack
+    print("✓ Run to end matches single stepping")
+
+def test_breakpoints():
+    """Runs stop at breakpoints, and conditional breakpoints only when their condition holds"""
+    code = "total = 0\nfor i in range(10):\n    total += i\nprint(total)\n"
+    engine = make_engine(code, isolated=False)
+    engine.set_breakpoint(3)
+    assert engine.run_to_end()
+    assert engine.stopped_at_breakpoint == 3
+    assert engine.execution_steps[engine.current_step]['line'] == 3
+    assert engine.get_current_variables()['i'] == '0'
+    assert engine.run_to_end()
+    assert engine.get_current_variables()['i'] == '1'
+
+    engine.reset_execution()
+    engine.initialize_execution_steps()
+    engine.set_breakpoint(3, "i == 3 and total > 2")
+    assert engine.get_breakpoint_condition(3) == "i == 3 and total > 2"
+    assert engine.run_to_end()
+    assert engine.stopped_at_breakpoint == 3
+    assert engine.get_current_variables()['i'] == '3'
+    assert engine.run_to_end()
+    assert engine.stopped_at_breakpoint is None
+    assert engine.current_step == len(engine.execution_steps) - 1
+
+    try:
+        engine.set_breakpoint(3, "i ==")
+        assert False, "invalid condition accepted"
+    except SyntaxError:
+        pass
+    engine.remove_breakpoint(3)
+    assert engine.get_breakpoint_condition(3) is None
+
+    # Conditions that fail to evaluate stop the run and report why
+    engine.reset_execution()
+    engine.initialize_execution_steps()
+    engine.set_breakpoint(3, "missing > 0")
+    assert engine.run_to_end()
+    assert engine.stopped_at_breakpoint == 3
+    assert "NameError" in engine.breakpoint_error
+
+    # Conditions on values recorded in shortened form are reported, not treated as false
+    engine = make_engine("data = list(range(20))\ntext = 'x' * 100\nnote = 'Loading...'\ndone = True\n")
+    for condition in ("len(data) == 20", "data[-1] == 19", "len(text) == 100"):
+        engine.reset_execution()
+        engine.initialize_execution_steps()
+        engine.set_breakpoint(4, condition)
+        assert engine.run_to_end()
+        assert engine.stopped_at_breakpoint == 4
+        assert "shortened" in engine.breakpoint_error, condition
+    engine.reset_execution()
+    engine.initialize_execution_steps()
+    engine.set_breakpoint(4, "note == 'Loading...'")
+    assert engine.run_to_end()
+    assert engine.stopped_at_breakpoint == 4
+    assert engine.breakpoint_error is None
+    print("✓ Breakpoints stop runs")
+
+def test_breakpoint_run_speed():
+    """Free-running between breakpoints does not dispatch each step"""
+    code = "total = 0\nfor i in range(300000):\n    total += i\nprint(total)\n"
+    engine = make_engine(code, isolated=False)
+    engine.set_breakpoint(4)
+    engine.set_breakpoint(3, "i == 49990")
+    start = time.perf_counter()
+    assert engine.run_to_end()
+    assert engine.stopped_at_breakpoint == 3
+    assert engine.run_to_end()
+    assert engine.stopped_at_breakpoint == 4
+    assert time.perf_counter() - start < 2.0
+    assert engine.get_line_hits(3) == 300000
+    print("✓ Runs between breakpoints stay fast")
+
+def test_statement_steps():
+    """Simulated runs step through statements in execution order with their call depth"""
+    engine = make_engine(TRACED_CODE, execution_mode="simulate")
+    assert [(step['line'], step['depth'], step['function']) for step in engine.execution_steps] == [
+        (2, 1, '<module>'), (7, 1, '<module>'), (8, 1, '<module>'),
+        (3, 2, 'fibonacci'), (5, 2, 'fibonacci'), (9, 1, '<module>')]
+    assert engine.execution_steps[3]['description'] == "Executing If at line 3 in fibonacci"
+    engine.go_to_step(4)
+    assert [frame['function'] for frame in engine.call_stack] == ['<module>', 'fibonacci']
+
+    code = (
+        "class Counter:\n"
+        "    def __init__(self):\n"
+        "        self.count = 0\n"
+        "    def add(self, n):\n"
+        "        for i in range(n):\n"
+        "            if i > 5:\n"
+        "                break\n"
+        "            self.count += i\n"
+        "        return self.count\n"
+        "c = Counter()\n"
+        "try:\n"
+        "    total = c.add(3)\n"
+        "except ValueError:\n"
+        "    total = 0\n"
+        "print(total)\n"
+    )
+    steps = build_statement_steps(ast.parse(code))
+    assert [line for line, node_type, depth, function in steps] == [1, 2, 4, 10, 3, 11, 12, 5, 6, 8, 9, 15]
+    assert steps[4] == (3, 'Assign', 2, '__init__')
+    assert steps[1] == (2, 'FunctionDef', 2, 'Counter')
+
+    # One step per statement instead of one per AST node
+    source = "\n".join(f"value_{i} = compute({i}, [x + 1 for x in range({i})])" for i in range(500))
+    tree = ast.parse(source)
+    assert len(build_statement_steps(tree)) == 500
+    assert sum(1 for node in ast.walk(tree) if hasattr(node, 'lineno')) > 10 * 500
+
+    # Simulated steps do not run the code, so they never report an error
+    engine = make_engine(TRACED_CODE, execution_mode="simulate")
+    while engine.step_forward():
+        pass
+    assert not engine.has_error()
+    print("✓ Statement steps follow execution order")
+
+WATCHED_CODE = """
+class Calculator:
+    def __init__(self):
+        self.result = 0
+
+    def add(self, n):
+        self.result += n
+        return self
+
+calc = Calculator()
+for n in [2, 0, 3]:
+    calc.add(n)
+print(calc.result)
+"""
+
+def test_watchpoints():
+    """Runs stop where a watched attribute changes, in the worker and in process"""
+    for isolated in (True, False):
+        engine = DebuggingEngine(WATCHED_CODE, "watched.py", cache=None, isolated=isolated)
+        engine.add_watchpoint("self.result")
+        assert engine.parse()
+        engine.initialize_execution_steps()
+
+        changes = []
+        while engine.run_to_end() and engine.stopped_at_watchpoint:
+            changes.append([change[1:] for change in engine.stopped_at_watchpoint])
+        # Adding 0 leaves the value alone, so it is not a change
+        assert changes == [[['<undefined>', '0']], [['0', '2']], [['2', '5']]]
+        assert engine.current_step == len(engine.execution_steps) - 1
+
+    engine.remove_watchpoint("self.result")
+    assert engine.get_watch_hit_steps() == []
+    for expression in ("calc.add(1)", "x +", "items[0]"):
+        try:
+            engine.add_watchpoint(expression)
+            assert False, f"{expression} accepted"
+        except ValueError:
+            pass
+
+    # Lists changed in place are caught by their fingerprint
+    trace = ExecutionTracer("lists.py", watch=["items"]).run(
+        "items = []\nfor i in range(3):\n    items.append(i)\nitems[0] = 9\nitems.sort()\n")
+    assert [change[2] for changes in trace.watch_hits.values() for change in changes] == \
+        ['[]', '[0]', '[0, 1]', '[0, 1, 2]', '[9, 1, 2]', '[1, 2, 9]']
+
+    # Watched roots are not kept alive, so finalizers still run
+    trace = ExecutionTracer("nodes.py", watch=["node.x"]).run(
+        "class Node:\n"
+        "    deleted = 0\n"
+        "    def __del__(self):\n"
+        "        Node.deleted += 1\n"
+        "for i in range(200):\n"
+        "    node = Node()\n"
+        "    node.x = i\n"
+        "print(Node.deleted)\n")
+    assert trace.output.strip() == '199', trace.output
+    assert sum(len(changes) for changes in trace.watch_hits.values()) == 200
+    print("✓ Watchpoints stop on changes")
+
+SAMPLED_CODE = """
+def hot(n):
+    total = 0
+    for i in range(n):
+        total += i * i
+    return total
+
+def cold():
+    return 1
+
+for _ in range(10):
+    hot(60000)
+    cold()
+print("done")
+"""
+
+def test_sampling():
+    """Sampling records where the program spends its time without tracing every line"""
+    trace = ExecutionSampler("sampled.py", interval_ms=1).run(SAMPLED_CODE)
+    assert trace.output == "done\n"
+    assert trace.error is None
+    assert len(trace) > 10
+    lines = list(trace.lines)
+    assert max(set(lines), key=lines.count) in (4, 5)
+    assert all(depth == 2 for line, depth in zip(lines, trace.depths) if line in (4, 5))
+
+    trace = ExecutionSampler("sampled.py", every_events=5).run(SAMPLED_CODE)
+    assert 0 < len(trace) <= 10
+    assert set(trace.function_names) <= {'<module>', 'hot', 'cold'}
+
+    # The engine replays samples like a trace, with per-line counts and hot paths
+    engine = DebuggingEngine(SAMPLED_CODE, "sampled.py", cache=None, execution_mode="sample")
+    engine.sample_interval_ms = 1
+    assert engine.parse()
+    engine.initialize_execution_steps()
+    assert engine.output == "done\n"
+    assert engine.trace.variables.limit == 0
+    # Hot paths describe the whole run even before stepping
+    assert engine.current_step == 0
+    assert sum(engine.get_total_coverage().values()) == len(engine.execution_steps)
+    transitions = engine.get_line_transitions()
+    assert engine.run_to_end()
+    assert engine.get_line_transitions() == transitions
+    coverage = engine.get_coverage()
+    assert sum(coverage.values()) == len(engine.execution_steps)
+    assert max(coverage, key=coverage.get) in (4, 5)
+    transitions = engine.get_line_transitions()
+    assert sum(transitions.values()) == len(engine.execution_flow) - 1
+    print("✓ Sampling finds the hot lines")
+
+CPP_CODE = """#include <iostream>
+int square(int x) {
+    int y = x * x;
+    return y;
+}
+int main() {
+    int total = 0;
+    for (int i = 0; i < 2; i++) {
+        total += square(i);
+    }
+    std::cout << "total " << total << std::endl;
+    return 0;
+}
+"""
+
+def test_native_cpp_run():
+    """C++ programs are compiled once, run, and traced line by line in execution order"""
+    # A missing compiler is reported, and the build is not retried when the steps are set up
+    engine = DebuggingEngine(CPP_CODE, "main.cpp", "cpp")
+    engine.set_compiler_path(os.path.join(tempfile.mkdtemp(), "missing-g++"))
+    engine.start_tracing()
+    while not engine.poll_tracing():
+        time.sleep(0.01)
+    engine.make_native_runner = None  # Any further build attempt would fail loudly
+    engine.initialize_execution_steps()
+    assert engine.has_error() and "missing-g++" in engine.get_error_info()['message']
+    assert engine.simulated_steps
+
+    # Native tracing is refused with a clear error where it cannot work
+    assert unsupported_platform("cpp", "linux") is None
+    assert unsupported_platform("java", "darwin") is None
+    assert unsupported_platform("cpp", "win32").startswith("Unsupported platform")
+    assert unsupported_platform("java", "win32").startswith("Unsupported platform")
+
+    if shutil.which("g++") is None:
+        print("- Skipped native C++ run: g++ not found")
+        return
+    cache_dir = tempfile.mkdtemp()
+    runner = NativeRunner(CPP_CODE, "main.cpp", "cpp", "g++", cache_dir)
+    trace = runner.run()
+    assert not runner.cache_hit
+    assert trace.output == "total 1\n"
+    assert trace.error is None
+    steps = [(trace.lines[i], trace.depths[i]) for i in range(len(trace))]
+    call = [(9, 1), (2, 2), (3, 2), (4, 2), (5, 2), (9, 1), (8, 1)]
+    assert steps == [(6, 1), (7, 1), (8, 1)] + call * 2 + [(11, 1), (12, 1), (13, 1)]
+    assert trace.function_names[trace.functions[4]] == "square(int)"
+
+    # An unchanged source reuses the build
+    runner = NativeRunner(CPP_CODE, "main.cpp", "cpp", "g++", cache_dir)
+    assert len(runner.run()) == len(trace)
+    assert runner.cache_hit
+
+    try:
+        NativeRunner(CPP_CODE.replace("int total = 0;", "int total = ;"), "main.cpp", "cpp", "g++", cache_dir).run()
+        assert False, "Expected a build error"
+    except BuildError as e:
+        assert e.line == 7
+
+    # The engine replays the compiled run like a Python trace
+    engine = DebuggingEngine(CPP_CODE, "main.cpp", "cpp")
+    engine.set_compiler_path("g++")
+    engine.build_cache_dir = cache_dir
+    assert engine.parse()
+    assert engine.runs_in_background()
+    engine.start_tracing()
+    while not engine.poll_tracing():
+        time.sleep(0.01)
+    engine.initialize_execution_steps()
+    assert engine.build_cached
+    assert engine.output == "total 1\n"
+    assert engine.go_to_step(4)
+    assert [frame['function'] for frame in engine.get_call_stack()] == ["main", "square(int)"]
+    engine.set_breakpoint(11)
+    assert engine.run_to_end()
+    assert engine.stopped_at_breakpoint == 11
+
+    # A failed build in the background leaves the engine in the error state, on simulated steps
+    engine = DebuggingEngine(CPP_CODE.replace("int total = 0;", "int total = ;"), "main.cpp", "cpp")
+    engine.set_compiler_path("g++")
+    engine.build_cache_dir = cache_dir
+    engine.start_tracing()
+    while not engine.poll_tracing():
+        time.sleep(0.01)
+    engine.initialize_execution_steps()
+    assert engine.trace is None and engine.get_error_info()['line'] == 7
+    assert engine.simulated_steps
+
+    # So does a cancelled one
+    engine = DebuggingEngine(CPP_CODE.replace("total 1", "total 2"), "main.cpp", "cpp")
+    engine.set_compiler_path("g++")
+    engine.build_cache_dir = cache_dir
+    engine.start_tracing()
+    engine.cancel_tracing()
+    while not engine.poll_tracing():
+        time.sleep(0.01)
+    assert engine.trace is None and engine.has_error()
+    assert engine.get_error_info()['message'] == "Build and run cancelled"
+    print("✓ Native C++ run traced with a cached build")
+
+# Answers jdb commands the way jdb does for a program that calls square() from main()
+FAKE_JDB = r"""import sys
+steps = [("main", 3), ("square", 7), ("square", 8), ("main", 3), ("main", 4)]
+def say(text):
+    sys.stdout.write(text)
+    sys.stdout.flush()
+def location(kind, method, line):
+    return f'{kind}: "thread=main", Main.{method}(), line={line} bci=0\n{line}    code\n\nmain[1] '
+say("Initializing jdb ...\n> ")
+for command in sys.stdin:
+    command = command.strip()
+    if command.startswith("stop in"):
+        say("Deferring breakpoint Main.main.\n> ")
+    elif command == "run":
+        say("run Main\n> ")
+        say("\nVM Started: Set deferred breakpoint Main.main\n\n" + location("Breakpoint hit", *steps.pop(0)))
+    elif command == "step":
+        if not steps:
+            say("\nThe application exited\n")
+            break
+        say("\n" + location("Step completed", *steps.pop(0)))
+"""
+
+def test_native_java_run():
+    """Java programs are compiled with javac and stepped through jdb"""
+    tools = tempfile.mkdtemp()
+    scripts = {
+        'javac': "import os\nos.makedirs('classes', exist_ok=True)\nopen('classes/Main.class', 'w').close()\n",
+        'java': "print('hello')\n",
+        'jdb': FAKE_JDB,
+    }
+    for name, body in scripts.items():
+        path = os.path.join(tools, name)
+        with open(path, 'w') as f:
+            f.write(f"#!{sys.executable}\n{body}")
+        os.chmod(path, 0o755)
+
+    source = "public class Main {}\n"
+    runner = NativeRunner(source, "Main.java", "java", os.path.join(tools, "javac"), tempfile.mkdtemp())
+    trace = runner.run()
+    assert trace.output == "hello\n"
+    assert trace.error is None and not trace.truncated
+    steps = [(trace.lines[i], trace.depths[i], trace.function_names[trace.functions[i]]) for i in range(len(trace))]
+    assert steps == [(3, 1, "main"), (7, 2, "square"), (8, 2, "square"), (3, 1, "main"), (4, 1, "main")]
+    print("✓ Native Java run stepped through jdb")
+
+if __name__ == "__main__":
+    test_tracer_records_line_events()
+    test_tracer_step_limit()
+    test_traced_execution_steps()
+    test_traced_runtime_error()
+    test_trace_large_loop()
+    test_trace_worker_streams_trace()
+    test_trace_worker_limits()
+    test_engine_traces_in_worker()
+    test_worker_uses_script_directory()
+    test_step_back_restores_state()
+    test_checkpoint_memory_budget()
+    test_variable_deltas()
+    test_delta_recorder()
+    test_step_store_view()
+    test_trace_file_round_trip()
+    test_engine_replays_trace_file()
+    test_line_index()
+    test_engine_line_navigation()
+    test_run_to_end_matches_stepping()
+    test_breakpoints()
+    test_breakpoint_run_speed()
+    test_statement_steps()
+    test_watchpoints()
+    test_sampling()
+    test_native_cpp_run()
+    test_native_java_run()
+    print("All debug engine tests completed!")
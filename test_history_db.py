@@ -0,0 +1,145 @@
+"""
+Tests for the session history database
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db.history_db import HistoryDatabase
+from db.session_codec import encode_payload, decode_payload, dump_json, FORMAT_PLAIN, FORMAT_ZLIB, FORMAT_LZMA
+
+def make_database():
+    """Create a history database in a fresh temporary directory"""
+    return HistoryDatabase(os.path.join(tempfile.mkdtemp(), "sessions.db"))
+
+def save_example(db, filename="test.py", code="print('Hello')"):
+    return db.save_session(filename, code, {"variables": []}, [{"line": 1, "type": "Expr"}],
+                           {"message": "Hello"}, {"nodes": []})
+
+def test_shared_connection():
+    """All calls share one WAL connection, which can be closed and reopened"""
+    db = make_database()
+    conn = db.connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    session_id = save_example(db)
+    assert db.connection() is conn
+    assert db.load_session(session_id)['execution_steps'] == [{"line": 1, "type": "Expr"}]
+
+    db.close()
+    assert db.load_session(session_id)['code'] == "print('Hello')"
+    assert db.connection() is not conn
+
+    # The connection is shared safely between threads
+    threads = [threading.Thread(target=lambda: [save_example(db) for _ in range(20)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(db.get_recent_sessions(limit=100)) == 81
+    db.delete_session(session_id)
+    assert db.load_session(session_id) is None
+    db.close()
+    print("✓ History database shares one connection")
+
+def test_session_pages():
+    """Keyset pages list every session once, newest first, using the timestamp index"""
+    db = make_database()
+    for i in range(120):
+        save_example(db, f"file_{i}.py")
+    # Sessions saved within the same second share a timestamp and are ordered by id
+    conn = db.connection()
+    conn.execute("UPDATE sessions SET timestamp = '2024-01-0' || (1 + id % 3) || ' 10:00:00'")
+    conn.commit()
+
+    listed = []
+    page = db.get_sessions_page(limit=25)
+    while page:
+        listed.extend(page)
+        page = db.get_sessions_page(25, page[-1]['timestamp'], page[-1]['id'])
+    keys = [(session['timestamp'], session['id']) for session in listed]
+    assert len(listed) == 120
+    assert keys == sorted(keys, reverse=True)
+    assert db.get_recent_sessions(limit=3) == listed[:3]
+
+    plan = conn.execute("EXPLAIN QUERY PLAN SELECT id FROM sessions WHERE (timestamp, id) < ('2024-01-02', 5) "
+                        "ORDER BY timestamp DESC, id DESC LIMIT 5").fetchall()
+    assert 'idx_sessions_timestamp' in plan[0][3]
+    db.close()
+    print("✓ Session history pages through the timestamp index")
+
+def test_deduplicated_payloads():
+    """Repeated sessions of an unchanged file share their payloads until the last one is deleted"""
+    db = make_database()
+    conn = db.connection()
+    ids = [save_example(db) for _ in range(20)]
+    assert conn.execute("SELECT COUNT(*), MIN(refcount), MAX(refcount) FROM blobs").fetchone() == (4, 20, 20)
+
+    # Only the changed payload gets a new blob
+    changed_id = save_example(db, code="print('Changed')")
+    assert conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 5
+    assert db.load_session(changed_id)['code'] == "print('Changed')"
+    assert db.load_session(ids[0])['variables_state'] == {"message": "Hello"}
+
+    for session_id in ids[:-1]:
+        db.delete_session(session_id)
+    assert db.load_session(ids[-1])['execution_steps'] == [{"line": 1, "type": "Expr"}]
+    db.delete_session(ids[-1])
+    db.delete_session(changed_id)
+    assert conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0] == 0
+
+    # Sessions saved before payloads moved to the blob table are still read
+    conn.execute("INSERT INTO sessions (filename, code, execution_steps) VALUES ('old.py', 'x = 1', '[]')")
+    conn.commit()
+    old_id = conn.execute("SELECT MAX(id) FROM sessions").fetchone()[0]
+    session = db.load_session(old_id)
+    assert session['code'] == 'x = 1' and session['execution_steps'] == [] and session['flow_graph'] == {}
+    db.close()
+    print("✓ Session payloads are deduplicated by content")
+
+def test_session_encoding():
+    """Large payloads are stored compressed behind a format byte and decoded on load"""
+    steps = [{'line': i % 40 + 1, 'type': 'Assign', 'description': f"Executing statement at line {i % 40 + 1}"}
+             for i in range(2000)]
+    text = dump_json(steps)
+    for compression, payload_format in (('none', FORMAT_PLAIN), ('zlib', FORMAT_ZLIB), ('lzma', FORMAT_LZMA)):
+        data = encode_payload(text, compression)
+        assert data[0] == payload_format
+        assert decode_payload(data) == text
+    assert len(encode_payload(text)) < len(text) // 10
+    assert encode_payload("[]", 'lzma') == bytes([FORMAT_PLAIN]) + b"[]"  # Too small to compress
+    assert decode_payload("legacy text") == "legacy text"
+    try:
+        decode_payload(b"\x7f{}")
+        assert False, "Expected an unknown format error"
+    except ValueError:
+        pass
+
+    for compression in ('zlib', 'lzma'):
+        db = HistoryDatabase(os.path.join(tempfile.mkdtemp(), "sessions.db"), compression=compression)
+        session_id = db.save_session("big.py", "x = 1\n" * 100, {}, steps, {}, {'nodes': []})
+        assert db.load_session(session_id)['execution_steps'] == steps
+        stored = db.connection().execute("SELECT MAX(LENGTH(data)) FROM blobs").fetchone()[0]
+        assert stored < len(text) // 10
+        db.close()
+
+    # Blobs written as text before payloads were encoded still load
+    db = make_database()
+    session_id = save_example(db)
+    conn = db.connection()
+    conn.execute("UPDATE blobs SET data = '[{\"line\": 2}]' WHERE hash = "
+                 "(SELECT execution_steps_hash FROM sessions WHERE id = ?)", (session_id,))
+    conn.commit()
+    assert db.load_session(session_id)['execution_steps'] == [{"line": 2}]
+    db.close()
+    print("✓ Session payloads are stored compressed")
+
+if __name__ == "__main__":
+    test_shared_connection()
+    test_session_pages()
+    test_deduplicated_payloads()
+    test_session_encoding()
+    print("All history database tests completed!")
@@ -4,6 +4,7 @@ Main Window for the Code Analysis and Debugging Visualizer
 
 import sys
 import os
+import tempfile
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from PyQt5.QtWidgets import (
@@ -17,10 +18,26 @@ from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import QIcon, QTextCharFormat, QColor, QFont
 from analyzer.ast_analyzer import ASTAnalyzer
 from analyzer.debug_engine import DebuggingEngine
+from analyzer.analysis_cache import shared_cache
+from analyzer.project_analyzer import ProjectAnalyzer
+from analyzer.records import results_as_dicts
+from analyzer.symbol_index import SymbolIndex
+from analyzer.analysis_cache import source_key
 from db.history_db import HistoryDatabase
+from db.analysis_cache_db import AnalysisCacheDatabase
+from db.symbol_index_db import SymbolIndexDatabase
 from utils.export_utils import export_to_json, export_to_html
 from visualization.flow_graph import FlowGraphVisualizer
 
+# Most recent steps rendered in the timeline; long traces stay on disk
+TIMELINE_WINDOW = 500
+
+# Sessions fetched per page as the history panel scrolls or more are requested
+HISTORY_PAGE_SIZE = 50
+
+# Steps stored with a saved or exported session; longer traces keep only their first steps
+SAVED_STEPS_LIMIT = 100_000
+
 class LanguageSelectionDialog(QDialog):
     """Dialog for selecting programming language"""
     
@@ -279,10 +296,20 @@ class MainWindow(QMainWindow):
         self.variables_state = {}
         self.flow_graph = {}
         self.history_db = HistoryDatabase()
+        shared_cache.attach_store(AnalysisCacheDatabase())  # Warm starts for unchanged files
         self.debug_engine = None
+        self.trace_timer = None  # Polls the worker process tracing the program
+        self.breakpoints = {}  # Line -> condition (None for unconditional), kept across debugging sessions
+        self.watchpoints = []  # Watched expressions, kept across debugging sessions
+        self.sampling_mode = False  # Sample long-running programs instead of tracing every line
         self.project_files = []  # For multi-file project support
         self.project_debug_engines = {}  # Debug engines for each file in project
         self.current_project_file = None  # Currently selected file in project
+        self.project_analyzer = None  # Whole-project analysis running in a process pool
+        self.project_summary = {}  # Merged results of the last project analysis
+        self.file_analyzers = {}  # Incremental analyzer for each analyzed file
+        self.symbol_index = SymbolIndex(SymbolIndexDatabase())  # Project-wide symbol lookup
+        self.symbol_index.load()
         self.current_language = "python"  # Default language
         self.compiler_path = ""  # Compiler path for non-Python languages
         
@@ -470,11 +497,28 @@ class MainWindow(QMainWindow):
         open_project_action.triggered.connect(self.open_project)
         file_menu.addAction(open_project_action)
         
+        analyze_project_action = QAction('Analyze Project', self)
+        analyze_project_action.setStatusTip('Analyze every file in the project')
+        analyze_project_action.triggered.connect(self.analyze_project)
+        file_menu.addAction(analyze_project_action)
+        
         language_action = QAction('Select Language', self)
         language_action.setStatusTip('Select programming language')
         language_action.triggered.connect(self.select_language)
         file_menu.addAction(language_action)
         
+        sampling_action = QAction('Sampling Mode', self)
+        sampling_action.setCheckable(True)
+        sampling_action.setStatusTip('Take periodic stack samples instead of tracing every line, for long-running programs')
+        sampling_action.toggled.connect(self.set_sampling_mode)
+        file_menu.addAction(sampling_action)
+        
+        goto_symbol_action = QAction('Go to Symbol', self)
+        goto_symbol_action.setShortcut('Ctrl+T')
+        goto_symbol_action.setStatusTip('Jump to a function, class or variable in the project')
+        goto_symbol_action.triggered.connect(self.go_to_symbol)
+        file_menu.addAction(goto_symbol_action)
+        
         save_action = QAction('Save', self)
         save_action.setShortcut('Ctrl+S')
         save_action.setStatusTip('Save current session')
@@ -523,6 +567,11 @@ class MainWindow(QMainWindow):
         run_action.triggered.connect(self.run_analysis)
         toolbar.addAction(run_action)
         
+        analyze_project_action = QAction(QIcon(), 'Analyze Project', self)
+        analyze_project_action.setStatusTip('Analyze every file in the project')
+        analyze_project_action.triggered.connect(self.analyze_project)
+        toolbar.addAction(analyze_project_action)
+        
         save_action = QAction(QIcon(), 'Save', self)
         save_action.setStatusTip('Save current session')
         save_action.triggered.connect(self.save_session)
@@ -540,20 +589,48 @@ class MainWindow(QMainWindow):
         # Placeholder for history items
         self.history_list = QListWidget()
         self.history_list.setStyleSheet("background-color: #1e1e1e; color: #ffffff;")
+        self.history_list.verticalScrollBar().valueChanged.connect(self.load_more_history)
+        
+        # Pages also load on request, since a list that fits without a scroll bar never scrolls
+        self.load_history_btn = QPushButton("Load Older Sessions")
+        self.load_history_btn.clicked.connect(lambda: self.load_more_history())
+        
         self.refresh_history()
         layout.addWidget(self.history_list)
+        layout.addWidget(self.load_history_btn)
         
         return history_widget
         
     def refresh_history(self):
-        """Refresh the history panel with recent sessions"""
+        """Refresh the history panel with the first page of recent sessions"""
         self.history_list.clear()
-        recent_sessions = self.history_db.get_recent_sessions()
-        for session in recent_sessions:
+        self.history_last_session = None  # (timestamp, id) of the last session listed
+        self.history_exhausted = False
+        self.load_more_history()
+        
+    def load_more_history(self, scroll_value=None):
+        """Append the next page of sessions when asked, or once the history panel is scrolled near its end"""
+        if self.history_exhausted:
+            return
+        scroll_bar = self.history_list.verticalScrollBar()
+        if scroll_value is not None and scroll_value < scroll_bar.maximum() - scroll_bar.pageStep():
+            return
+        after_timestamp, after_id = self.history_last_session or (None, None)
+        sessions = self.history_db.get_sessions_page(HISTORY_PAGE_SIZE, after_timestamp, after_id)
+        for session in sessions:
             item_text = f"Session #{session['id']} - {session['filename']} - {session['timestamp']}"
             item = QListWidgetItem(item_text)
             item.setData(Qt.UserRole, session['id'])  # Store session ID
             self.history_list.addItem(item)
+        if sessions:
+            self.history_last_session = (sessions[-1]['timestamp'], sessions[-1]['id'])
+        self.history_exhausted = len(sessions) < HISTORY_PAGE_SIZE
+        self.load_history_btn.setVisible(not self.history_exhausted)
+            
+    def closeEvent(self, event):
+        """Close the history database so its write-ahead log is checkpointed"""
+        self.history_db.close()
+        super().closeEvent(event)
         
     def create_right_panel(self):
         """Create the right sidebar with structured panels"""
@@ -631,6 +708,26 @@ class MainWindow(QMainWindow):
         self.step_back_btn.clicked.connect(self.step_back)
         button_layout.addWidget(self.step_back_btn)
         
+        self.prev_hit_btn = QPushButton('Prev Hit')
+        self.prev_hit_btn.setToolTip('Go to the previous execution of the line under the cursor')
+        self.prev_hit_btn.clicked.connect(lambda: self.go_to_line_execution(forward=False))
+        button_layout.addWidget(self.prev_hit_btn)
+        
+        self.next_hit_btn = QPushButton('Next Hit')
+        self.next_hit_btn.setToolTip('Go to the next execution of the line under the cursor')
+        self.next_hit_btn.clicked.connect(lambda: self.go_to_line_execution(forward=True))
+        button_layout.addWidget(self.next_hit_btn)
+        
+        self.breakpoint_btn = QPushButton('Breakpoint')
+        self.breakpoint_btn.setToolTip('Toggle a breakpoint, optionally conditional, on the line under the cursor')
+        self.breakpoint_btn.clicked.connect(self.toggle_breakpoint)
+        button_layout.addWidget(self.breakpoint_btn)
+        
+        self.watch_btn = QPushButton('Watch')
+        self.watch_btn.setToolTip('Stop Run All when a variable or attribute such as self.result changes')
+        self.watch_btn.clicked.connect(self.edit_watchpoints)
+        button_layout.addWidget(self.watch_btn)
+        
         self.run_selected_btn = QPushButton('Run Selected')
         self.run_selected_btn.clicked.connect(self.run_selected)
         button_layout.addWidget(self.run_selected_btn)
@@ -766,6 +863,53 @@ class MainWindow(QMainWindow):
                 except Exception as e:
                     self.status_bar.showMessage(f'Error loading file: {str(e)}')
                 
+    def go_to_symbol(self):
+        """Ask for a symbol name and jump to its definition or assignment"""
+        if len(self.symbol_index) == 0:
+            self.status_bar.showMessage('No symbols indexed yet. Analyze the file or project first.')
+            return
+            
+        name, ok = QInputDialog.getText(self, 'Go to Symbol', 'Symbol name or prefix:')
+        name = name.strip()
+        if not ok or not name:
+            return
+            
+        # Exact matches first, otherwise everything starting with the text
+        locations = self.symbol_index.lookup(name) or self.symbol_index.search(name)
+        if not locations:
+            self.status_bar.showMessage(f"No symbol named '{name}'")
+            return
+            
+        location = locations[0]
+        if len(locations) > 1:
+            choices = [f"{loc.name} ({loc.kind}) - {os.path.basename(loc.file_path)}:{loc.line}" for loc in locations]
+            choice, ok = QInputDialog.getItem(self, 'Go to Symbol', 'Select a location:', choices, 0, False)
+            if not ok:
+                return
+            location = locations[choices.index(choice)]
+            
+        self.jump_to_location(location.file_path, location.line)
+        
+    def jump_to_location(self, file_path, line):
+        """Show a file in the code viewer with the cursor on the given line"""
+        index = self.project_file_selector.findData(file_path)
+        if index < 0:
+            if not os.path.exists(file_path):
+                self.status_bar.showMessage(f'File not found: {file_path}')
+                return
+            self.project_file_selector.addItem(os.path.basename(file_path), file_path)
+            index = self.project_file_selector.count() - 1
+        if index != self.project_file_selector.currentIndex():
+            self.project_file_selector.setCurrentIndex(index)  # Loads the file
+            
+        cursor = self.code_viewer.textCursor()
+        cursor.movePosition(cursor.Start)
+        cursor.movePosition(cursor.Down, cursor.MoveAnchor, max(line - 1, 0))
+        cursor.movePosition(cursor.EndOfLine, cursor.KeepAnchor)
+        self.code_viewer.setTextCursor(cursor)
+        self.code_viewer.setFocus()
+        self.status_bar.showMessage(f'{os.path.basename(file_path)}:{line}')
+        
     def highlight_code_lines(self):
         """Highlight lines in the code viewer based on execution state"""
         if not self.debug_engine:
@@ -794,9 +938,10 @@ class MainWindow(QMainWindow):
         if not lines:
             return
             
-        # Get execution flow for visualization
-        execution_flow = self.debug_engine.get_execution_flow()
-        
+        current_line = None
+        if self.debug_engine.execution_steps and self.debug_engine.current_step < len(self.debug_engine.execution_steps):
+            current_line = self.debug_engine.execution_steps[self.debug_engine.current_step]['line']
+            
         for i, line in enumerate(lines):
             line_num = i + 1
             line_state = self.debug_engine.get_line_state(line_num)
@@ -808,8 +953,8 @@ class MainWindow(QMainWindow):
             cursor.movePosition(cursor.EndOfLine, cursor.KeepAnchor)
             
             # Apply formatting based on state
-            if self.debug_engine.execution_steps and self.debug_engine.current_step < len(self.debug_engine.execution_steps):
-                if line_num == self.debug_engine.execution_steps[self.debug_engine.current_step]['line']:
+            if current_line is not None:
+                if line_num == current_line:
                     cursor.setCharFormat(current_format)
                 elif line_state['status'] == 'success':
                     cursor.setCharFormat(success_format)
@@ -826,16 +971,26 @@ class MainWindow(QMainWindow):
             session_id = self.history_db.save_session(
                 os.path.basename(self.current_file),
                 self.current_code,
-                self.analysis_results,
-                self.execution_steps,
+                results_as_dicts(self.analysis_results),
+                self.saved_steps(),
                 self.variables_state,
                 self.flow_graph
             )
-            self.status_bar.showMessage(f'Session saved with ID: {session_id}')
+            self.status_bar.showMessage(f'Session saved with ID: {session_id}{self.saved_steps_note()}')
             self.refresh_history()
         except Exception as e:
             self.status_bar.showMessage(f'Error saving session: {str(e)}')
             
+    def saved_steps(self):
+        """Get the steps stored with a saved or exported session; long traces keep only their first steps"""
+        return list(self.execution_steps[:SAVED_STEPS_LIMIT])
+        
+    def saved_steps_note(self):
+        """Describe how much of a long trace a saved or exported session holds"""
+        if len(self.execution_steps) <= SAVED_STEPS_LIMIT:
+            return ""
+        return f" (first {SAVED_STEPS_LIMIT} of {len(self.execution_steps)} steps)"
+        
     def export_to_json(self):
         """Export current session to JSON"""
         if not self.current_file:
@@ -854,14 +1009,14 @@ class MainWindow(QMainWindow):
                 export_data = {
                     'filename': os.path.basename(self.current_file),
                     'code': self.current_code,
-                    'analysis_results': self.analysis_results,
-                    'execution_steps': self.execution_steps,
+                    'analysis_results': results_as_dicts(self.analysis_results),
+                    'execution_steps': self.saved_steps(),
                     'variables_state': self.variables_state,
                     'flow_graph': self.flow_graph
                 }
                 
                 if export_to_json(export_data, file_path):
-                    self.status_bar.showMessage(f'Exported to JSON: {file_path}')
+                    self.status_bar.showMessage(f'Exported to JSON: {file_path}{self.saved_steps_note()}')
                 else:
                     self.status_bar.showMessage('Error exporting to JSON')
             except Exception as e:
@@ -888,11 +1043,11 @@ class MainWindow(QMainWindow):
                     'variables': self.analysis_results.get('variables', []),
                     'functions': self.analysis_results.get('functions', []),
                     'classes': self.analysis_results.get('classes', []),
-                    'execution_steps': self.execution_steps
+                    'execution_steps': self.saved_steps()
                 }
                 
                 if export_to_html(export_data, file_path):
-                    self.status_bar.showMessage(f'Exported to HTML: {file_path}')
+                    self.status_bar.showMessage(f'Exported to HTML: {file_path}{self.saved_steps_note()}')
                 else:
                     self.status_bar.showMessage('Error exporting to HTML')
             except Exception as e:
@@ -906,6 +1061,100 @@ class MainWindow(QMainWindow):
             
         self.show_loading_modal()
         
+    def analyze_project(self):
+        """Analyze every file of the project in parallel worker processes"""
+        if not self.project_files:
+            self.status_bar.showMessage('No project loaded. Please open a file or project folder first.')
+            return
+        if self.current_language.lower() != "python":
+            self.status_bar.showMessage('Project analysis is only available for Python projects')
+            return
+        if self.project_analyzer is not None:
+            self.status_bar.showMessage('Project analysis already running')
+            return
+            
+        self.project_analyzer = ProjectAnalyzer(self.project_files)
+        self.project_summary = {}
+        
+        self.loading_modal = LoadingModal(self)
+        self.loading_modal.setWindowTitle("Analyzing Project")
+        self.loading_modal.status_label.setText(f"Analyzing {len(self.project_files)} files...")
+        self.loading_modal.rejected.connect(self.cancel_project_analysis)
+        self.loading_modal.show()
+        
+        try:
+            self.project_analyzer.start()
+        except Exception as e:
+            self.project_analyzer = None
+            self.loading_modal.close()
+            self.status_bar.showMessage(f'Error starting project analysis: {str(e)}')
+            return
+            
+        # Files are read and results stream back in the background; poll without blocking the event loop
+        self.project_analysis_timer = QTimer(self)
+        self.project_analysis_timer.timeout.connect(self.poll_project_analysis)
+        self.project_analysis_timer.start(100)
+        
+    def poll_project_analysis(self):
+        """Merge the per-file results that finished since the last poll"""
+        if self.project_analyzer is None:
+            return
+            
+        for file_path, results, error in self.project_analyzer.poll():
+            if error:
+                self.status_bar.showMessage(f'{os.path.basename(file_path)}: {error}')
+            else:
+                self.symbol_index.update_file(file_path, results, self.project_analyzer.source_keys.get(file_path))
+                self.status_bar.showMessage(f'Analyzed {os.path.basename(file_path)}')
+                
+        percent = int(self.project_analyzer.progress() * 100)
+        analyzed = len(self.project_analyzer.results) + len(self.project_analyzer.errors)
+        self.loading_modal.update_progress(f"{analyzed}/{len(self.project_files)} files", percent)
+        
+        if self.project_analyzer.is_finished():
+            self.project_analysis_timer.stop()
+            self.project_summary = self.project_analyzer.get_summary()
+            self.project_analyzer = None
+            self.loading_modal.close()
+            self.on_project_analysis_complete()
+            
+    def cancel_project_analysis(self):
+        """Stop a running project analysis"""
+        if self.project_analyzer is None:
+            return
+            
+        self.project_analysis_timer.stop()
+        self.project_analyzer.shutdown(cancel=True)
+        self.project_summary = self.project_analyzer.get_summary()
+        self.project_analyzer = None
+        self.status_bar.showMessage('Project analysis cancelled')
+        
+    def on_project_analysis_complete(self):
+        """Show the project-level summary"""
+        summary = self.project_summary
+        totals = summary['totals']
+        
+        summary_text = f"Project Analysis [{self.current_language}]\n"
+        summary_text += f"Files analyzed: {summary['files_analyzed']}/{summary['files_total']}\n\n"
+        summary_text += f"Variables: {totals['variables']}\n"
+        summary_text += f"Functions: {totals['functions']}\n"
+        summary_text += f"Classes: {totals['classes']}\n"
+        summary_text += f"Conditionals: {totals['conditionals']}\n"
+        summary_text += f"Loops: {totals['loops']}\n"
+        
+        if summary['files_failed']:
+            summary_text += f"\nFailed files:\n"
+            for file_path, error in summary['files_failed'].items():
+                summary_text += f"  {os.path.basename(file_path)}: {error}\n"
+                
+        summary_text += f"\nPer file:\n"
+        for file_path, counts in summary['per_file'].items():
+            summary_text += f"  {os.path.basename(file_path)}: {counts['functions']} functions, {counts['classes']} classes\n"
+            
+        self.debug_info_panel.setText(summary_text)
+        self.tab_widget.setCurrentWidget(self.debug_info_panel)
+        self.status_bar.showMessage(f"Project analysis complete: {summary['files_analyzed']} files analyzed")
+        
     def show_loading_modal(self):
         """Show the loading modal with progress"""
         self.loading_modal = LoadingModal(self)
@@ -942,10 +1191,22 @@ class MainWindow(QMainWindow):
         """Perform the actual code analysis"""
         try:
             if self.current_language.lower() == "python":
-                # Analyze the code
-                analyzer = ASTAnalyzer(self.current_code)
-                if analyzer.analyze():
+                # Analyze the code, re-extracting only what changed since the last run
+                file_key = self.current_project_file or self.current_file
+                analyzer = self.file_analyzers.get(file_key)
+                if analyzer is not None:
+                    analyzed = analyzer.update(self.current_code)
+                else:
+                    analyzer = ASTAnalyzer(self.current_code, incremental=True)
+                    if analyzer.cache is not None and analyzer.cache.get_results(self.current_code) is not None:
+                        analyzed = analyzer.analyze()
+                    else:
+                        analyzed = self.stream_analysis(analyzer)
+                    self.file_analyzers[file_key] = analyzer
+                if analyzed:
                     self.analysis_results = analyzer.get_results()
+                    if file_key:
+                        self.symbol_index.update_file(file_key, self.analysis_results, source_key(self.current_code))
             else:
                 # For non-Python languages, create basic analysis results
                 self.analysis_results = {
@@ -959,6 +1220,24 @@ class MainWindow(QMainWindow):
         except Exception as e:
             print(f"Analysis error: {e}")
             
+    def stream_analysis(self, analyzer):
+        """Run an analysis, filling the Variables and Functions panels as findings arrive"""
+        self.variables_panel.clear()
+        self.functions_panel.clear()
+        
+        found = 0
+        for finding in analyzer.iter_results():
+            if finding.kind == 'variables':
+                self.variables_panel.append(f"{finding.name} = {finding.value} (line {finding.line})")
+            elif finding.kind == 'functions':
+                self.functions_panel.append(f"{finding.name}({', '.join(finding.params)}) (line {finding.line})")
+            found += 1
+            if found % 200 == 0:
+                QApplication.processEvents()  # Keep the panels painting during long analyses
+                
+        # iter_results() yields nothing when the code does not parse
+        return analyzer.tree is not None
+        
     def on_analysis_complete(self):
         """Handle completion of the analysis"""
         self.status_bar.showMessage('Analysis complete')
@@ -1045,23 +1324,34 @@ class MainWindow(QMainWindow):
     def initialize_debugging(self):
         """Initialize the debugging engine"""
         try:
+            # Stop a program still being traced for the previous engine
+            if self.trace_timer is not None:
+                self.trace_timer.stop()
+            if self.debug_engine:
+                self.debug_engine.discard_trace()
+            
             # Create debug engine for the current file
             filename = os.path.basename(self.current_project_file) if self.current_project_file else "main.py"
-            self.debug_engine = DebuggingEngine(self.current_code, filename, self.current_language)
+            script_dir = os.path.dirname(os.path.abspath(self.current_project_file)) if self.current_project_file else None
+            execution_mode = "sample" if self.sampling_mode else "trace"
+            self.debug_engine = DebuggingEngine(self.current_code, filename, self.current_language,
+                                                execution_mode=execution_mode, script_dir=script_dir)
+            # Traces are recorded to disk so runs larger than memory can be replayed
+            self.debug_engine.trace_path = os.path.join(tempfile.gettempdir(), f"codeflow_{os.getpid()}.trace")
+            for line_num, condition in self.breakpoints.items():
+                self.debug_engine.set_breakpoint(line_num, condition)
+            for expression in self.watchpoints:
+                self.debug_engine.add_watchpoint(expression)
             
             # Set compiler path if provided
             if self.compiler_path:
                 self.debug_engine.set_compiler_path(self.compiler_path)
             
             if self.debug_engine.parse():
-                self.debug_engine.initialize_execution_steps()
-                self.execution_steps = self.debug_engine.execution_steps
-                self.update_timeline_display()
-                self.highlight_code_lines()
-                self.update_debug_info_panel()
-                self.generate_flow_graph()
-                self.status_bar.showMessage("Debugging initialized")
-                self.update_button_states()
+                if self.debug_engine.runs_in_background():
+                    self.start_program_run()
+                else:
+                    self.on_debugging_ready()
             else:
                 self.status_bar.showMessage("Failed to initialize debugging engine")
                 error_info = self.debug_engine.get_error_info()
@@ -1070,6 +1360,62 @@ class MainWindow(QMainWindow):
         except Exception as e:
             self.status_bar.showMessage(f"Error initializing debugging: {str(e)}")
             
+    def set_sampling_mode(self, enabled):
+        """Switch between sampling and full tracing for the next debugging session"""
+        self.sampling_mode = enabled
+        self.status_bar.showMessage('Sampling mode on: programs are sampled every few milliseconds' if enabled
+                                    else 'Sampling mode off: every line is traced')
+        
+    def start_program_run(self):
+        """Run the program in a worker process or build thread, polling it without blocking the event loop"""
+        if self.trace_timer is not None:
+            self.trace_timer.stop()
+        self.debug_engine.start_tracing()
+        self.status_bar.showMessage("Building and running program..." if self.debug_engine.runs_natively()
+                                    else "Running program...")
+        self.trace_timer = QTimer(self)
+        self.trace_timer.timeout.connect(self.poll_tracing)
+        self.trace_timer.start(50)
+        
+    def poll_tracing(self):
+        """Pick up the trace of the running program once the worker finishes"""
+        if not self.debug_engine:
+            self.trace_timer.stop()
+            return
+            
+        if self.debug_engine.poll_tracing():
+            self.trace_timer.stop()
+            self.on_debugging_ready()
+        elif self.debug_engine.trace_worker is not None:
+            self.status_bar.showMessage(f"Running program... {self.debug_engine.trace_worker.steps_received()} steps recorded")
+            
+    def cancel_tracing(self):
+        """Stop the program being traced"""
+        if self.debug_engine and (self.debug_engine.trace_worker is not None or self.debug_engine.native_runner is not None):
+            self.debug_engine.cancel_tracing()
+            self.status_bar.showMessage("Stopping program...")
+            
+    def on_debugging_ready(self):
+        """Show the execution steps once they are available"""
+        self.debug_engine.initialize_execution_steps()
+        self.execution_steps = self.debug_engine.execution_steps
+        self.update_timeline_display()
+        self.highlight_code_lines()
+        self.update_debug_info_panel()
+        self.generate_flow_graph()
+        self.status_bar.showMessage("Debugging initialized")
+        if self.debug_engine.language.lower() != "python" and self.compiler_path:
+            if self.debug_engine.trace is not None:
+                build = "cached build" if self.debug_engine.build_cached else "new build"
+                self.status_bar.showMessage(f"Program compiled and run ({build}): {len(self.execution_steps)} steps")
+            elif self.debug_engine.has_error():
+                error_info = self.debug_engine.get_error_info()
+                if error_info['line'] is not None:
+                    self.show_error_message(f"Build error at line {error_info['line']}: {error_info['message']}")
+                else:
+                    self.show_error_message(error_info['message'])
+        self.update_button_states()
+        
     def update_timeline_display(self):
         """Update the timeline display with execution steps"""
         if not self.debug_engine:
@@ -1077,8 +1423,11 @@ class MainWindow(QMainWindow):
             
         timeline_text = ""
         steps = self.debug_engine.get_execution_timeline()
+        first = max(0, len(steps) - TIMELINE_WINDOW)
+        if first:
+            timeline_text += f"... {first} earlier steps\n"
         
-        for i, step in enumerate(steps):
+        for i, step in enumerate(steps[first:], first):
             # Get line state
             line_state = self.debug_engine.get_line_state(step['line'])
             
@@ -1118,15 +1467,27 @@ class MainWindow(QMainWindow):
         debug_info += f"Total Steps: {len(self.debug_engine.get_execution_timeline())}\n"
         debug_info += f"Breakpoints: {len(self.debug_engine.breakpoints)}\n"
         debug_info += f"Current File: {self.debug_engine.filename}\n"
+        variables_note = self.debug_engine.get_variables_note()
+        if variables_note:
+            debug_info += f"{variables_note}\n"
         
         # Execution flow
         execution_flow = self.debug_engine.get_execution_flow()
-        debug_info += f"\nExecution Flow: {len(execution_flow)} steps executed\n"
+        flow_length = self.debug_engine.get_execution_flow_length()
+        debug_info += f"\nExecution Flow: {flow_length} steps executed\n"
         if execution_flow:
             debug_info += f"Flow: {' -> '.join(map(str, execution_flow[-10:]))}"  # Show last 10 steps
-            if len(execution_flow) > 10:
+            if flow_length > 10:
                 debug_info += " ..."
         
+        # Most executed lines so far
+        coverage = self.debug_engine.get_coverage()
+        if coverage:
+            hottest = sorted(coverage.items(), key=lambda item: item[1], reverse=True)[:5]
+            debug_info += f"\n\nLines executed: {len(coverage)}\n"
+            unit = " samples" if self.debug_engine.execution_mode == "sample" else "x"
+            debug_info += "Hot lines: " + ", ".join(f"{line} ({hits}{unit})" for line, hits in hottest)
+        
         # Error information
         error_info = self.debug_engine.get_error_info()
         if error_info['has_error']:
@@ -1148,9 +1509,14 @@ class MainWindow(QMainWindow):
             # Create flow graph visualizer
             visualizer = FlowGraphVisualizer()
             
-            # Generate flow graph from execution steps
-            steps = self.debug_engine.get_execution_timeline()
-            graph = visualizer.generate_flow_graph(steps)
+            if self.debug_engine.execution_mode == "sample":
+                # Samples of the whole run are aggregated per line so the hot paths stand out
+                visualizer.generate_hot_path_graph(self.debug_engine.get_total_coverage(),
+                                                   self.debug_engine.get_line_transitions())
+            else:
+                # Generate flow graph from the most recent execution steps, like the timeline
+                steps = self.debug_engine.get_execution_timeline()
+                visualizer.generate_flow_graph(steps[max(0, len(steps) - TIMELINE_WINDOW):])
             
             # Get graph data
             graph_data = visualizer.get_graph_data()
@@ -1191,6 +1557,10 @@ class MainWindow(QMainWindow):
         
         self.step_forward_btn.setEnabled(has_debug_engine)
         self.step_back_btn.setEnabled(has_debug_engine)
+        self.prev_hit_btn.setEnabled(has_debug_engine)
+        self.next_hit_btn.setEnabled(has_debug_engine)
+        self.breakpoint_btn.setEnabled(has_debug_engine)
+        self.watch_btn.setEnabled(has_debug_engine)
         self.run_all_btn.setEnabled(has_debug_engine)
         self.reset_btn.setEnabled(has_debug_engine)
         self.pause_btn.setEnabled(has_debug_engine)
@@ -1228,6 +1598,75 @@ class MainWindow(QMainWindow):
         else:
             self.status_bar.showMessage('Already at the first step')
         
+    def go_to_line_execution(self, forward):
+        """Jump to the next or previous step that executes the line under the cursor"""
+        if not self.debug_engine:
+            return
+            
+        line_num = self.code_viewer.textCursor().blockNumber() + 1
+        if forward:
+            step = self.debug_engine.next_execution(line_num)
+        else:
+            step = self.debug_engine.previous_execution(line_num)
+        if step is None:
+            self.status_bar.showMessage(f'No {"later" if forward else "earlier"} execution of line {line_num}')
+            return
+            
+        if self.debug_engine.go_to_step(step):
+            self.update_timeline_display()
+            self.highlight_code_lines()
+            self.update_debug_info_panel()
+            self.status_bar.showMessage(f'Line {line_num}: hit {self.debug_engine.get_line_hits(line_num)} at step {step + 1}')
+        
+    def toggle_breakpoint(self):
+        """Set or clear the breakpoint on the line under the cursor"""
+        if not self.debug_engine:
+            return
+            
+        line_num = self.code_viewer.textCursor().blockNumber() + 1
+        if line_num in self.breakpoints:
+            del self.breakpoints[line_num]
+            self.debug_engine.remove_breakpoint(line_num)
+            self.status_bar.showMessage(f'Breakpoint removed from line {line_num}')
+            return
+            
+        condition, ok = QInputDialog.getText(self, 'Breakpoint', f'Condition for line {line_num} (leave empty to always stop):')
+        if not ok:
+            return
+        condition = condition.strip() or None
+        try:
+            self.debug_engine.set_breakpoint(line_num, condition)
+        except SyntaxError as e:
+            self.show_error_message(f"Invalid breakpoint condition: {e}")
+            return
+        self.breakpoints[line_num] = condition
+        self.status_bar.showMessage(f'Breakpoint set on line {line_num}' + (f' when {condition}' if condition else ''))
+        
+    def edit_watchpoints(self):
+        """Add a watched expression, or remove one by entering it again"""
+        if not self.debug_engine:
+            return
+            
+        current = ', '.join(self.watchpoints) or 'none'
+        expression, ok = QInputDialog.getText(self, 'Watch', f'Variable or attribute to watch (watching: {current}):')
+        expression = expression.strip()
+        if not ok or not expression:
+            return
+        if expression in self.watchpoints:
+            self.watchpoints.remove(expression)
+            self.debug_engine.remove_watchpoint(expression)
+            self.status_bar.showMessage(f'Stopped watching {expression}')
+            return
+        try:
+            self.debug_engine.add_watchpoint(expression)
+        except ValueError as e:
+            self.show_error_message(str(e))
+            return
+        self.watchpoints.append(expression)
+        # Changes are found while tracing, so the program is traced again
+        self.initialize_debugging()
+        self.status_bar.showMessage(f'Watching {expression}')
+        
     def run_selected(self):
         """Run only the selected operations"""
         if hasattr(self, 'selected_operations') and self.selected_operations:
@@ -1246,7 +1685,16 @@ class MainWindow(QMainWindow):
                 self.update_timeline_display()
                 self.highlight_code_lines()
                 self.update_debug_info_panel()
-                self.status_bar.showMessage('Execution completed')
+                if self.debug_engine.breakpoint_error:
+                    self.status_bar.showMessage(self.debug_engine.breakpoint_error)
+                elif self.debug_engine.stopped_at_watchpoint:
+                    changes = '; '.join(f'{expression}: {old} -> {new}'
+                                        for expression, old, new in self.debug_engine.stopped_at_watchpoint)
+                    self.status_bar.showMessage(f'Watched value changed: {changes}')
+                elif self.debug_engine.stopped_at_breakpoint is not None:
+                    self.status_bar.showMessage(f'Stopped at breakpoint on line {self.debug_engine.stopped_at_breakpoint}')
+                else:
+                    self.status_bar.showMessage('Execution completed')
                 
                 # Check for errors
                 if self.debug_engine.has_error():
@@ -1259,6 +1707,9 @@ class MainWindow(QMainWindow):
         
     def pause_execution(self):
         """Pause the current execution"""
+        if self.debug_engine and self.debug_engine.trace_worker is not None:
+            self.cancel_tracing()
+            return
         self.status_bar.showMessage('Execution paused')
         # Implementation will be added later
         
@@ -1266,6 +1717,10 @@ class MainWindow(QMainWindow):
         """Reset the debugging session"""
         if self.debug_engine:
             self.debug_engine.reset_execution()
+            if self.debug_engine.trace is None and self.debug_engine.runs_in_background():
+                # No finished trace to replay: run the program again without blocking
+                self.start_program_run()
+                return
             self.debug_engine.initialize_execution_steps()
             self.update_timeline_display()
             self.highlight_code_lines()
@@ -9,7 +9,7 @@ def export_to_json(data, filename):
     """Export data to JSON format"""
     try:
         with open(filename, 'w') as f:
-            json.dump(data, f, indent=2)
+            json.dump(data, f, indent=2, default=str)
         return True
     except Exception as e:
         print(f"Error exporting to JSON: {e}")
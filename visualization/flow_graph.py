@@ -36,6 +36,18 @@ class FlowGraphVisualizer:
             
         return self.graph
         
+    def generate_hot_path_graph(self, line_hits, transitions):
+        """Generate a graph with one node per line and edges weighted by how often execution moved between lines"""
+        self.graph.clear()
+        
+        for line, hits in sorted(line_hits.items()):
+            self.add_node(f"line_{line}", f"Line {line}\n{hits} hits")
+            
+        for (from_line, to_line), count in transitions.items():
+            self.add_edge(f"line_{from_line}", f"line_{to_line}", f"{count}x")
+            
+        return self.graph
+        
     def render_to_image(self, width=8, height=6):
         """Render the flow graph to an image"""
         plt.figure(figsize=(width, height))